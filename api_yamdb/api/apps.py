@@ -1,6 +1,14 @@
+import atexit
+
 from django.apps import AppConfig
 
 
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from api import checks, signals  # noqa: F401
+        from api.connections import close_connections
+
+        atexit.register(close_connections)
@@ -0,0 +1,140 @@
+import asyncio
+import re
+
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import SpooledTemporaryFile
+
+from asgiref.wsgi import WsgiToAsgiInstance
+from django.conf import settings
+
+from api.connections import close_connections, close_thread_connections
+
+# Lists and details served to anonymous readers, they get threads of
+# their own so slow writes and signups cannot starve them.
+READ_PATHS = re.compile(
+    r'^/api/v1/(?:'
+    r'titles/(?:\d+/(?:reviews/(?:\d+/comments/)?)?)?'
+    r'|categories/|genres/|leaderboards/.*'
+    r')$'
+)
+READ_METHODS = ('GET', 'HEAD')
+
+
+def is_read(scope):
+    return (
+        scope['method'] in READ_METHODS
+        and READ_PATHS.match(scope['path']) is not None
+    )
+
+
+class PooledWsgiToAsgiInstance(WsgiToAsgiInstance):
+    """One request to the WSGI application run in a given thread pool."""
+
+    def __init__(self, wsgi_application, executor):
+        super().__init__(wsgi_application)
+        self.executor = executor
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            raise ValueError(f'Unsupported ASGI scope {scope["type"]}')
+        self.scope = scope
+        loop = asyncio.get_running_loop()
+
+        def sync_send(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        self.sync_send = sync_send
+        with SpooledTemporaryFile(max_size=65536) as body:
+            while True:
+                message = await receive()
+                if message['type'] == 'http.disconnect':
+                    return
+                body.write(message.get('body', b''))
+                if not message.get('more_body'):
+                    break
+            body.seek(0)
+            await loop.run_in_executor(self.executor, self.run_wsgi_app, body)
+
+    def run_wsgi_app(self, body):
+        environ = self.build_environ(self.scope, body)
+        response = self.wsgi_application(environ, self.start_response)
+        try:
+            for output in response:
+                if not self.response_started:
+                    self.response_started = True
+                    self.sync_send(self.response_start)
+                self.sync_send({
+                    'type': 'http.response.body',
+                    'body': output,
+                    'more_body': True,
+                })
+        finally:
+            # Sends request_finished, which closes the DB connection.
+            if hasattr(response, 'close'):
+                response.close()
+        if not self.response_started:
+            self.response_started = True
+            self.sync_send(self.response_start)
+        self.sync_send({'type': 'http.response.body'})
+
+
+class PooledASGIHandler:
+    """Serve a WSGI application over ASGI from bounded thread pools.
+
+    Django 2.2 views and the ORM are synchronous, so requests run in
+    threads while the event loop reads bodies and writes responses.
+    Reads of ``READ_PATHS`` and everything else get separate pools,
+    which bound the concurrent DB connections of a worker; requests past
+    the pool size wait on the loop without holding a thread.
+    """
+
+    def __init__(self, wsgi_application, read_threads=None,
+                 write_threads=None):
+        self.wsgi_application = wsgi_application
+        self.read_threads = read_threads or settings.ASGI_READ_THREADS
+        self.write_threads = write_threads or settings.ASGI_WRITE_THREADS
+        self.read_executor = ThreadPoolExecutor(
+            self.read_threads,
+            thread_name_prefix='asgi-read',
+        )
+        self.write_executor = ThreadPoolExecutor(
+            self.write_threads,
+            thread_name_prefix='asgi-write',
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        executor = self.write_executor
+        if scope['type'] == 'http' and is_read(scope):
+            executor = self.read_executor
+        await PooledWsgiToAsgiInstance(
+            self.wsgi_application,
+            executor,
+        )(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                # Requests in flight finish first, they need the loop
+                # to send their responses. Persistent connections of
+                # the threads are closed in those threads.
+                loop = asyncio.get_running_loop()
+                for executor, threads in (
+                    (self.read_executor, self.read_threads),
+                    (self.write_executor, self.write_threads),
+                ):
+                    await loop.run_in_executor(
+                        None,
+                        close_thread_connections,
+                        executor,
+                        threads,
+                    )
+                    await loop.run_in_executor(None, executor.shutdown)
+                close_connections()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
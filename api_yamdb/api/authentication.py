@@ -0,0 +1,24 @@
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+
+from api.cache import user_cache
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication loading users through the in-process user cache.
+
+    Permissions read the role from the cached user, authenticated
+    requests within ``AUTH_USER_CACHE_TTL`` need no user query, only a
+    lookup of the user's version in the versions cache.
+    """
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        version = user_cache.version(user_id)
+        user = user_cache.get(self.user_model, user_id, version)
+        if user is not None:
+            return user
+        user = super().get_user(validated_token)
+        if api_settings.USER_ID_FIELD == user._meta.pk.name:
+            user_cache.set(user, version)
+        return user
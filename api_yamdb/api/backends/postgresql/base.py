@@ -0,0 +1,48 @@
+import time
+
+from functools import partial
+
+from django.db.backends.postgresql import base
+
+from api.connections import PoolTimeoutError, get_pool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL connections checked out of the pool of the worker.
+
+    Closing a connection hands it back to the pool, which happens when
+    every request ends; the pool keeps it open for the next one.
+    """
+
+    pooled = True
+
+    @property
+    def pool(self):
+        return get_pool(self.alias, self.settings_dict)
+
+    def connect(self):
+        super().connect()
+        # Hand the connection back when the request ends, whatever
+        # CONN_MAX_AGE says: the pool keeps it open instead.
+        self.close_at = time.time()
+
+    def get_new_connection(self, conn_params):
+        try:
+            connection = self.pool.acquire(
+                partial(base.Database.connect, **conn_params),
+            )
+        except PoolTimeoutError as error:
+            raise base.Database.OperationalError(str(error)) from error
+        options = self.settings_dict['OPTIONS']
+        try:
+            self.isolation_level = options['isolation_level']
+        except KeyError:
+            self.isolation_level = connection.isolation_level
+        else:
+            if self.isolation_level != connection.isolation_level:
+                connection.set_session(isolation_level=self.isolation_level)
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            self.pool.release(self.connection)
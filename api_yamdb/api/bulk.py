@@ -0,0 +1,368 @@
+from django.conf import settings
+from django.db import connection, transaction
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+from api import permissions
+from api.cache import resource_versions
+from api.serializers import (
+    BulkCommentSerializer,
+    BulkReviewSerializer,
+    BulkTitleSerializer,
+)
+from reviews.models import (
+    Category,
+    Comment,
+    Genre,
+    GenreTitle,
+    Review,
+    Title,
+    TitleStats,
+    User,
+)
+from reviews.signals import ratings_deferred
+
+BATCH_SIZE = 1000
+ID_FIELD = serializers.IntegerField(min_value=1)
+
+
+def item_id(item):
+    """Return the validated id of an update or delete item."""
+    value = item.get('id') if isinstance(item, dict) else item
+    return ID_FIELD.run_validation(value)
+
+
+def failed(status, errors):
+    return {'status': status, 'errors': errors}
+
+
+class BulkWriter:
+    """Apply a batch of ``operations`` in one transaction.
+
+    The base writer only creates. Items are validated without queries
+    by one serializer instance, so its fields are built once. Then
+    relations and uniqueness are checked with one query per batch in
+    ``check_creates``. Invalid items are reported and skipped, the valid
+    ones are written with bulk queries and passed to ``written``.
+    Results line up with the request items.
+    """
+
+    model = None
+    serializer_class = None
+    operations = ('create',)
+
+    def __init__(self, request, view=None):
+        self.request = request
+        self.user = request.user
+        self.view = view
+
+    def write(self, data):
+        operations = set(data) if isinstance(data, dict) else set()
+        if not operations or operations - set(self.operations):
+            raise ValidationError(
+                f'Ожидается объект с ключами {", ".join(self.operations)}'
+            )
+        for operation, items in data.items():
+            if not isinstance(items, list):
+                raise ValidationError({operation: ['Ожидается список']})
+        if sum(map(len, data.values())) > settings.BULK_MAX_ITEMS:
+            raise ValidationError(
+                f'Не более {settings.BULK_MAX_ITEMS} элементов за запрос'
+            )
+        with resource_versions.batch(), transaction.atomic():
+            with ratings_deferred() as self.titles:
+                return {
+                    operation: getattr(self, operation)(data[operation])
+                    for operation in self.operations
+                    if operation in data
+                }
+
+    def create(self, items):
+        results = [None] * len(items)
+        rows = []
+        serializer = self.serializer_class()
+        for index, item in enumerate(items):
+            try:
+                rows.append((index, serializer.run_validation(item)))
+            except ValidationError as error:
+                results[index] = failed(400, error.detail)
+        rows = self.check_creates(rows, results)
+        instances = [self.build(data) for _, data in rows]
+        self.insert(instances)
+        for (index, _), instance in zip(rows, instances):
+            results[index] = {'status': 201, 'id': instance.pk}
+        self.written(instances)
+        return results
+
+    def build(self, data):
+        return self.model(**data)
+
+    def insert(self, instances):
+        if connection.features.can_return_ids_from_bulk_insert:
+            self.model.objects.bulk_create(instances, BATCH_SIZE)
+            return
+        # The ids of bulk inserted rows are unknown on this backend.
+        for instance in instances:
+            instance.save(force_insert=True)
+
+    def check_creates(self, rows, results):
+        """Return the ``(index, data)`` rows to insert, report the rest."""
+        return rows
+
+    def written(self, instances):
+        """Refresh what depends on the written ``instances``."""
+
+
+class AuthoredBulkWriter(BulkWriter):
+    """Also update and delete objects with an author.
+
+    Authors and ownership are checked with one query per batch, only
+    admins write for other users and moderators change any object.
+    """
+
+    update_fields = ()
+    operations = ('create', 'update', 'delete')
+
+    def __init__(self, request, view=None):
+        super().__init__(request, view)
+        self.permission = permissions.ForReview()
+
+    def update(self, items):
+        results = [None] * len(items)
+        rows = []
+        serializer = self.serializer_class(partial=True)
+        for index, item in enumerate(items):
+            try:
+                pk = item_id(item)
+            except ValidationError as error:
+                results[index] = failed(400, {'id': error.detail})
+                continue
+            try:
+                rows.append((index, pk, serializer.run_validation(item)))
+            except ValidationError as error:
+                results[index] = failed(400, error.detail)
+        changed = {}
+        for index, instance, data in self.check_changes(rows, results):
+            for field in self.update_fields:
+                if field in data:
+                    setattr(instance, field, data[field])
+            changed[instance.pk] = instance
+            results[index] = {'status': 200, 'id': instance.pk}
+        self.model.objects.bulk_update(
+            changed.values(),
+            self.update_fields,
+            BATCH_SIZE,
+        )
+        self.written(changed.values())
+        return results
+
+    def delete(self, items):
+        results = [None] * len(items)
+        rows = []
+        for index, item in enumerate(items):
+            try:
+                rows.append((index, item_id(item), {}))
+            except ValidationError as error:
+                results[index] = failed(400, {'id': error.detail})
+        deleted = set()
+        for index, instance, _ in self.check_changes(rows, results):
+            deleted.add(instance.pk)
+            results[index] = {'status': 204, 'id': instance.pk}
+        # Receivers of the deleted rows only collect what to refresh.
+        self.model.objects.filter(pk__in=deleted).delete()
+        return results
+
+    def resolve_authors(self, rows, results):
+        """Set authors of the rows, only admins write for other users."""
+        names = {data['author'] for _, data in rows if 'author' in data}
+        users = {
+            user.username: user
+            for user in User.objects.filter(username__in=names)
+        }
+        users[self.user.username] = self.user
+        valid = []
+        for index, data in rows:
+            name = data.pop('author', self.user.username)
+            if name != self.user.username and not self.user.is_admin:
+                results[index] = failed(403, {'author': [
+                    'Автора может указывать только администратор',
+                ]})
+            elif name not in users:
+                results[index] = failed(400, {'author': [
+                    f'Пользователь {name} не найден',
+                ]})
+            else:
+                data['author'] = users[name]
+                valid.append((index, data))
+        return valid
+
+    def check_changes(self, rows, results):
+        """Yield ``(index, instance, data)`` the user may change."""
+        instances = self.model.objects.select_related('author').in_bulk(
+            {pk for _, pk, _ in rows},
+        )
+        for index, pk, data in rows:
+            instance = instances.get(pk)
+            if instance is None:
+                results[index] = failed(404, {'id': [
+                    f'Объект {pk} не найден',
+                ]})
+            elif not self.permission.has_object_permission(
+                self.request,
+                self.view,
+                instance,
+            ):
+                results[index] = failed(403, {'id': [
+                    'Недостаточно прав для изменения объекта',
+                ]})
+            else:
+                yield index, instance, data
+
+    def check_creates(self, rows, results):
+        return self.resolve_authors(rows, results)
+
+
+class ReviewBulkWriter(AuthoredBulkWriter):
+    model = Review
+    serializer_class = BulkReviewSerializer
+    update_fields = ('text', 'score')
+
+    def check_creates(self, rows, results):
+        rows = self.resolve_authors(rows, results)
+        titles = set(
+            Title.objects.filter(
+                pk__in={data['title'] for _, data in rows},
+            ).values_list('pk', flat=True)
+        )
+        reviewed = set(
+            Review.objects.filter(
+                title__in=titles,
+                author__in={data['author'].pk for _, data in rows},
+            ).values_list('title_id', 'author_id')
+        )
+        valid = []
+        for index, data in rows:
+            title_id = data.pop('title')
+            if title_id not in titles:
+                results[index] = failed(404, {'title': [
+                    f'Произведение {title_id} не найдено',
+                ]})
+            elif (title_id, data['author'].pk) in reviewed:
+                results[index] = failed(400, {'non_field_errors': [
+                    'Можно оставлять только один отзыв',
+                ]})
+            else:
+                reviewed.add((title_id, data['author'].pk))
+                data['title_id'] = title_id
+                valid.append((index, data))
+        return valid
+
+    def written(self, instances):
+        # Comments show the review text, titles show the rating.
+        for review in instances:
+            self.titles.add(review.title_id)
+            resource_versions.bump(
+                'titles',
+                f'title:{review.title_id}',
+                f'reviews:{review.title_id}',
+                f'comments:{review.pk}',
+            )
+
+
+class CommentBulkWriter(AuthoredBulkWriter):
+    model = Comment
+    serializer_class = BulkCommentSerializer
+    update_fields = ('text',)
+
+    def check_creates(self, rows, results):
+        rows = self.resolve_authors(rows, results)
+        reviews = set(
+            Review.objects.filter(
+                pk__in={data['review'] for _, data in rows},
+            ).values_list('pk', flat=True)
+        )
+        valid = []
+        for index, data in rows:
+            review_id = data.pop('review')
+            if review_id not in reviews:
+                results[index] = failed(404, {'review': [
+                    f'Отзыв {review_id} не найден',
+                ]})
+            else:
+                data['review_id'] = review_id
+                valid.append((index, data))
+        return valid
+
+    def written(self, instances):
+        for comment in instances:
+            resource_versions.bump(f'comments:{comment.review_id}')
+
+
+class TitleBulkWriter(BulkWriter):
+    """Create titles of a catalog feed with their genres.
+
+    Category and genre slugs of the whole batch are resolved with one
+    ``IN`` query each, titles and their genre links are inserted with
+    bulk queries.
+    """
+
+    model = Title
+    serializer_class = BulkTitleSerializer
+    operations = ('create',)
+
+    def check_creates(self, rows, results):
+        categories = dict(
+            Category.objects.filter(
+                slug__in={data['category'] for _, data in rows},
+            ).values_list('slug', 'pk')
+        )
+        genres = dict(
+            Genre.objects.filter(
+                slug__in={slug for _, data in rows for slug in data['genre']},
+            ).values_list('slug', 'pk')
+        )
+        valid = []
+        for index, data in rows:
+            errors = {}
+            if data['category'] not in categories:
+                errors['category'] = [
+                    f'Категория {data["category"]} не найдена',
+                ]
+            unknown = [slug for slug in data['genre'] if slug not in genres]
+            if unknown:
+                errors['genre'] = [
+                    f'Жанр {slug} не найден' for slug in unknown
+                ]
+            if errors:
+                results[index] = failed(400, errors)
+                continue
+            data['category_id'] = categories[data.pop('category')]
+            data['genre'] = list(dict.fromkeys(
+                genres[slug] for slug in data['genre']
+            ))
+            valid.append((index, data))
+        return valid
+
+    def build(self, data):
+        genre_ids = data.pop('genre')
+        title = Title(**data)
+        title._genre_ids = genre_ids
+        return title
+
+    def written(self, instances):
+        GenreTitle.objects.bulk_create(
+            [
+                GenreTitle(title_id_id=title.pk, genre_id_id=genre_id)
+                for title in instances
+                for genre_id in title._genre_ids
+            ],
+            BATCH_SIZE,
+        )
+        # Titles saved one by one got their statistics from the receiver.
+        TitleStats.objects.bulk_create(
+            [TitleStats(title_id=title.pk) for title in instances],
+            BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+        for title in instances:
+            resource_versions.bump('titles', f'title:{title.pk}')
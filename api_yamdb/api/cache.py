@@ -0,0 +1,256 @@
+import hashlib
+import threading
+import time
+
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+
+class ResourceVersions:
+    """Version counters of API resources, bumped on every write.
+
+    Each scope keeps an integer version and the time of its last change.
+    Versions start from the clock, so a version key evicted from the
+    cache never comes back with a value handed out before. Keys expire
+    after ``VERSIONS_CACHE_TIMEOUT``, which bounds staleness for writes
+    the signals never see, such as bulk loads from another process.
+    """
+
+    prefix = 'version'
+
+    def __init__(self, alias=None, timeout=None):
+        self.alias = alias
+        self.timeout = timeout
+        self.local = threading.local()
+
+    @property
+    def cache(self):
+        return caches[self.alias or settings.VERSIONS_CACHE_ALIAS]
+
+    def get_timeout(self):
+        if self.timeout is None:
+            return settings.VERSIONS_CACHE_TIMEOUT
+        return self.timeout
+
+    def get_many(self, scopes):
+        """Return ``{scope: (version, modified)}`` for the given scopes."""
+        keys = [
+            f'{self.prefix}:{kind}:{scope}'
+            for scope in scopes
+            for kind in ('number', 'modified')
+        ]
+        values = self.cache.get_many(keys)
+        versions = {}
+        for scope in scopes:
+            number_key = f'{self.prefix}:number:{scope}'
+            modified_key = f'{self.prefix}:modified:{scope}'
+            if number_key not in values or modified_key not in values:
+                timeout = self.get_timeout()
+                self.cache.add(number_key, time.time_ns() // 1000, timeout)
+                self.cache.add(modified_key, time.time(), timeout)
+                values.update(self.cache.get_many([number_key, modified_key]))
+            versions[scope] = (values[number_key], values[modified_key])
+        return versions
+
+    def get(self, scope):
+        return self.get_many([scope])[scope][0]
+
+    @contextmanager
+    def batch(self):
+        """Bump every scope once, on commit after leaving the block."""
+        pending = getattr(self.local, 'pending', None)
+        if pending is not None:
+            yield
+            return
+        self.local.pending = set()
+        try:
+            yield
+        finally:
+            pending, self.local.pending = self.local.pending, None
+            self.bump(*pending)
+
+    def bump(self, *scopes):
+        """Bump ``scopes`` once the current transaction commits.
+
+        A read between an earlier bump and the commit would cache the old
+        data under the new version and serve it until the next write.
+        """
+        pending = getattr(self.local, 'pending', None)
+        if pending is not None:
+            pending.update(scopes)
+            return
+        transaction.on_commit(lambda: self.bump_now(scopes))
+
+    def bump_now(self, scopes):
+        for scope in scopes:
+            key = f'{self.prefix}:number:{scope}'
+            try:
+                self.cache.incr(key)
+            except ValueError:
+                self.cache.set(
+                    key, time.time_ns() // 1000, self.get_timeout(),
+                )
+            self.cache.set(
+                f'{self.prefix}:modified:{scope}',
+                time.time(),
+                self.get_timeout(),
+            )
+
+
+resource_versions = ResourceVersions()
+
+
+class CatalogCache:
+    """Read-through cache for the category and genre catalogs.
+
+    Serialized list pages are keyed by the catalog resource version, so
+    a write drops every cached page of that catalog and nothing else.
+    Slug to id entries are dropped one by one. Any Django cache backend can be
+    plugged in through ``CATALOG_CACHE_ALIAS``.
+    """
+
+    prefix = 'catalog'
+
+    def __init__(self, alias=None, timeout=None):
+        self.alias = alias
+        self.timeout = timeout
+        self.counters = Counter()
+        self.lock = threading.Lock()
+
+    @property
+    def cache(self):
+        return caches[self.alias or settings.CATALOG_CACHE_ALIAS]
+
+    def get_timeout(self):
+        if self.timeout is None:
+            return settings.CATALOG_CACHE_TIMEOUT
+        return self.timeout
+
+    def count(self, kind, hit):
+        with self.lock:
+            self.counters[f'{kind}_{"hits" if hit else "misses"}'] += 1
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters)
+
+    def get_page(self, catalog, url, compute):
+        """Return the cached page for ``url`` or store ``compute()``."""
+        key = '{}:{}:page:{}:{}'.format(
+            self.prefix,
+            catalog,
+            resource_versions.get(catalog),
+            hashlib.sha1(url.encode()).hexdigest(),
+        )
+        page = self.cache.get(key)
+        self.count('page', page is not None)
+        if page is None:
+            page = compute()
+            self.cache.set(key, page, self.get_timeout())
+        return page
+
+    def slug_to_pk(self, model, slug):
+        """Resolve ``slug`` of a catalog model to its primary key."""
+        catalog = model._meta.model_name
+        key = f'{self.prefix}:{catalog}:slug:{slug}'
+        pk = self.cache.get(key)
+        self.count('slug', pk is not None)
+        if pk is None:
+            pk = (
+                model.objects.filter(slug=slug)
+                .values_list('pk', flat=True)
+                .first()
+            )
+            if pk is not None:
+                self.cache.set(key, pk, self.get_timeout())
+        return pk
+
+    def invalidate(self, catalog, slug=None):
+        """Drop the pages and the ``slug`` entry once the write commits."""
+        resource_versions.bump(catalog)
+        if slug is not None:
+            key = f'{self.prefix}:{catalog}:slug:{slug}'
+            # Dropped earlier, a concurrent read would cache the old row.
+            transaction.on_commit(lambda: self.cache.delete(key))
+
+
+catalog_cache = CatalogCache()
+
+
+class UserCache:
+    """In-process cache of authenticated users with a short TTL.
+
+    Field values are kept rather than instances, every request gets a
+    fresh ``User`` it may change freely. Entries remember the ``user:<pk>``
+    resource version they were loaded at; saving or deleting a user bumps
+    it on commit, which drops the entry in every worker sharing
+    ``VERSIONS_CACHE_ALIAS``. With a per-process versions cache other
+    workers serve a demoted or banned user until ``AUTH_USER_CACHE_TTL``
+    runs out.
+    """
+
+    def __init__(self, ttl=None, max_entries=10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get_ttl(self):
+        if self.ttl is None:
+            return settings.AUTH_USER_CACHE_TTL
+        return self.ttl
+
+    def version(self, pk):
+        """Return the version to pass to ``get`` and ``set`` for ``pk``.
+
+        Read it before loading the user, so a change committed meanwhile
+        is not cached under its version.
+        """
+        return resource_versions.get(f'user:{pk}')
+
+    def get(self, model, pk, version):
+        with self.lock:
+            entry = self.entries.get(pk)
+        if (
+            entry is None
+            or entry[0] < time.monotonic()
+            or entry[1] != version
+        ):
+            return None
+        _, _, db, field_names, values = entry
+        return model.from_db(db, field_names, values)
+
+    def set(self, user, version):
+        field_names = [field.attname for field in user._meta.concrete_fields]
+        entry = (
+            time.monotonic() + self.get_ttl(),
+            version,
+            user._state.db,
+            field_names,
+            [getattr(user, name) for name in field_names],
+        )
+        with self.lock:
+            self.entries[user.pk] = entry
+            self.entries.move_to_end(user.pk)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, pk):
+        """Drop the entries of ``pk`` in all workers once the write commits."""
+        resource_versions.bump(f'user:{pk}')
+        transaction.on_commit(lambda: self.forget(pk))
+
+    def forget(self, pk):
+        with self.lock:
+            self.entries.pop(pk, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+user_cache = UserCache()
@@ -0,0 +1,64 @@
+from django.conf import settings
+from django.core.checks import Error, Warning, register
+
+from api.connections import thread_count
+
+POOLED_ENGINE = 'api.backends.postgresql'
+PER_PROCESS_CACHES = ('django.core.cache.backends.locmem.LocMemCache',)
+
+
+def is_per_process(alias):
+    return settings.CACHES[alias]['BACKEND'] in PER_PROCESS_CACHES
+
+
+@register()
+def check_pool_size(app_configs, **kwargs):
+    """Warn when an ASGI worker has more threads than pooled connections."""
+    threads = thread_count()
+    warnings = []
+    for alias, database in settings.DATABASES.items():
+        size = database.get('POOL', {}).get('MAX_SIZE', threads)
+        if database['ENGINE'] == POOLED_ENGINE and size < threads:
+            warnings.append(Warning(
+                f'The pool of database "{alias}" holds {size} connections '
+                f'for {threads} ASGI threads, requests will wait for one.',
+                hint='Raise DB_POOL_SIZE or lower ASGI_READ_THREADS and '
+                     'ASGI_WRITE_THREADS.',
+                id='api.W001',
+            ))
+    return warnings
+
+
+@register()
+def check_versions_cache(app_configs, **kwargs):
+    """Refuse validators built from counters of a single process."""
+    if settings.CONDITIONAL_GET and is_per_process(
+        settings.VERSIONS_CACHE_ALIAS,
+    ):
+        return [Error(
+            'CONDITIONAL_GET builds validators from version counters kept '
+            f'in the per-process cache "{settings.VERSIONS_CACHE_ALIAS}", '
+            'other workers would answer 304 for changed data.',
+            hint='Point CACHE_BACKEND at a cache shared by all workers, '
+                 'or unset CONDITIONAL_GET.',
+            id='api.E001',
+        )]
+    return []
+
+
+@register(deploy=True)
+def check_user_cache(app_configs, **kwargs):
+    """Warn that user changes reach other workers only on expiry."""
+    if settings.AUTH_USER_CACHE_TTL and is_per_process(
+        settings.VERSIONS_CACHE_ALIAS,
+    ):
+        return [Warning(
+            'Cached users are invalidated through the per-process cache '
+            f'"{settings.VERSIONS_CACHE_ALIAS}", a role change or a ban '
+            'reaches other workers only after AUTH_USER_CACHE_TTL '
+            f'({settings.AUTH_USER_CACHE_TTL} s).',
+            hint='Point CACHE_BACKEND at a cache shared by all workers, '
+                 'or set AUTH_USER_CACHE_TTL to 0.',
+            id='api.W002',
+        )]
+    return []
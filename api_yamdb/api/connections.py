@@ -0,0 +1,301 @@
+import threading
+import time
+
+from collections import Counter
+
+import psycopg2
+
+from django.conf import settings
+from django.core.signals import request_finished, request_started
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from psycopg2 import extensions
+
+from api.metrics import labels, registry
+
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5)
+
+
+class PoolTimeoutError(Exception):
+    """No pooled connection became free in time."""
+
+
+class ConnectionStats:
+    """Connection counters of this process, exported on ``/metrics/``."""
+
+    def __init__(self, buckets=WAIT_BUCKETS):
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.counts = Counter()
+            self.waits = [0] * (len(self.buckets) + 1)
+            self.wait_sum = 0.0
+
+    def count(self, name, value=1):
+        with self.lock:
+            self.counts[name] += value
+
+    def observe_wait(self, seconds):
+        with self.lock:
+            for index, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    self.waits[index] += 1
+            self.waits[-1] += 1
+            self.wait_sum += seconds
+
+
+stats = ConnectionStats()
+
+
+def is_usable(connection):
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+    except psycopg2.Error:
+        return False
+    return True
+
+
+class ConnectionPool:
+    """PostgreSQL connections shared by the threads of a worker.
+
+    At most ``max_size`` connections are handed out, a thread asking for
+    one more waits up to ``timeout`` seconds. Idle connections are reused
+    newest first and pinged when they sat longer than ``check_interval``.
+    """
+
+    def __init__(self, max_size, timeout, check_interval):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.check_interval = check_interval
+        self.slots = threading.BoundedSemaphore(max_size)
+        self.lock = threading.Lock()
+        self.idle = []
+        self.in_use = 0
+        self.closed = False
+
+    def acquire(self, connect):
+        """Return an idle connection, or a new one made by ``connect``."""
+        started = time.monotonic()
+        if not self.slots.acquire(timeout=self.timeout):
+            stats.count('pool_timeouts')
+            raise PoolTimeoutError(
+                f'No database connection was free within {self.timeout} s',
+            )
+        stats.observe_wait(time.monotonic() - started)
+        try:
+            connection = self.take_idle()
+            if connection is None:
+                connection = connect()
+                stats.count('opened')
+        except BaseException:
+            self.slots.release()
+            raise
+        with self.lock:
+            self.in_use += 1
+        return connection
+
+    def take_idle(self):
+        while True:
+            with self.lock:
+                if not self.idle:
+                    return None
+                connection, released_at = self.idle.pop()
+            stale = time.monotonic() - released_at >= self.check_interval
+            if stale and not (
+                is_usable(connection) and self.reset(connection)
+            ):
+                stats.count('health_check_failures')
+                self.discard(connection)
+                continue
+            if not connection.closed:
+                return connection
+            self.discard(connection)
+
+    def release(self, connection):
+        try:
+            if self.closed or not self.reset(connection):
+                self.discard(connection)
+            else:
+                with self.lock:
+                    self.idle.append((connection, time.monotonic()))
+        finally:
+            with self.lock:
+                self.in_use -= 1
+            self.slots.release()
+
+    def reset(self, connection):
+        """Roll back what the connection left open, False if it broke."""
+        if connection.closed:
+            return False
+        try:
+            status = connection.get_transaction_status()
+            if status != extensions.TRANSACTION_STATUS_IDLE:
+                connection.rollback()
+        except psycopg2.Error:
+            return False
+        return True
+
+    def discard(self, connection):
+        try:
+            connection.close()
+        except psycopg2.Error:
+            pass
+        stats.count('closed')
+
+    def close(self):
+        """Close the idle connections, the busy ones once released."""
+        with self.lock:
+            self.closed = True
+            idle, self.idle = self.idle, []
+        for connection, _ in idle:
+            self.discard(connection)
+
+
+pools = {}
+pools_lock = threading.Lock()
+
+
+def thread_count():
+    """Return the threads of an ASGI worker, each may hold a connection."""
+    return settings.ASGI_READ_THREADS + settings.ASGI_WRITE_THREADS
+
+
+def get_pool(alias, settings_dict):
+    """Return the pool of the database ``alias``, created on first use."""
+    pool = pools.get(alias)
+    if pool is not None:
+        return pool
+    with pools_lock:
+        if alias not in pools:
+            options = settings_dict.get('POOL', {})
+            pools[alias] = ConnectionPool(
+                max_size=options.get('MAX_SIZE', thread_count()),
+                timeout=options.get('TIMEOUT', 5),
+                check_interval=settings.DB_HEALTH_CHECK_INTERVAL,
+            )
+        return pools[alias]
+
+
+def close_thread_connections(executor, threads):
+    """Close the connections of the ``threads`` threads of ``executor``.
+
+    Django connections belong to the thread that opened them. Each task
+    closes those of its thread and waits at a barrier until all have
+    run, so every thread gets one.
+    """
+    barrier = threading.Barrier(threads)
+
+    def close():
+        connections.close_all()
+        barrier.wait()
+
+    for future in [executor.submit(close) for _ in range(threads)]:
+        future.result()
+
+
+def close_connections():
+    """Close the connections of this thread and all pools.
+
+    Run when a worker stops, so the database sees clean disconnects.
+    Connections of other threads are closed by those threads, see
+    ``close_thread_connections``.
+    """
+    connections.close_all()
+    with pools_lock:
+        for pool in pools.values():
+            pool.close()
+
+
+@receiver(connection_created)
+def count_connection(sender, connection, **kwargs):
+    # Pooled connections are counted when the pool opens them.
+    if not getattr(connection, 'pooled', False):
+        stats.count('opened')
+
+
+@receiver(request_finished)
+def mark_idle(**kwargs):
+    now = time.monotonic()
+    for connection in connections.all():
+        if connection.connection is not None:
+            connection.idle_since = now
+
+
+@receiver(request_started)
+def check_connections(**kwargs):
+    """Close persistent connections that broke while idle.
+
+    Django 2.2 only notices a dead connection when a query on it fails,
+    so a connection idle longer than ``DB_HEALTH_CHECK_INTERVAL`` is
+    pinged before the request and reopened if the ping fails.
+    """
+    now = time.monotonic()
+    for connection in connections.all():
+        idle_since = getattr(connection, 'idle_since', None)
+        if (
+            connection.connection is None
+            or idle_since is None
+            or connection.in_atomic_block
+            or now - idle_since < settings.DB_HEALTH_CHECK_INTERVAL
+        ):
+            continue
+        connection.idle_since = None
+        if not connection.is_usable():
+            stats.count('health_check_failures')
+            connection.close()
+
+
+def render_metrics(prefix):
+    """Return the connection metrics in the Prometheus text format."""
+    lines = []
+    with stats.lock:
+        for name, description in (
+            ('opened', 'Database connections opened.'),
+            ('closed', 'Pooled database connections closed.'),
+            (
+                'health_check_failures',
+                'Idle database connections that failed a health check.',
+            ),
+            ('pool_timeouts', 'Requests that found no free connection.'),
+        ):
+            lines += [
+                f'# HELP {prefix}_db_connections_{name}_total {description}',
+                f'# TYPE {prefix}_db_connections_{name}_total counter',
+                f'{prefix}_db_connections_{name}_total {stats.counts[name]}',
+            ]
+        lines += [
+            f'# HELP {prefix}_db_pool_wait_seconds '
+            'Time spent waiting for a pooled connection.',
+            f'# TYPE {prefix}_db_pool_wait_seconds histogram',
+        ]
+        bounds = [str(bound) for bound in stats.buckets] + ['+Inf']
+        for bound, count in zip(bounds, stats.waits):
+            lines.append(
+                f'{prefix}_db_pool_wait_seconds_bucket'
+                f'{{{labels(le=bound)}}} {count}'
+            )
+        lines += [
+            f'{prefix}_db_pool_wait_seconds_sum {stats.wait_sum}',
+            f'{prefix}_db_pool_wait_seconds_count {stats.waits[-1]}',
+        ]
+    lines += [
+        f'# HELP {prefix}_db_pool_connections Pooled connections by state.',
+        f'# TYPE {prefix}_db_pool_connections gauge',
+    ]
+    for alias, pool in sorted(pools.items()):
+        with pool.lock:
+            in_use, idle = pool.in_use, len(pool.idle)
+        for state, value in (('in_use', in_use), ('idle', idle)):
+            lines.append(
+                f'{prefix}_db_pool_connections'
+                f'{{{labels(alias=alias, state=state)}}} {value}'
+            )
+    return lines
+
+
+registry.register(render_metrics)
@@ -0,0 +1,102 @@
+import logging
+import re
+import time
+import traceback
+
+from collections import Counter
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+PLACEHOLDER = re.compile(r'%s|%\(\w+\)s')
+VALUES_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+SELECT_LIST = re.compile(r'^SELECT\s+(DISTINCT\s+)?.*?\sFROM\s', re.S)
+WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_sql(sql):
+    """Reduce a query to its shape, ``SELECT ... FROM t WHERE t.id = ?``.
+
+    Literals and placeholders become ``?``, lists of them ``(...)`` and
+    the selected columns ``...``, so queries differing only in values
+    share a shape.
+    """
+    shape = STRING_LITERAL.sub('?', sql)
+    shape = shape.replace('"', '').replace('`', '')
+    shape = PLACEHOLDER.sub('?', shape)
+    shape = NUMBER.sub('?', shape)
+    shape = VALUES_LIST.sub('(...)', shape)
+    shape = WHITESPACE.sub(' ', shape).strip()
+    return SELECT_LIST.sub(
+        lambda match: f'SELECT {match.group(1) or ""}... FROM ',
+        shape,
+    )
+
+
+def caller_stack():
+    """Return the project frames of the current stack, innermost last."""
+    root = str(settings.BASE_DIR)
+    frames = [
+        frame for frame in traceback.extract_stack()
+        if frame.filename.startswith(root)
+        and 'site-packages' not in frame.filename
+        and frame.filename != __file__
+    ]
+    return ''.join(traceback.format_list(frames))
+
+
+class QueryInspector:
+    """Collect query shapes of one request and the stack of slow queries.
+
+    Installed with ``connection.execute_wrapper``. A shape run more than
+    ``repeat_threshold`` times usually is a lookup per row of a list,
+    an N+1 the query planner of the view missed.
+    """
+
+    def __init__(self, repeat_threshold=None, slow_threshold=None):
+        if repeat_threshold is None:
+            repeat_threshold = settings.QUERY_REPEAT_THRESHOLD
+        if slow_threshold is None:
+            slow_threshold = settings.SLOW_QUERY_MS / 1000
+        self.repeat_threshold = repeat_threshold
+        self.slow_threshold = slow_threshold
+        self.shapes = Counter()
+        self.slow = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.shapes[normalize_sql(sql)] += 1
+            if duration >= self.slow_threshold:
+                self.slow.append((duration, sql, caller_stack()))
+
+    def repeated(self):
+        """Return ``(shape, count)`` of shapes over the threshold."""
+        return [
+            (shape, count)
+            for shape, count in self.shapes.most_common()
+            if count > self.repeat_threshold
+        ]
+
+    def report(self, label):
+        for shape, count in self.repeated():
+            logger.warning(
+                'Repeated query in %s, %d times: %s',
+                label,
+                count,
+                shape,
+            )
+        for duration, sql, stack in self.slow:
+            logger.warning(
+                'Slow query in %s, %.1f ms: %s\n%s',
+                label,
+                duration * 1000,
+                sql,
+                stack,
+            )
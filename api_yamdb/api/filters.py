@@ -1,5 +1,9 @@
 import django_filters
 
+from rest_framework.filters import BaseFilterBackend
+from rest_framework.settings import api_settings
+
+from api.search import get_title_search
 from reviews.models import Title
 
 
@@ -18,3 +22,22 @@ class TitleFilter(django_filters.FilterSet):
     class Meta:
         model = Title
         fields = '__all__'
+
+
+class TitleSearchFilter(BaseFilterBackend):
+    """Full-text title search ranked by relevance.
+
+    Results are ordered by rank unless the ordering is requested
+    explicitly, so the backend goes after ``OrderingFilter``.
+    """
+
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        queryset = get_title_search(queryset.db).search(queryset, query)
+        if api_settings.ORDERING_PARAM in request.query_params:
+            return queryset
+        return queryset.order_by('-search_rank', 'id')
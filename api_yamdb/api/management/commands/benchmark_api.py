@@ -0,0 +1,223 @@
+import json
+import math
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.http import urlencode
+
+from reviews.models import Genre, Review, Title
+
+# Name, url name, url kwargs and query, formatted with sample objects.
+ENDPOINTS = [
+    ('titles', 'titles-list', {}, {}),
+    ('titles by genre', 'titles-list', {}, {'genre': '{genre}'}),
+    ('titles search', 'titles-list', {}, {'search': '{word}'}),
+    ('titles keyset', 'titles-list', {}, {'cursor': ''}),
+    ('title', 'titles-detail', {'pk': '{title}'}, {}),
+    ('reviews', 'reviews-list', {'title_id': '{title}'}, {}),
+    (
+        'review',
+        'reviews-detail',
+        {'title_id': '{title}', 'pk': '{review}'},
+        {},
+    ),
+    (
+        'comments',
+        'comments-list',
+        {'title_id': '{title}', 'review_id': '{review}'},
+        {},
+    ),
+    ('categories', 'categories-list', {}, {}),
+    ('genres', 'genre-list', {}, {}),
+]
+METRICS = ('p50', 'p95', 'p99', 'queries', 'throughput')
+
+
+def percentile(values, share):
+    """Nearest-rank percentile of ``values``."""
+    ordered = sorted(values)
+    return ordered[max(math.ceil(share * len(ordered)) - 1, 0)]
+
+
+def sample_objects():
+    """Pick the most reviewed title, so the hot paths are measured."""
+    title = Title.objects.order_by('-rating_count', 'id').first()
+    if title is None:
+        raise CommandError('No titles to query, run generate_data first')
+    review = Review.objects.filter(title=title).order_by('id').first()
+    if review is None:
+        raise CommandError(f'Title {title.pk} has no reviews')
+    genre = Genre.objects.filter(titles__isnull=False).first()
+    return {
+        'title': title.pk,
+        'review': review.pk,
+        'genre': genre.slug if genre else '',
+        'word': title.name.split()[0],
+    }
+
+
+def endpoint_urls(samples):
+    urls = []
+    for name, url_name, kwargs, query in ENDPOINTS:
+        url = reverse(url_name, kwargs={
+            key: value.format(**samples) for key, value in kwargs.items()
+        })
+        if query:
+            url += '?' + urlencode({
+                key: value.format(**samples) for key, value in query.items()
+            })
+        urls.append((name, url))
+    return urls
+
+
+class Command(BaseCommand):
+    help = (
+        'Measures latency percentiles, queries per request and throughput '
+        'of the API endpoints, optionally against a stored baseline'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=200,
+            help='Measured requests per endpoint',
+        )
+        parser.add_argument(
+            '--warmup',
+            type=int,
+            default=10,
+            help='Requests per endpoint before measuring',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=4,
+            help='Threads sending requests in the throughput run',
+        )
+        parser.add_argument(
+            '--endpoint',
+            action='append',
+            help='Measure only these endpoints, may be repeated',
+        )
+        parser.add_argument(
+            '--save',
+            type=Path,
+            help='Store the results as a JSON baseline',
+        )
+        parser.add_argument(
+            '--baseline',
+            type=Path,
+            help='Compare the results with a stored JSON baseline',
+        )
+        parser.add_argument(
+            '--max-regression',
+            type=float,
+            default=0.2,
+            help='Allowed relative p95 growth over the baseline',
+        )
+
+    def handle(self, *args, **options):
+        urls = endpoint_urls(sample_objects())
+        if options['endpoint']:
+            urls = [(name, url) for name, url in urls
+                    if name in options['endpoint']]
+        results = {}
+        for name, url in urls:
+            results[name] = self.measure(url, options)
+            self.report(name, results[name])
+        if options['save']:
+            options['save'].write_text(json.dumps(results, indent=2))
+            self.stdout.write(f'baseline saved to {options["save"]}')
+        if options['baseline']:
+            self.compare(
+                results,
+                json.loads(options['baseline'].read_text()),
+                options['max_regression'],
+            )
+
+    def request(self, client, url):
+        response = client.get(url)
+        if response.status_code != 200:
+            raise CommandError(f'GET {url}: {response.status_code}')
+
+    def measure(self, url, options):
+        client = Client()
+        for _ in range(options['warmup']):
+            self.request(client, url)
+        timings = []
+        queries = 0
+        for _ in range(options['requests']):
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                self.request(client, url)
+                timings.append(time.perf_counter() - started)
+            queries += len(context.captured_queries)
+        return {
+            'url': url,
+            'p50': percentile(timings, 0.5) * 1000,
+            'p95': percentile(timings, 0.95) * 1000,
+            'p99': percentile(timings, 0.99) * 1000,
+            'queries': queries / max(options['requests'], 1),
+            'throughput': self.throughput(url, options),
+        }
+
+    def throughput(self, url, options):
+        """Return requests per second sent from several threads."""
+        workers = max(options['concurrency'], 1)
+
+        def send(count):
+            client = Client()
+            try:
+                for _ in range(count):
+                    self.request(client, url)
+            finally:
+                connections.close_all()
+
+        shares = [options['requests'] // workers] * workers
+        shares[0] += options['requests'] % workers
+        started = time.perf_counter()
+        with ThreadPoolExecutor(workers) as executor:
+            list(executor.map(send, shares))
+        return options['requests'] / (time.perf_counter() - started)
+
+    def report(self, name, result):
+        self.stdout.write(
+            f'{name:<16} p50 {result["p50"]:7.2f} ms  '
+            f'p95 {result["p95"]:7.2f} ms  p99 {result["p99"]:7.2f} ms  '
+            f'{result["queries"]:5.1f} queries  '
+            f'{result["throughput"]:7.1f} req/s'
+        )
+
+    def compare(self, results, baseline, max_regression):
+        regressions = []
+        for name, result in results.items():
+            if name not in baseline:
+                continue
+            before = baseline[name]
+            self.stdout.write(f'{name:<16} ' + '  '.join(
+                f'{metric} {before[metric]:.2f} -> {result[metric]:.2f}'
+                for metric in METRICS
+            ))
+            if result['queries'] > before['queries']:
+                regressions.append(
+                    f'{name}: {before["queries"]:.1f} -> '
+                    f'{result["queries"]:.1f} queries per request'
+                )
+            if result['p95'] > before['p95'] * (1 + max_regression):
+                regressions.append(
+                    f'{name}: p95 {before["p95"]:.2f} -> '
+                    f'{result["p95"]:.2f} ms'
+                )
+        if regressions:
+            raise CommandError(
+                'Regressions against the baseline:\n'
+                + '\n'.join(regressions)
+            )
@@ -0,0 +1,215 @@
+import asyncio
+import sys
+import threading
+import time
+
+from io import BytesIO
+
+from django.core.management import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.db.backends.signals import connection_created
+
+from api.asgi import PooledASGIHandler
+from reviews.models import Review
+
+
+def percentile(latencies, fraction):
+    latencies = sorted(latencies)
+    return latencies[min(int(len(latencies) * fraction), len(latencies) - 1)]
+
+
+def environ(path, client):
+    return {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': path,
+        'QUERY_STRING': '',
+        'SERVER_NAME': 'localhost',
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'REMOTE_ADDR': client,
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': BytesIO(),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+
+
+def run_wsgi(application, workers, connections, paths, latencies):
+    """Serve every connection's paths with ``workers`` sync workers.
+
+    A sync worker handles one request at a time, a semaphore stands in
+    for the gunicorn arbiter handing connections to free workers.
+    """
+    free_workers = threading.Semaphore(workers)
+
+    def start_response(status, headers, exc_info=None):
+        pass
+
+    def client(number):
+        for path in paths:
+            started = time.perf_counter()
+            with free_workers:
+                response = application(
+                    environ(path, f'10.0.0.{number % 256}'),
+                    start_response,
+                )
+                try:
+                    b''.join(response)
+                finally:
+                    response.close()
+            latencies.append(time.perf_counter() - started)
+
+    clients = [
+        threading.Thread(target=client, args=(number,))
+        for number in range(connections)
+    ]
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+
+
+def run_asgi(application, connections, paths, latencies):
+    async def request(path, number):
+        scope = {
+            'type': 'http',
+            'method': 'GET',
+            'path': path,
+            'query_string': b'',
+            'http_version': '1.1',
+            'headers': [],
+            'client': (f'10.0.0.{number % 256}', 5000),
+        }
+
+        async def receive():
+            return {'type': 'http.request'}
+
+        async def send(message):
+            pass
+
+        await application(scope, receive, send)
+
+    async def client(number):
+        for path in paths:
+            started = time.perf_counter()
+            await request(path, number)
+            latencies.append(time.perf_counter() - started)
+
+    async def main():
+        await asyncio.gather(*(
+            client(number) for number in range(connections)
+        ))
+
+    asyncio.run(main())
+
+
+class Command(BaseCommand):
+    help = (
+        'Compares the throughput of the read endpoints under concurrent '
+        'connections served by sync WSGI workers and by the ASGI handler'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--connections',
+            type=int,
+            default=64,
+            help='Concurrent client connections',
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=20,
+            help='Requests per connection',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Sync WSGI workers to compare with',
+        )
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=16,
+            help='Read threads of the ASGI handler',
+        )
+        parser.add_argument(
+            '--query-delay',
+            type=float,
+            default=2.0,
+            help='Milliseconds added to every query, the network round '
+                 'trip to a database on another host',
+        )
+
+    def handle(self, *args, **options):
+        review = Review.objects.order_by('pk').first()
+        if review is None:
+            raise CommandError('No reviews to read, run generate_data first')
+        hot_paths = (
+            '/api/v1/titles/',
+            f'/api/v1/titles/{review.title_id}/',
+            f'/api/v1/titles/{review.title_id}/reviews/',
+            f'/api/v1/titles/{review.title_id}/reviews/{review.pk}/comments/',
+            '/api/v1/categories/',
+            '/api/v1/genres/',
+        )
+        paths = [
+            hot_paths[number % len(hot_paths)]
+            for number in range(options['requests'])
+        ]
+        delay = options['query_delay'] / 1000
+
+        def slow_execute(execute, sql, params, many, context):
+            time.sleep(delay)
+            return execute(sql, params, many, context)
+
+        def add_delay(connection, **kwargs):
+            if slow_execute not in connection.execute_wrappers:
+                connection.execute_wrappers.append(slow_execute)
+
+        connection_created.connect(add_delay)
+        try:
+            wsgi = get_wsgi_application()
+            asgi = PooledASGIHandler(wsgi, read_threads=options['threads'])
+            runs = (
+                (
+                    f'WSGI, {options["workers"]} sync workers',
+                    lambda latencies: run_wsgi(
+                        wsgi,
+                        options['workers'],
+                        options['connections'],
+                        paths,
+                        latencies,
+                    ),
+                ),
+                (
+                    f'ASGI, {options["threads"]} read threads',
+                    lambda latencies: run_asgi(
+                        asgi,
+                        options['connections'],
+                        paths,
+                        latencies,
+                    ),
+                ),
+            )
+            self.stdout.write(
+                f'{options["connections"]} connections x '
+                f'{options["requests"]} requests, '
+                f'{options["query_delay"]} ms per query'
+            )
+            for name, run in runs:
+                latencies = []
+                started = time.perf_counter()
+                run(latencies)
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f'{name:<28} {len(latencies) / elapsed:8.1f} req/s  '
+                    f'p50 {percentile(latencies, 0.5) * 1000:8.1f} ms  '
+                    f'p99 {percentile(latencies, 0.99) * 1000:8.1f} ms'
+                )
+        finally:
+            connection_created.disconnect(add_delay)
@@ -0,0 +1,117 @@
+import io
+import time
+
+from django.core.management import BaseCommand, CommandError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from api import views
+from api.mixins import plan_queryset
+from api.parsers import FastJSONParser
+from api.renderers import FastJSONRenderer, orjson
+from api.serializers import TitleReadSerializer
+from reviews.models import Title
+
+PER = 1000
+
+
+def best_of(repeat, function):
+    """Return the fastest of ``repeat`` runs and the last result."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+class Command(BaseCommand):
+    help = (
+        'Measures fetching, serializing, rendering and parsing of title '
+        'lists per 1000 objects with the stock and the fast JSON path'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--objects',
+            type=int,
+            default=PER,
+            help='Titles in the measured list',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Runs per step, the fastest one is reported',
+        )
+
+    def handle(self, *args, **options):
+        count = options['objects']
+        repeat = max(options['repeat'], 1)
+        queryset = Title.objects.order_by('-rating', 'name', 'id')[:count]
+        ids = list(queryset.values_list('pk', flat=True))
+        if not ids:
+            raise CommandError('No titles to render, run generate_data first')
+        titles = Title.objects.filter(pk__in=ids).order_by(
+            '-rating', 'name', 'id',
+        )
+        scale = PER / len(ids)
+        self.stdout.write(
+            f'{len(ids)} titles, orjson '
+            f'{"installed" if orjson else "not installed"}, '
+            f'ms per {PER} objects'
+        )
+
+        def fetch_instances():
+            return list(plan_queryset(titles, TitleReadSerializer()))
+
+        def fetch_values():
+            return list(titles.values(*views.TitleViewSet.values_fields))
+
+        view = views.TitleViewSet()
+        paths = (
+            (
+                'serializer + JSONRenderer',
+                fetch_instances,
+                lambda rows: TitleReadSerializer(rows, many=True).data,
+                JSONRenderer(),
+            ),
+            (
+                'serializer + FastJSONRenderer',
+                fetch_instances,
+                lambda rows: TitleReadSerializer(rows, many=True).data,
+                FastJSONRenderer(),
+            ),
+            (
+                'values() + FastJSONRenderer',
+                fetch_values,
+                view.values_representation,
+                FastJSONRenderer(),
+            ),
+        )
+        payload = None
+        for name, fetch, serialize, renderer in paths:
+            fetched, rows = best_of(repeat, fetch)
+            serialized, data = best_of(repeat, lambda: serialize(rows))
+            rendered, payload = best_of(
+                repeat,
+                lambda: renderer.render(data),
+            )
+            self.report(name, scale, (
+                ('fetch', fetched),
+                ('serialize', serialized),
+                ('render', rendered),
+            ))
+        for parser in (JSONParser(), FastJSONParser()):
+            parsed, _ = best_of(
+                repeat,
+                lambda: parser.parse(io.BytesIO(payload)),
+            )
+            self.report(type(parser).__name__, scale, (('parse', parsed),))
+
+    def report(self, name, scale, steps):
+        total = sum(duration for _, duration in steps)
+        self.stdout.write(f'{name:<30} ' + '  '.join(
+            f'{step} {duration * scale * 1000:8.2f}'
+            for step, duration in steps
+        ) + (f'  total {total * scale * 1000:8.2f}' if len(steps) > 1 else ''))
@@ -0,0 +1,122 @@
+import threading
+import time
+
+from types import SimpleNamespace
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management import BaseCommand
+from rest_framework.throttling import AnonRateThrottle
+
+from api.throttling import (
+    CacheBucketStore,
+    LocalBucketStore,
+    TokenBucketThrottle,
+)
+
+# High enough that no check is refused, refused checks cost the same.
+RATE = '100000000/day'
+
+
+class BenchmarkBucketThrottle(TokenBucketThrottle):
+    scope = 'benchmark'
+    rate = RATE
+
+
+class BenchmarkRateThrottle(AnonRateThrottle):
+    """DRF's throttle keeping the history of every request in the cache."""
+
+    rate = RATE
+
+
+def run(throttle_class, threads, checks, clients):
+    """Return the seconds ``threads`` threads take for ``checks`` each."""
+    requests = [
+        SimpleNamespace(
+            user=AnonymousUser(),
+            META={'REMOTE_ADDR': f'10.0.{client // 256}.{client % 256}'},
+        )
+        for client in range(clients)
+    ]
+    view = SimpleNamespace(action='create')
+    barrier = threading.Barrier(threads + 1)
+
+    def work(offset):
+        throttle = throttle_class()
+        barrier.wait()
+        for number in range(checks):
+            throttle.allow_request(
+                requests[(offset + number) % clients],
+                view,
+            )
+
+    workers = [
+        threading.Thread(target=work, args=(offset,))
+        for offset in range(threads)
+    ]
+    for worker in workers:
+        worker.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    return time.perf_counter() - started
+
+
+class Command(BaseCommand):
+    help = (
+        'Measures the cost of one throttle check with the token bucket in '
+        'local memory, in the cache and with DRF\'s rate throttle'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads',
+            type=int,
+            nargs='+',
+            default=[1, 4, 16],
+            help='Concurrent threads to measure with',
+        )
+        parser.add_argument(
+            '--checks',
+            type=int,
+            default=20000,
+            help='Checks per thread',
+        )
+        parser.add_argument(
+            '--clients',
+            type=int,
+            default=1000,
+            help='Distinct client addresses',
+        )
+
+    def handle(self, *args, **options):
+        throttles = (
+            (
+                'token bucket, local memory',
+                type('Local', (BenchmarkBucketThrottle,), {
+                    'store': LocalBucketStore(),
+                }),
+            ),
+            (
+                'token bucket, cache',
+                type('Cache', (BenchmarkBucketThrottle,), {
+                    'store': CacheBucketStore(),
+                }),
+            ),
+            ('DRF AnonRateThrottle, cache', BenchmarkRateThrottle),
+        )
+        self.stdout.write('microseconds per check, checks per second')
+        for name, throttle_class in throttles:
+            for threads in options['threads']:
+                elapsed = run(
+                    throttle_class,
+                    threads,
+                    options['checks'],
+                    options['clients'],
+                )
+                checks = threads * options['checks']
+                self.stdout.write(
+                    f'{name:<28} {threads:>3} threads '
+                    f'{elapsed / checks * 1e6:8.2f} us '
+                    f'{checks / elapsed:10.0f}/s'
+                )
@@ -0,0 +1,255 @@
+import threading
+import time
+
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_local = threading.local()
+
+
+class RequestMetrics:
+    """Cost of one request, filled while it is handled."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.view = 'unresolved'
+        self.queries = 0
+        self.timings = Counter()
+        self.depth = Counter()
+        self.started_at = {}
+        self.exclusive_started_at = {}
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        """Time queries, installed with ``connection.execute_wrapper``."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.timings['sql'] += time.perf_counter() - started
+
+    def start(self, name):
+        if not self.depth[name]:
+            self.started_at[name] = time.perf_counter()
+        self.depth[name] += 1
+
+    def stop(self, name):
+        self.depth[name] -= 1
+        if not self.depth[name]:
+            self.timings[name] += (
+                time.perf_counter() - self.started_at.pop(name)
+            )
+
+    @contextmanager
+    def timer(self, name):
+        """Add the time of the block to ``name``, nested blocks once."""
+        self.start(name)
+        try:
+            yield
+        finally:
+            self.stop(name)
+
+    def start_exclusive(self, name):
+        """Start timing ``name`` without the SQL queries run meanwhile."""
+        self.exclusive_started_at[name] = (
+            time.perf_counter(),
+            self.timings['sql'],
+        )
+
+    def stop_exclusive(self, name):
+        started, sql = self.exclusive_started_at.pop(name)
+        self.timings[name] += (
+            time.perf_counter() - started - (self.timings['sql'] - sql)
+        )
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self):
+        """Return the value of the ``Server-Timing`` header."""
+        entries = [f'total;dur={self.elapsed() * 1000:.2f}']
+        entries.append(
+            f'sql;dur={self.timings["sql"] * 1000:.2f};'
+            f'desc="{self.queries} queries"'
+        )
+        for name in ('serializer', 'render'):
+            if name in self.timings:
+                entries.append(f'{name};dur={self.timings[name] * 1000:.2f}')
+        return ', '.join(entries)
+
+
+def current_metrics():
+    return getattr(_local, 'metrics', None)
+
+
+@contextmanager
+def collecting(metrics):
+    """Make ``metrics`` the target of ``timed`` in this thread."""
+    _local.metrics = metrics
+    try:
+        yield metrics
+    finally:
+        _local.metrics = None
+
+
+@contextmanager
+def timed(name, exclusive=False):
+    """Time the block into the current request, if it is measured.
+
+    ``exclusive`` leaves out the SQL queries the block runs.
+    """
+    metrics = current_metrics()
+    if metrics is None:
+        yield
+        return
+    if not exclusive:
+        with metrics.timer(name):
+            yield
+        return
+    metrics.start_exclusive(name)
+    try:
+        yield
+    finally:
+        metrics.stop_exclusive(name)
+
+
+def escape(value):
+    return (
+        str(value)
+        .replace('\\', '\\\\')
+        .replace('"', '\\"')
+        .replace('\n', '\\n')
+    )
+
+
+def labels(**values):
+    return ','.join(
+        f'{key}="{escape(value)}"' for key, value in values.items()
+    )
+
+
+class MetricsRegistry:
+    """Aggregated request metrics of this process.
+
+    Every worker process keeps its own registry, Prometheus sums the
+    series of all scraped targets.
+    """
+
+    namespace = 'yamdb'
+
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        self.collectors = []
+        self.reset()
+
+    def register(self, collector):
+        """Add the lines of ``collector(namespace)`` to the output."""
+        self.collectors.append(collector)
+
+    def reset(self):
+        with self.lock:
+            self.requests = Counter()
+            self.durations = defaultdict(
+                lambda: [0] * (len(self.buckets) + 1),
+            )
+            self.totals = defaultdict(Counter)
+
+    def observe(self, metrics, method, status, size):
+        duration = metrics.elapsed()
+        view = metrics.view
+        with self.lock:
+            self.requests[view, method, status] += 1
+            buckets = self.durations[view]
+            for index, bound in enumerate(self.buckets):
+                if duration <= bound:
+                    buckets[index] += 1
+            buckets[-1] += 1
+            totals = self.totals[view]
+            totals['request_duration_seconds'] += duration
+            totals['sql_queries'] += metrics.queries
+            totals['sql_duration_seconds'] += metrics.timings['sql']
+            totals['serializer_duration_seconds'] += (
+                metrics.timings['serializer']
+            )
+            totals['render_duration_seconds'] += metrics.timings['render']
+            totals['response_bytes'] += size
+
+    def render(self):
+        """Return the metrics in the Prometheus text format."""
+        prefix = self.namespace
+        with self.lock:
+            lines = [
+                f'# HELP {prefix}_requests_total Handled requests.',
+                f'# TYPE {prefix}_requests_total counter',
+            ]
+            for (view, method, status), count in sorted(
+                self.requests.items(),
+            ):
+                lines.append(
+                    f'{prefix}_requests_total'
+                    f'{{{labels(view=view, method=method, status=status)}}}'
+                    f' {count}'
+                )
+            lines += [
+                f'# HELP {prefix}_request_duration_seconds '
+                'Time to produce the response.',
+                f'# TYPE {prefix}_request_duration_seconds histogram',
+            ]
+            for view, buckets in sorted(self.durations.items()):
+                bounds = [str(bound) for bound in self.buckets] + ['+Inf']
+                for bound, count in zip(bounds, buckets):
+                    lines.append(
+                        f'{prefix}_request_duration_seconds_bucket'
+                        f'{{{labels(view=view, le=bound)}}} {count}'
+                    )
+                lines.append(
+                    f'{prefix}_request_duration_seconds_sum'
+                    f'{{{labels(view=view)}}} '
+                    f'{self.totals[view]["request_duration_seconds"]}'
+                )
+                lines.append(
+                    f'{prefix}_request_duration_seconds_count'
+                    f'{{{labels(view=view)}}} {buckets[-1]}'
+                )
+            for name, description in (
+                ('sql_queries', 'SQL queries run.'),
+                ('sql_duration_seconds', 'Time spent in SQL queries.'),
+                (
+                    'serializer_duration_seconds',
+                    'Time spent in view handlers outside SQL queries, '
+                    'mostly serializers.',
+                ),
+                ('render_duration_seconds', 'Time spent in renderers.'),
+                ('response_bytes', 'Size of response bodies.'),
+            ):
+                lines += [
+                    f'# HELP {prefix}_{name}_total {description}',
+                    f'# TYPE {prefix}_{name}_total counter',
+                ]
+                for view, totals in sorted(self.totals.items()):
+                    lines.append(
+                        f'{prefix}_{name}_total'
+                        f'{{{labels(view=view)}}} {totals[name]}'
+                    )
+        for collector in self.collectors:
+            lines += collector(prefix)
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+def metrics_view(request):
+    if not settings.PERFORMANCE_METRICS:
+        raise Http404
+    return HttpResponse(
+        registry.render(),
+        content_type=PROMETHEUS_CONTENT_TYPE,
+    )
@@ -0,0 +1,171 @@
+from contextlib import ExitStack
+
+from django.db import connections
+from django.utils.cache import patch_vary_headers
+
+from api.compression import compress, compress_stream, negotiate_encoding
+from api.diagnostics import QueryInspector
+from api.metrics import RequestMetrics, collecting, registry
+
+
+def view_name(view_func, method):
+    """Return ``ViewSet.action`` for DRF views, the function otherwise."""
+    view_class = getattr(view_func, 'cls', None)
+    if view_class is None:
+        return f'{view_func.__module__}.{view_func.__name__}'
+    actions = getattr(view_func, 'actions', None) or {}
+    action = actions.get(method.lower(), method.lower())
+    return f'{view_class.__name__}.{action}'
+
+
+def wrap_queries(stack, wrapper):
+    """Install ``wrapper`` on every database connection of the stack."""
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(wrapper))
+
+
+class PerformanceMiddleware:
+    """Measure the cost of every request.
+
+    Records the total time, SQL queries and their time, serializer and
+    renderer time and the response size. The numbers are sent back in
+    the ``Server-Timing`` header and aggregated per view for the
+    Prometheus endpoint; streamed responses are aggregated when their
+    body has been sent. Should be the first middleware, so the total
+    covers the rest of the chain.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        request.performance_metrics = metrics
+        with ExitStack() as stack:
+            stack.enter_context(collecting(metrics))
+            wrap_queries(stack, metrics.execute_wrapper)
+            response = self.get_response(request)
+        response['Server-Timing'] = metrics.server_timing()
+        if response.streaming:
+            response.streaming_content = self.measure_stream(
+                request,
+                response,
+                metrics,
+                response.streaming_content,
+            )
+            return response
+        registry.observe(
+            metrics,
+            request.method,
+            str(response.status_code),
+            len(response.content),
+        )
+        return response
+
+    def measure_stream(self, request, response, metrics, content):
+        """Yield the body, recorded once the last chunk is sent.
+
+        Streamed bodies run their queries and serializers while they are
+        iterated, after the headers and ``Server-Timing`` went out.
+        """
+        size = 0
+        try:
+            with ExitStack() as stack:
+                stack.enter_context(collecting(metrics))
+                wrap_queries(stack, metrics.execute_wrapper)
+                for chunk in content:
+                    size += len(chunk)
+                    yield chunk
+        finally:
+            registry.observe(
+                metrics,
+                request.method,
+                str(response.status_code),
+                size,
+            )
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.performance_metrics.view = view_name(
+            view_func,
+            request.method,
+        )
+
+    def process_template_response(self, request, response):
+        # Called right before the response is rendered.
+        metrics = request.performance_metrics
+        metrics.start('render')
+
+        def rendered(response):
+            metrics.stop('render')
+
+        response.add_post_render_callback(rendered)
+        return response
+
+
+class QueryDiagnosticsMiddleware:
+    """Log repeated query shapes and slow queries of every request."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        inspector = QueryInspector()
+        request.query_view = None
+        with ExitStack() as stack:
+            wrap_queries(stack, inspector)
+            try:
+                return self.get_response(request)
+            finally:
+                inspector.report(
+                    f'{request.method} {request.get_full_path()} '
+                    f'({request.query_view or "unresolved"})'
+                )
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_view = view_name(view_func, request.method)
+
+
+class CompressionMiddleware:
+    """Compress responses with the best coding the client accepts.
+
+    Brotli is offered when the ``brotli`` package is installed, gzip
+    and deflate always. Streaming responses are compressed chunk by
+    chunk and every chunk is flushed, so memory stays flat and clients
+    read the body as it is produced.
+    """
+
+    min_length = 200
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if response.has_header('Content-Encoding'):
+            return response
+        if not response.streaming and len(response.content) < self.min_length:
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = negotiate_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', ''),
+        )
+        if encoding is None:
+            return response
+        if response.streaming:
+            response.streaming_content = compress_stream(
+                encoding,
+                response.streaming_content,
+            )
+            del response['Content-Length']
+        else:
+            content = compress(encoding, response.content)
+            if len(content) >= len(response.content):
+                return response
+            response.content = content
+            response['Content-Length'] = str(len(content))
+        # The compressed body differs byte for byte from the plain one.
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = f'W/{etag}'
+        response['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,320 @@
+import hashlib
+
+from itertools import islice
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import prefetch_related_objects
+from django.http import StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework import serializers
+from rest_framework.response import Response
+
+from api.cache import resource_versions
+from api.metrics import current_metrics, timed
+from api.renderers import FastJSONRenderer
+
+
+def collect_relations(model, serializer, prefix=''):
+    """Return lookups to join and to prefetch for serializer fields."""
+    select_related = []
+    prefetch_related = []
+    for field in serializer.fields.values():
+        if field.write_only or field.source == '*':
+            continue
+        child = getattr(field, 'child', None) or getattr(
+            field, 'child_relation', field
+        )
+        if not isinstance(
+            child,
+            (serializers.BaseSerializer, serializers.RelatedField),
+        ):
+            continue
+        try:
+            model_field = model._meta.get_field(field.source.split('.')[0])
+        except FieldDoesNotExist:
+            continue
+        if not model_field.is_relation:
+            continue
+        lookup = prefix + model_field.name
+        if model_field.many_to_many or model_field.one_to_many:
+            prefetch_related.append(lookup)
+        else:
+            select_related.append(lookup)
+        if isinstance(child, serializers.BaseSerializer):
+            nested_select, nested_prefetch = collect_relations(
+                model_field.related_model,
+                child,
+                f'{lookup}__',
+            )
+            if lookup in prefetch_related:
+                nested_prefetch += nested_select
+                nested_select = []
+            select_related += nested_select
+            prefetch_related += nested_prefetch
+    return select_related, prefetch_related
+
+
+def relation_columns(model_field, field, lookup):
+    """Return ``only()`` lookups of a joined relation.
+
+    Related models not mentioned in the lookups load all their columns.
+    """
+    columns = [lookup] if model_field.concrete else []
+    if isinstance(field, serializers.BaseSerializer):
+        nested = collect_columns(
+            model_field.related_model,
+            field,
+            f'{lookup}__',
+        )
+        if nested is None:
+            return columns
+        return columns + nested
+    if isinstance(field, serializers.SlugRelatedField):
+        columns.append(f'{lookup}__{field.slug_field}')
+    return columns
+
+
+def collect_columns(model, serializer, prefix=''):
+    """Return ``only()`` lookups of the columns serializer fields read.
+
+    Returns None when a field reads anything but model fields, such as
+    a property, then all columns of the model are loaded. Prefetched
+    relations load their own columns.
+    """
+    columns = [prefix + model._meta.pk.name]
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        if field.source == '*':
+            return None
+        try:
+            model_field = model._meta.get_field(field.source.split('.')[0])
+        except FieldDoesNotExist:
+            return None
+        if model_field.many_to_many or model_field.one_to_many:
+            continue
+        lookup = prefix + model_field.name
+        if not model_field.is_relation:
+            columns.append(lookup)
+            continue
+        columns += relation_columns(model_field, field, lookup)
+    return columns
+
+
+def plan_queryset(queryset, serializer, required=()):
+    """Join or prefetch everything the serializer is going to read.
+
+    Sparse serializers also restrict the loaded columns to the ones
+    their fields and the ``required`` fields read.
+    """
+    select_related, prefetch_related = collect_relations(
+        queryset.model,
+        serializer,
+    )
+    if select_related:
+        queryset = queryset.select_related(*select_related)
+    if getattr(serializer, 'sparse', False):
+        columns = collect_columns(queryset.model, serializer)
+        if columns is not None:
+            queryset = queryset.only(*columns, *required)
+    return queryset.prefetch_related(*prefetch_related)
+
+
+class QueryPlanMixin:
+    """Plan queryset joins from the fields of the action serializer."""
+
+    def filter_queryset(self, queryset):
+        # Keyset pagination reads the ordering values of the last row.
+        return plan_queryset(
+            super().filter_queryset(queryset),
+            self.get_serializer(),
+            [key.lstrip('-') for key in getattr(self, 'cursor_ordering', ())],
+        )
+
+
+class TimedViewMixin:
+    """Report the time of the view handler as ``serializer`` time.
+
+    The handler builds the payload, its time outside SQL queries is
+    mostly serializers. Timed once per request, so nested serializers
+    and list items cost nothing extra.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        self.metrics = None
+        super().initial(request, *args, **kwargs)
+        # Not reached when authentication, permissions or a conditional
+        # request answered the request already.
+        self.metrics = current_metrics()
+        if self.metrics is not None:
+            self.metrics.start_exclusive('serializer')
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if getattr(self, 'metrics', None) is not None:
+            self.metrics.stop_exclusive('serializer')
+            self.metrics = None
+        return super().finalize_response(
+            request,
+            response,
+            *args,
+            **kwargs,
+        )
+
+
+class ValuesListMixin:
+    """Serve list pages from ``values()`` rows.
+
+    Rows skip model instances and serializer fields. ``values_fields``
+    lists the columns to read, ``values_representation`` turns the rows
+    of a page into the payload the list serializer would return.
+    Requests shaped with ``fields`` or ``expand`` use the serializer.
+    """
+
+    values_fields = ()
+
+    def use_values(self, request):
+        return bool(self.values_fields) and not {'fields', 'expand'} & set(
+            request.query_params,
+        )
+
+    def values_queryset(self, queryset):
+        return queryset.prefetch_related(None).values(*self.values_fields)
+
+    def list(self, request, *args, **kwargs):
+        if not self.use_values(request):
+            return super().list(request, *args, **kwargs)
+        queryset = self.values_queryset(
+            self.filter_queryset(self.get_queryset()),
+        )
+        page = self.paginate_queryset(queryset)
+        rows = list(queryset) if page is None else page
+        data = self.values_representation(rows)
+        if page is None:
+            return Response(data)
+        return self.get_paginated_response(data)
+
+    def values_representation(self, rows):
+        return rows
+
+
+class StreamingListMixin:
+    """Stream the whole list as a JSON array with ``?stream=true``.
+
+    Rows are read through a server-side cursor in chunks of
+    ``STREAM_CHUNK_SIZE`` and every chunk is serialized, prefetched
+    relations included, and sent before the next one is read. Memory
+    stays flat however many rows the list has. Pagination is skipped.
+    """
+
+    stream_query_param = 'stream'
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params.get(self.stream_query_param) != 'true':
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        return StreamingHttpResponse(
+            self.stream(request, queryset),
+            content_type='application/json',
+        )
+
+    def stream(self, request, queryset):
+        renderer = FastJSONRenderer()
+        use_values = getattr(self, 'use_values', None)
+        values = use_values is not None and use_values(request)
+        if values:
+            lookups = ()
+            queryset = self.values_queryset(queryset)
+        else:
+            # iterator() skips prefetching, chunks are prefetched here.
+            lookups = queryset._prefetch_related_lookups
+        rows = queryset.iterator(chunk_size=settings.STREAM_CHUNK_SIZE)
+        separator = b'['
+        while True:
+            chunk = list(islice(rows, settings.STREAM_CHUNK_SIZE))
+            if not chunk:
+                break
+            # Runs after the handler returned, while the body streams.
+            with timed('serializer', exclusive=True):
+                if values:
+                    data = self.values_representation(chunk)
+                else:
+                    prefetch_related_objects(chunk, *lookups)
+                    data = self.get_serializer(chunk, many=True).data
+            yield separator + renderer.render(data)[1:-1]
+            separator = b','
+        yield b']' if separator == b',' else b'[]'
+
+
+class NotModifiedError(Exception):
+    def __init__(self, response):
+        super().__init__()
+        self.response = response
+
+
+class ConditionalGetMixin:
+    """Answer reads with 304 while the client copy is still current.
+
+    ``version_scopes`` maps actions to resource version scopes, formatted
+    with the url kwargs. Validators are built from the version counters
+    alone, so a matching ``If-None-Match`` is answered before the
+    queryset or the serializer runs. Off unless ``CONDITIONAL_GET`` is
+    set.
+    """
+
+    version_scopes = {}
+
+    def get_versions(self, scopes):
+        """Return ``{scope: (version, modified)}`` for ``scopes``."""
+        return resource_versions.get_many(scopes)
+
+    def get_validators(self, request):
+        scopes = [
+            scope.format(**self.kwargs)
+            for scope in self.version_scopes[self.action]
+        ]
+        versions = self.get_versions(scopes)
+        digest = hashlib.sha1(request.get_full_path().encode())
+        digest.update(request.accepted_renderer.format.encode())
+        for scope in scopes:
+            digest.update(f';{scope}={versions[scope][0]}'.encode())
+        modified = max(version[1] for version in versions.values())
+        return f'W/"{digest.hexdigest()}"', int(modified)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.conditional_validators = None
+        if (
+            not settings.CONDITIONAL_GET
+            or request.method not in ('GET', 'HEAD')
+            or self.action not in self.version_scopes
+        ):
+            return
+        etag, last_modified = self.get_validators(request)
+        self.conditional_validators = etag, last_modified
+        response = get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=last_modified,
+        )
+        if response is not None:
+            raise NotModifiedError(response)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModifiedError):
+            return exc.response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request,
+            response,
+            *args,
+            **kwargs,
+        )
+        validators = getattr(self, 'conditional_validators', None)
+        if validators and response.status_code in (200, 304):
+            response['ETag'] = validators[0]
+            response['Last-Modified'] = http_date(validators[1])
+        return response
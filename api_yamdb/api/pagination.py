@@ -0,0 +1,172 @@
+import base64
+import binascii
+import json
+
+from collections import OrderedDict
+from datetime import date
+from functools import reduce
+from operator import or_
+
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def encode_cursor(position):
+    """Pack ordering values of the last row into an url-safe cursor."""
+    values = [
+        value.isoformat() if isinstance(value, date) else value
+        for value in position
+    ]
+    return base64.urlsafe_b64encode(
+        json.dumps(values, separators=(',', ':')).encode(),
+    ).decode()
+
+
+def decode_cursor(cursor, size):
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, UnicodeError, ValueError):
+        position = None
+    if not isinstance(position, list) or len(position) != size:
+        raise NotFound('Invalid cursor')
+    return position
+
+
+def keyset_condition(model, ordering, position):
+    """Build the WHERE clause selecting rows after ``position``.
+
+    NULLs are treated as greater than any value, which matches
+    PostgreSQL defaults, so ascending keys put them last and descending
+    keys put them first and the plain btree indexes stay usable.
+    """
+    conditions = []
+    equal = Q()
+    for key, value in zip(ordering, position):
+        name = key.lstrip('-')
+        nullable = model._meta.get_field(name).null
+        if value is None:
+            after = Q(**{f'{name}__isnull': False}) if key[0] == '-' else None
+            same = Q(**{f'{name}__isnull': True})
+        else:
+            lookup = 'lt' if key[0] == '-' else 'gt'
+            after = Q(**{f'{name}__{lookup}': value})
+            if nullable and key[0] != '-':
+                after |= Q(**{f'{name}__isnull': True})
+            same = Q(**{name: value})
+        if after is not None:
+            conditions.append(equal & after)
+        equal &= same
+    if not conditions:
+        return Q(pk__in=[])
+    return reduce(or_, conditions)
+
+
+def keyset_order_by(ordering):
+    return [
+        F(key[1:]).desc(nulls_first=True)
+        if key[0] == '-'
+        else F(key).asc(nulls_last=True)
+        for key in ordering
+    ]
+
+
+class KeysetLimitOffsetPagination(LimitOffsetPagination):
+    """Limit/offset pagination with opt-in keyset mode.
+
+    Views declaring ``cursor_ordering`` (ending with a unique key) are
+    paginated by keyset when the ``cursor`` query parameter is present,
+    an empty value starts from the first page. ``count=false`` skips
+    the exact total count in both modes.
+    """
+
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.mode = 'offset'
+        ordering = getattr(view, 'cursor_ordering', None)
+        if ordering and self.cursor_query_param in request.query_params:
+            self.mode = 'keyset'
+            return self.paginate_keyset(queryset, request, ordering)
+        if request.query_params.get(self.count_query_param) == 'false':
+            self.mode = 'countless'
+            return self.paginate_countless(queryset, request)
+        return super().paginate_queryset(queryset, request, view)
+
+    def paginate_keyset(self, queryset, request, ordering):
+        self.limit = self.get_limit(request) or self.default_limit
+        cursor = request.query_params[self.cursor_query_param]
+        if cursor:
+            queryset = queryset.filter(
+                keyset_condition(
+                    queryset.model,
+                    ordering,
+                    decode_cursor(cursor, len(ordering)),
+                ),
+            )
+        queryset = queryset.order_by(*keyset_order_by(ordering))
+        results = list(queryset[:self.limit + 1])
+        self.next_position = None
+        if len(results) > self.limit:
+            results = results[:self.limit]
+            last = results[-1]
+            # Rows of ``values()`` querysets are dicts.
+            get = last.get if isinstance(last, dict) else last.__getattribute__
+            self.next_position = [get(key.lstrip('-')) for key in ordering]
+        return results
+
+    def paginate_countless(self, queryset, request):
+        self.limit = self.get_limit(request) or self.default_limit
+        self.offset = self.get_offset(request)
+        self.count = None
+        results = list(queryset[self.offset:self.offset + self.limit + 1])
+        self.has_next = len(results) > self.limit
+        return results[:self.limit]
+
+    def get_next_link(self):
+        if self.mode == 'offset':
+            return super().get_next_link()
+        if self.mode == 'countless':
+            if not self.has_next:
+                return None
+            url = self.request.build_absolute_uri()
+            url = replace_query_param(url, self.limit_query_param, self.limit)
+            return replace_query_param(
+                url,
+                self.offset_query_param,
+                self.offset + self.limit,
+            )
+        if self.next_position is None:
+            return None
+        url = remove_query_param(
+            self.request.build_absolute_uri(),
+            self.offset_query_param,
+        )
+        return replace_query_param(
+            url,
+            self.cursor_query_param,
+            encode_cursor(self.next_position),
+        )
+
+    def get_paginated_response(self, data):
+        if self.mode == 'offset':
+            return super().get_paginated_response(data)
+        if self.mode == 'countless':
+            return Response(OrderedDict([
+                ('next', self.get_next_link()),
+                ('previous', self.get_previous_link()),
+                ('results', data),
+            ]))
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+    def to_html(self):
+        if self.mode != 'offset':
+            return ''
+        return super().to_html()
@@ -0,0 +1,44 @@
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer encoding with orjson when it is installed.
+
+    Types orjson does not know, datetimes included, go through the DRF
+    encoder, so the output matches ``JSONRenderer``. Indented responses,
+    such as the browsable API ones, use the stdlib encoder.
+    """
+
+    encoder = JSONEncoder()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.get_indent(
+            accepted_media_type,
+            renderer_context or {},
+        ) is not None:
+            return super().render(
+                data,
+                accepted_media_type,
+                renderer_context,
+            )
+        ret = orjson.dumps(
+            data,
+            default=self.encoder.default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME,
+        )
+        # Keep the output a strict javascript subset, like JSONRenderer.
+        if b'\xe2\x80' not in ret:
+            return ret
+        return ret.replace(
+            b'\xe2\x80\xa8',
+            b'\\u2028',
+        ).replace(
+            b'\xe2\x80\xa9',
+            b'\\u2029',
+        )
@@ -0,0 +1,145 @@
+import math
+import re
+import threading
+
+from collections import Counter, defaultdict
+
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+    TrigramSimilarity,
+)
+from django.db import connections
+from django.db.models import Case, FloatField, Q, Value, When
+
+from api.cache import resource_versions
+from reviews.models import Title
+
+# Must match the expression index created by reviews 0004_title_search.
+SEARCH_CONFIG = 'russian'
+# Default pg_trgm.similarity_threshold.
+SIMILARITY_THRESHOLD = 0.3
+WORD = re.compile(r'\w+')
+
+
+def words(text):
+    return WORD.findall(text.lower().replace('ё', 'е'))
+
+
+def trigrams(text):
+    """Return trigrams of every word, padded the way pg_trgm does."""
+    result = set()
+    for word in words(text):
+        padded = f'  {word} '
+        result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return result
+
+
+def similarity(left, right):
+    if not left or not right:
+        return 0.0
+    return len(left & right) / len(left | right)
+
+
+class PostgresTitleSearch:
+    """Full-text match on the GIN tsvector index, trigram match on name.
+
+    Both conditions are served by their own index and combined with a
+    bitmap OR, the rank adds ``ts_rank`` and the name similarity.
+    """
+
+    def search(self, queryset, query):
+        document = SearchVector('name', 'description', config=SEARCH_CONFIG)
+        search_query = SearchQuery(query, config=SEARCH_CONFIG)
+        return queryset.annotate(
+            document=document,
+            search_rank=(
+                SearchRank(document, search_query)
+                + TrigramSimilarity('name', query)
+            ),
+        ).filter(Q(document=search_query) | Q(name__trigram_similar=query))
+
+
+class InvertedIndex:
+    """In-memory inverted index over title names and descriptions."""
+
+    def __init__(self, rows):
+        self.postings = defaultdict(dict)
+        self.name_trigrams = {}
+        for pk, name, description in rows:
+            for word, count in Counter(words(f'{name} {description}')).items():
+                self.postings[word][pk] = count
+            self.name_trigrams[pk] = trigrams(name)
+
+    def search(self, query, limit):
+        """Return ``(pk, rank)`` pairs, the best match first.
+
+        Like ``plainto_tsquery`` every word of the query has to match,
+        titles with a similar name are added as in the PostgreSQL
+        backend.
+        """
+        scores = Counter()
+        matched = [self.postings.get(word, {}) for word in set(words(query))]
+        if matched and all(matched):
+            size = len(self.name_trigrams)
+            found = set.intersection(*(set(postings) for postings in matched))
+            for pk in found:
+                scores[pk] = sum(
+                    postings[pk] * math.log(1 + size / len(postings))
+                    for postings in matched
+                )
+        query_trigrams = trigrams(query)
+        for pk, name_trigrams in self.name_trigrams.items():
+            value = similarity(query_trigrams, name_trigrams)
+            if value > SIMILARITY_THRESHOLD:
+                scores[pk] += value
+        return scores.most_common(limit)
+
+
+class InvertedIndexTitleSearch:
+    """Search backend for databases without full-text search (SQLite).
+
+    The index is rebuilt when the titles resource version changes.
+    Results are capped by ``limit`` to stay below the SQLite limit of
+    query parameters.
+    """
+
+    limit = 300
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.indexes = {}
+
+    def get_index(self, using):
+        version = resource_versions.get('titles')
+        with self.lock:
+            if self.indexes.get(using, (None, None))[0] != version:
+                rows = Title.objects.using(using).values_list(
+                    'pk',
+                    'name',
+                    'description',
+                )
+                self.indexes[using] = version, InvertedIndex(rows)
+            return self.indexes[using][1]
+
+    def search(self, queryset, query):
+        ranked = self.get_index(queryset.db).search(query, self.limit)
+        if not ranked:
+            return queryset.none()
+        return queryset.filter(pk__in=[pk for pk, _ in ranked]).annotate(
+            search_rank=Case(
+                *[When(pk=pk, then=Value(rank)) for pk, rank in ranked],
+                output_field=FloatField(),
+            ),
+        )
+
+
+postgres_title_search = PostgresTitleSearch()
+inverted_index_title_search = InvertedIndexTitleSearch()
+
+
+def get_title_search(using):
+    if connections[using].vendor == 'postgresql':
+        return postgres_title_search
+    return inverted_index_title_search
@@ -3,7 +3,63 @@ from rest_framework import serializers
 from rest_framework.generics import get_object_or_404
 from rest_framework.validators import UniqueValidator
 
-from reviews.models import Category, Comment, Genre, Review, Title, User
+from api.cache import catalog_cache
+from reviews.models import (
+    Category,
+    Comment,
+    Genre,
+    LeaderboardEntry,
+    Review,
+    Title,
+    TitleStats,
+    User,
+)
+
+
+class ShapedSerializerMixin:
+    """Shape read payloads with the ``fields`` and ``expand`` parameters.
+
+    ``?fields=id,name`` keeps the listed fields only, ``?expand=stats``
+    adds fields of ``Meta.expandable_fields``, left out by default. Only
+    the top level serializer of a response is shaped. For a sparse
+    serializer the query planner loads just the columns it reads.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        params = getattr(request, 'query_params', {})
+        expand = set(params.get('expand', '').split(','))
+        for name in getattr(self.Meta, 'expandable_fields', ()):
+            if name not in expand:
+                self.fields.pop(name, None)
+        fields = params.get('fields')
+        self.sparse = bool(fields) and request.method in ('GET', 'HEAD')
+        if self.sparse:
+            requested = set(fields.split(',')) | expand
+            for name in list(self.fields):
+                if name not in requested:
+                    self.fields.pop(name)
+
+
+class CachedSlugRelatedField(serializers.SlugRelatedField):
+    """SlugRelatedField resolving slugs through the catalog cache."""
+
+    def to_internal_value(self, data):
+        queryset = self.get_queryset()
+        model = queryset.model
+        pk = catalog_cache.slug_to_pk(model, str(data))
+        if pk is None:
+            self.fail(
+                'does_not_exist',
+                slug_name=self.slug_field,
+                value=str(data),
+            )
+        return model.from_db(
+            queryset.db,
+            [model._meta.pk.attname, self.slug_field],
+            [pk, str(data)],
+        )
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -32,7 +88,31 @@ class GenreSerializer(serializers.ModelSerializer):
         return value
 
 
-class TitleReadSerializer(serializers.ModelSerializer):
+class TitleStatsSerializer(serializers.ModelSerializer):
+    rating = serializers.FloatField(read_only=True)
+    recent_rating = serializers.FloatField(read_only=True)
+    trend = serializers.FloatField(read_only=True)
+    histogram = serializers.DictField(
+        child=serializers.IntegerField(),
+        read_only=True,
+    )
+
+    class Meta:
+        model = TitleStats
+        fields = (
+            'review_count',
+            'rating',
+            'recent_rating',
+            'trend',
+            'histogram',
+            'last_review_at',
+        )
+
+
+class TitleReadSerializer(
+    ShapedSerializerMixin,
+    serializers.ModelSerializer,
+):
     genre = GenreSerializer(
         many=True,
     )
@@ -41,6 +121,9 @@ class TitleReadSerializer(serializers.ModelSerializer):
         default=None,
         read_only=True,
     )
+    stats = TitleStatsSerializer(
+        read_only=True,
+    )
 
     class Meta:
         model = Title
@@ -52,16 +135,37 @@ class TitleReadSerializer(serializers.ModelSerializer):
             'category',
             'description',
             'rating',
+            'stats',
+        )
+        expandable_fields = ('stats',)
+
+
+class LeaderboardEntrySerializer(
+    ShapedSerializerMixin,
+    serializers.ModelSerializer,
+):
+    title = TitleReadSerializer(
+        read_only=True,
+    )
+
+    class Meta:
+        model = LeaderboardEntry
+        fields = (
+            'position',
+            'score',
+            'rating',
+            'review_count',
+            'title',
         )
 
 
 class TitleCreateSerializer(serializers.ModelSerializer):
-    genre = serializers.SlugRelatedField(
+    genre = CachedSlugRelatedField(
         slug_field='slug',
         many=True,
         queryset=Genre.objects.all(),
     )
-    category = serializers.SlugRelatedField(
+    category = CachedSlugRelatedField(
         slug_field='slug',
         queryset=Category.objects.all(),
     )
@@ -78,7 +182,10 @@ class TitleCreateSerializer(serializers.ModelSerializer):
         )
 
 
-class ReviewSerializer(serializers.ModelSerializer):
+class ReviewSerializer(
+    ShapedSerializerMixin,
+    serializers.ModelSerializer,
+):
     author = serializers.SlugRelatedField(
         read_only=True,
         slug_field='username',
@@ -116,7 +223,10 @@ class ReviewSerializer(serializers.ModelSerializer):
         return data
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(
+    ShapedSerializerMixin,
+    serializers.ModelSerializer,
+):
     review = serializers.SlugRelatedField(
         slug_field='text',
         read_only=True,
@@ -131,6 +241,62 @@ class CommentSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
+class BulkTitleSerializer(serializers.ModelSerializer):
+    """Title of a feed, slugs are resolved for the whole batch."""
+
+    genre = serializers.ListField(
+        child=serializers.SlugField(),
+    )
+    category = serializers.SlugField()
+
+    class Meta:
+        model = Title
+        fields = (
+            'name',
+            'year',
+            'genre',
+            'category',
+            'description',
+        )
+
+
+class BulkReviewSerializer(serializers.ModelSerializer):
+    """Review of a batch, relations are resolved for the whole batch."""
+
+    title = serializers.IntegerField(min_value=1)
+    author = serializers.CharField(
+        max_length=150,
+        required=False,
+    )
+
+    class Meta:
+        model = Review
+        fields = (
+            'title',
+            'author',
+            'text',
+            'score',
+        )
+
+
+class BulkCommentSerializer(serializers.ModelSerializer):
+    """Comment of a batch, relations are resolved for the whole batch."""
+
+    review = serializers.IntegerField(min_value=1)
+    author = serializers.CharField(
+        max_length=150,
+        required=False,
+    )
+
+    class Meta:
+        model = Comment
+        fields = (
+            'review',
+            'author',
+            'text',
+        )
+
+
 class UserSerializer(serializers.ModelSerializer):
     email = serializers.EmailField(
         max_length=254,
@@ -0,0 +1,95 @@
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_save,
+)
+from django.dispatch import receiver
+
+from api.cache import catalog_cache, resource_versions, user_cache
+from reviews.models import (
+    Category,
+    Comment,
+    Genre,
+    GenreTitle,
+    Review,
+    Title,
+    User,
+)
+
+
+@receiver(pre_save, sender=Category)
+@receiver(pre_save, sender=Genre)
+def forget_previous_slug(sender, instance, raw=False, **kwargs):
+    if raw or instance.pk is None:
+        return
+    slug = (
+        sender.objects.filter(pk=instance.pk)
+        .values_list('slug', flat=True)
+        .first()
+    )
+    if slug is not None and slug != instance.slug:
+        catalog_cache.invalidate(sender._meta.model_name, slug)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Genre)
+def invalidate_catalog(sender, instance, **kwargs):
+    catalog_cache.invalidate(sender._meta.model_name, instance.slug)
+
+
+@receiver(post_save, sender=Title)
+@receiver(post_delete, sender=Title)
+def bump_title(sender, instance, **kwargs):
+    resource_versions.bump('titles', f'title:{instance.pk}')
+
+
+@receiver(post_save, sender=GenreTitle)
+@receiver(post_delete, sender=GenreTitle)
+def bump_genre_title(sender, instance, **kwargs):
+    resource_versions.bump('titles', f'title:{instance.title_id_id}')
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def bump_title_genres(sender, instance, action, reverse, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if reverse:
+        # Titles of a genre changed, every title detail embeds the
+        # genre catalog version.
+        resource_versions.bump('titles', 'genre')
+    else:
+        resource_versions.bump('titles', f'title:{instance.pk}')
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def bump_review(sender, instance, **kwargs):
+    resource_versions.bump(
+        'titles',
+        f'title:{instance.title_id}',
+        f'reviews:{instance.title_id}',
+        f'comments:{instance.pk}',
+    )
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def bump_comment(sender, instance, **kwargs):
+    resource_versions.bump(f'comments:{instance.review_id}')
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def bump_users(sender, instance, created=False, **kwargs):
+    # Roles and activity of authenticated users are read from the cache.
+    user_cache.invalidate(instance.pk)
+    # Reviews and comments show author usernames, which only a rename
+    # changes; reviews and comments of a deleted user bump themselves.
+    renamed = (
+        getattr(instance, '_loaded_username', None) != instance.username
+    )
+    if not created and renamed:
+        resource_versions.bump('users')
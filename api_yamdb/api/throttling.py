@@ -0,0 +1,161 @@
+import time
+
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+# Seconds per period of a rate, keyed by the first letter of the period.
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """Return ``(requests, seconds)`` of a rate such as ``'10/min'``."""
+    requests, period = rate.split('/')
+    return int(requests), PERIODS[period[0]]
+
+
+def take(state, now, capacity, refill):
+    """Spend a token of a bucket.
+
+    ``state`` is ``(tokens, updated)`` or None for a full bucket, tokens
+    come back at ``refill`` per second up to ``capacity``. Return whether
+    the request is allowed, the new state and the seconds to wait when it
+    is not.
+    """
+    if state is None:
+        tokens = capacity
+    else:
+        tokens, updated = state
+        tokens = min(capacity, tokens + (now - updated) * refill)
+    if tokens >= 1:
+        return True, (tokens - 1, now), None
+    return False, (tokens, now), (1 - tokens) / refill
+
+
+class LocalBucketStore:
+    """Buckets in a dict of this process.
+
+    Getting and setting a key of a dict to an immutable tuple is atomic
+    under the GIL, so no lock is taken. Racing requests of one client may
+    spend the same token, which only lets a request through early. The
+    oldest buckets are dropped past ``max_entries``; a dropped bucket
+    comes back full, as it would after a quiet period.
+    """
+
+    def __init__(self, max_entries=100000):
+        self.max_entries = max_entries
+        self.buckets = {}
+
+    def get(self, key):
+        return self.buckets.get(key)
+
+    def set(self, key, state, timeout):
+        buckets = self.buckets
+        if key not in buckets and len(buckets) >= self.max_entries:
+            try:
+                del buckets[next(iter(buckets))]
+            except (KeyError, RuntimeError, StopIteration):
+                # Another thread changed the dict first.
+                pass
+        buckets[key] = state
+
+
+class CacheBucketStore:
+    """Buckets in a Django cache shared by all processes.
+
+    Like the local store it reads and writes without a lock. Keys expire
+    once the bucket would have refilled, so idle clients cost nothing.
+    """
+
+    prefix = 'throttle'
+
+    def __init__(self, alias=None):
+        self.alias = alias
+
+    @property
+    def cache(self):
+        return caches[self.alias or settings.THROTTLE_CACHE_ALIAS]
+
+    def get(self, key):
+        return self.cache.get(f'{self.prefix}:{key}')
+
+    def set(self, key, state, timeout):
+        self.cache.set(f'{self.prefix}:{key}', state, timeout)
+
+
+@lru_cache(maxsize=None)
+def get_bucket_store(path):
+    """Return the shared store instance of the class at ``path``."""
+    return import_string(path)()
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Token bucket per client and scope.
+
+    A rate ``'N/period'`` from ``DEFAULT_THROTTLE_RATES`` gives a bucket
+    of N tokens refilled at N per period: a client may burst N requests
+    and then keeps the average rate. A check reads and writes one key of
+    the store. Users are told apart by id, anonymous clients by address.
+    """
+
+    scope = None
+    rate = None
+    store = None
+
+    def __init__(self):
+        self.retry_after = None
+
+    def get_scope(self, view):
+        return self.scope
+
+    def get_rate(self, scope):
+        if self.rate is not None:
+            return self.rate
+        return api_settings.DEFAULT_THROTTLE_RATES.get(scope)
+
+    def get_store(self):
+        if self.store is not None:
+            return self.store
+        return get_bucket_store(settings.THROTTLE_STORE)
+
+    def get_key(self, request, scope):
+        user = request.user
+        if user and user.is_authenticated:
+            return f'{scope}:user:{user.pk}'
+        return f'{scope}:ip:{self.get_ident(request)}'
+
+    def allow_request(self, request, view):
+        scope = self.get_scope(view)
+        rate = self.get_rate(scope)
+        if scope is None or rate is None:
+            return True
+        capacity, period = parse_rate(rate)
+        store = self.get_store()
+        key = self.get_key(request, scope)
+        allowed, state, self.retry_after = take(
+            store.get(key),
+            time.time(),
+            capacity,
+            capacity / period,
+        )
+        store.set(key, state, period)
+        return allowed
+
+    def wait(self):
+        return self.retry_after
+
+
+class ScopedTokenBucketThrottle(TokenBucketThrottle):
+    """Token bucket of the scope the view maps its action to.
+
+    Views list ``throttle_scopes = {action: scope}``; other actions and
+    views are not throttled.
+    """
+
+    def get_scope(self, view):
+        scopes = getattr(view, 'throttle_scopes', None) or {}
+        return scopes.get(getattr(view, 'action', None))
@@ -29,6 +29,16 @@ router_v1.register(
     views.CommentViewSet,
     basename='comments',
 )
+router_v1.register(
+    'leaderboards',
+    views.LeaderboardViewSet,
+    basename='leaderboards',
+)
+router_v1.register(
+    r'leaderboards/(?P<board>genre|category|year)/(?P<key>[-\w]+)',
+    views.LeaderboardViewSet,
+    basename='leaderboard',
+)
 router_v1.register(
     'users',
     views.UserViewSet,
@@ -40,6 +50,16 @@ urlpatterns = [
         'v1/',
         include(router_v1.urls),
     ),
+    path(
+        'v1/reviews/bulk/',
+        views.ReviewBulkViewSet.as_view({'post': 'create'}),
+        name='reviews-bulk',
+    ),
+    path(
+        'v1/comments/bulk/',
+        views.CommentBulkViewSet.as_view({'post': 'create'}),
+        name='comments-bulk',
+    ),
     path(
         'v1/auth/signup/',
         views.AuthViewSet.as_view({'post': 'signup'}),
@@ -1,7 +1,9 @@
 import uuid
 
-from django.core.mail import send_mail
-from django.db.models import Avg
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Max
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import decorators, filters, mixins, status, viewsets
 from rest_framework.decorators import action
@@ -11,39 +13,147 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import RefreshToken
 
-from api import permissions, serializers
-from api.filters import TitleFilter
+from api import bulk, permissions, serializers
+from api.cache import catalog_cache
+from api.filters import TitleFilter, TitleSearchFilter
+from api.mixins import (
+    ConditionalGetMixin,
+    QueryPlanMixin,
+    StreamingListMixin,
+    TimedViewMixin,
+    ValuesListMixin,
+)
 from reviews import models
+from reviews.outbox import queue_mail
 
 
-class TitleViewSet(viewsets.ModelViewSet):
+class TitleViewSet(
+    TimedViewMixin,
+    ConditionalGetMixin,
+    StreamingListMixin,
+    ValuesListMixin,
+    QueryPlanMixin,
+    viewsets.ModelViewSet,
+):
     permission_classes = [
         permissions.IsAdmin,
     ]
-    queryset = models.Title.objects.annotate(
-        rating=Avg('reviews__score'),
-    )
+    queryset = models.Title.objects.all()
     filter_backends = [
         DjangoFilterBackend,
         filters.OrderingFilter,
+        TitleSearchFilter,
     ]
     ordering = ('-rating',)
+    cursor_ordering = ('-rating', 'name', 'id')
+    version_scopes = {
+        'list': ('titles', 'category', 'genre'),
+        'retrieve': ('title:{pk}', 'category', 'genre'),
+        'stats': ('title:{pk}',),
+    }
+    throttle_scopes = {
+        'bulk': 'bulk',
+    }
     filterset_class = TitleFilter
+    values_fields = (
+        'id',
+        'name',
+        'year',
+        'category__name',
+        'category__slug',
+        'description',
+        'rating',
+    )
 
     def get_serializer_class(self):
         if self.action == 'list' or self.action == 'retrieve':
             return serializers.TitleReadSerializer
+        if self.action == 'stats':
+            return serializers.TitleStatsSerializer
         return serializers.TitleCreateSerializer
 
+    def values_representation(self, rows):
+        # Same payload as TitleReadSerializer.
+        genres = defaultdict(list)
+        for title_id, name, slug in models.GenreTitle.objects.filter(
+            title_id__in=[row['id'] for row in rows],
+            genre_id__isnull=False,
+        ).values_list('title_id_id', 'genre_id__name', 'genre_id__slug'):
+            genres[title_id].append({'name': name, 'slug': slug})
+        return [
+            {
+                'id': row['id'],
+                'name': row['name'],
+                'year': row['year'],
+                'genre': genres[row['id']],
+                'category': None if row['category__slug'] is None else {
+                    'name': row['category__name'],
+                    'slug': row['category__slug'],
+                },
+                'description': row['description'],
+                'rating': (
+                    None if row['rating'] is None else int(row['rating'])
+                ),
+            }
+            for row in rows
+        ]
+
+    @action(detail=True, methods=['GET'])
+    def stats(self, request, pk=None):
+        stats = get_object_or_404(models.TitleStats, title=pk)
+        return Response(self.get_serializer(stats).data)
+
+    @action(detail=False, methods=['POST'])
+    def bulk(self, request):
+        return Response(
+            bulk.TitleBulkWriter(request, self).write(request.data),
+            status=status.HTTP_200_OK,
+        )
+
     def get_permissions(self):
-        if self.action == 'list' or self.action == 'retrieve':
+        if self.action in ('list', 'retrieve', 'stats'):
             return [
                 permissions.IsAdminOrReadOnly(),
             ]
         return super().get_permissions()
 
 
+class LeaderboardViewSet(
+    TimedViewMixin,
+    ConditionalGetMixin,
+    QueryPlanMixin,
+    mixins.ListModelMixin,
+    viewsets.GenericViewSet,
+):
+    """Top titles overall, of a genre, a category or a year."""
+
+    serializer_class = serializers.LeaderboardEntrySerializer
+    cursor_ordering = ('position',)
+    # Boards, titles included, only change when they are refreshed.
+    version_scopes = {
+        'list': ('leaderboards',),
+    }
+
+    def get_versions(self, scopes):
+        # Boards are refreshed by a process that may not share the
+        # versions cache, the time of the last refresh is their version.
+        refreshed_at = models.LeaderboardEntry.objects.aggregate(
+            refreshed_at=Max('refreshed_at'),
+        )['refreshed_at']
+        refreshed = refreshed_at.timestamp() if refreshed_at else 0
+        return {'leaderboards': (refreshed, refreshed)}
+
+    def get_queryset(self):
+        return models.LeaderboardEntry.objects.filter(
+            board=self.kwargs.get('board', models.LeaderboardEntry.ALL),
+            key=self.kwargs.get('key', ''),
+        ).order_by('position')
+
+
 class CategoryGenreViewSet(
+    TimedViewMixin,
+    ConditionalGetMixin,
+    ValuesListMixin,
     mixins.ListModelMixin,
     mixins.CreateModelMixin,
     mixins.DestroyModelMixin,
@@ -65,26 +175,53 @@ class CategoryGenreViewSet(
             ]
         return super().get_permissions()
 
+    def list(self, request, *args, **kwargs):
+        uncached_list = super().list
+        return Response(
+            catalog_cache.get_page(
+                self.queryset.model._meta.model_name,
+                request.build_absolute_uri(),
+                lambda: uncached_list(request, *args, **kwargs).data,
+            )
+        )
+
 
 class CategoryViewSet(CategoryGenreViewSet):
     queryset = models.Category.objects.all()
     serializer_class = serializers.CategorySerializer
+    version_scopes = {'list': ('category',)}
+    values_fields = ('name', 'slug')
 
 
 class GenreViewSet(CategoryGenreViewSet):
     queryset = models.Genre.objects.all()
     serializer_class = serializers.GenreSerializer
+    version_scopes = {'list': ('genre',)}
+    values_fields = ('name', 'slug')
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(
+    TimedViewMixin,
+    ConditionalGetMixin,
+    QueryPlanMixin,
+    viewsets.ModelViewSet,
+):
     serializer_class = serializers.CommentSerializer
+    cursor_ordering = ('-pub_date', '-id')
+    version_scopes = {
+        'list': ('comments:{review_id}', 'users'),
+        'retrieve': ('comments:{review_id}', 'users'),
+    }
+    throttle_scopes = {
+        'create': 'comment_create',
+    }
     permission_classes = [
         permissions.ForReview,
     ]
 
     def get_queryset(self):
         review_id = get_object_or_404(
-            models.Review,
+            models.Review.objects.only('pk'),
             pk=self.kwargs.get('review_id'),
         )
         return models.Comment.objects.filter(
@@ -102,11 +239,25 @@ class CommentViewSet(viewsets.ModelViewSet):
         )
 
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(
+    TimedViewMixin,
+    ConditionalGetMixin,
+    StreamingListMixin,
+    QueryPlanMixin,
+    viewsets.ModelViewSet,
+):
     permission_classes = [
         permissions.ForReview,
     ]
     serializer_class = serializers.ReviewSerializer
+    cursor_ordering = ('pub_date', 'id')
+    version_scopes = {
+        'list': ('reviews:{title_id}', 'users'),
+        'retrieve': ('reviews:{title_id}', 'users'),
+    }
+    throttle_scopes = {
+        'create': 'review_create',
+    }
 
     def get_queryset(self):
         title = get_object_or_404(
@@ -126,7 +277,39 @@ class ReviewViewSet(viewsets.ModelViewSet):
         )
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class BulkViewSet(
+    TimedViewMixin,
+    viewsets.ViewSet,
+):
+    """Create, update and delete a batch of objects in one request."""
+
+    permission_classes = [
+        IsAuthenticated,
+    ]
+    writer_class = None
+    throttle_scopes = {
+        'create': 'bulk',
+    }
+
+    def create(self, request):
+        return Response(
+            self.writer_class(request, self).write(request.data),
+            status=status.HTTP_200_OK,
+        )
+
+
+class ReviewBulkViewSet(BulkViewSet):
+    writer_class = bulk.ReviewBulkWriter
+
+
+class CommentBulkViewSet(BulkViewSet):
+    writer_class = bulk.CommentBulkWriter
+
+
+class UserViewSet(
+    TimedViewMixin,
+    viewsets.ModelViewSet,
+):
     permission_classes = [
         permissions.IsAdmin,
     ]
@@ -174,8 +357,15 @@ class UserViewSet(viewsets.ModelViewSet):
         )
 
 
-class AuthViewSet(viewsets.ModelViewSet):
+class AuthViewSet(
+    TimedViewMixin,
+    viewsets.ModelViewSet,
+):
     queryset = models.User.objects.all()
+    throttle_scopes = {
+        'signup': 'signup',
+        'token': 'token',
+    }
 
     def get_serializer_class(self):
         if self.action == 'signup':
@@ -195,16 +385,17 @@ class AuthViewSet(viewsets.ModelViewSet):
                     serializer.data,
                     status=status.HTTP_200_OK,
                 )
-            serializer.save()
-            user = user.first()
-            user.confirmation_code = str(uuid.uuid4())
-            user.save()
-            send_mail(
-                message=f'confirmation code: {user.confirmation_code}',
-                recipient_list=[user.email],
-                subject='confirmation code',
-                from_email='kob87@list.ru',
-            )
+            # The code is mailed by send_queued_mail after the commit.
+            with transaction.atomic():
+                serializer.save()
+                user = user.first()
+                user.confirmation_code = str(uuid.uuid4())
+                user.save()
+                queue_mail(
+                    message=f'confirmation code: {user.confirmation_code}',
+                    recipient_list=[user.email],
+                    subject='confirmation code',
+                )
             return Response(serializer.data, status=status.HTTP_200_OK)
         return Response(serializer.data, status=status.HTTP_400_BAD_REQUEST)
 
@@ -0,0 +1,17 @@
+"""
+ASGI config for YaMDb project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Django 2.2 has no ASGI handler of its own, so the WSGI application is served
+from the thread pools of ``api.asgi.PooledASGIHandler``.
+"""
+
+import os
+
+from django.core.wsgi import get_wsgi_application
+
+from api.asgi import PooledASGIHandler
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_yamdb.settings')
+
+application = PooledASGIHandler(get_wsgi_application())
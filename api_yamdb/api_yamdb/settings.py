@@ -6,9 +6,10 @@ from pathlib import Path
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = (
-    os.getenv('SECRET_KEY'),
-    'my_mega_secret_code_ilz@4zqj=rq&agdol^##zgl9(vs')
+SECRET_KEY = os.getenv(
+    'SECRET_KEY',
+    default='my_mega_secret_code_ilz@4zqj=rq&agdol^##zgl9(vs',
+)
 
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = False
@@ -24,15 +25,17 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'django_filters',
     'rest_framework',
     'rest_framework_simplejwt',
-    'api',
-    'reviews',
+    'api.apps.ApiConfig',
+    'reviews.apps.ReviewsConfig',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'api.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -41,6 +44,19 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Server-Timing headers and Prometheus metrics at /metrics/.
+PERFORMANCE_METRICS = os.getenv('PERFORMANCE_METRICS', default='') == 'True'
+if PERFORMANCE_METRICS:
+    MIDDLEWARE.insert(0, 'api.middleware.PerformanceMiddleware')
+
+# Logs query shapes repeated within a request and slow queries with the
+# Python stack that issued them.
+QUERY_DIAGNOSTICS = os.getenv('QUERY_DIAGNOSTICS', default='') == 'True'
+QUERY_REPEAT_THRESHOLD = int(os.getenv('QUERY_REPEAT_THRESHOLD', default=3))
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', default=100))
+if QUERY_DIAGNOSTICS:
+    MIDDLEWARE.insert(0, 'api.middleware.QueryDiagnosticsMiddleware')
+
 ROOT_URLCONF = 'api_yamdb.urls'
 
 TEMPLATES_DIR = BASE_DIR / 'templates'
@@ -62,6 +78,11 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'api_yamdb.wsgi.application'
 
+# Threads per ASGI worker for the read endpoints and for the rest, they
+# bound the database connections a worker opens.
+ASGI_READ_THREADS = int(os.getenv('ASGI_READ_THREADS', default=16))
+ASGI_WRITE_THREADS = int(os.getenv('ASGI_WRITE_THREADS', default=4))
+
 DATABASES = {
     'default': {
         'ENGINE': os.getenv('DB_ENGINE', default='django.db.backends.postgresql'),
@@ -69,9 +90,66 @@ DATABASES = {
         'USER': os.getenv('POSTGRES_USER', default='postgres'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', default='postgres'),
         'HOST': os.getenv('DB_HOST', default='db'),
-        'PORT': os.getenv('DB_PORT', default='5432')
+        'PORT': os.getenv('DB_PORT', default='5432'),
+        # Seconds a connection is kept open between requests.
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', default=60)),
+        # Read by the api.backends.postgresql engine, which checks
+        # connections out of a pool per worker process instead. Every
+        # ASGI thread may hold one, a smaller pool makes them wait.
+        'POOL': {
+            'MAX_SIZE': int(os.getenv(
+                'DB_POOL_SIZE',
+                default=ASGI_READ_THREADS + ASGI_WRITE_THREADS,
+            )),
+            'TIMEOUT': float(os.getenv('DB_POOL_TIMEOUT', default=5)),
+        },
     }
 }
+# Idle seconds after which a connection is pinged before reuse.
+DB_HEALTH_CHECK_INTERVAL = int(
+    os.getenv('DB_HEALTH_CHECK_INTERVAL', default=30),
+)
+
+# Cache
+# Local memory is per process: the image runs a single gunicorn worker.
+# Point CACHE_BACKEND at FileBasedCache or a Redis backend when running
+# several workers so that invalidation reaches all of them.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache',
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', default='yamdb'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    }
+}
+
+CATALOG_CACHE_ALIAS = 'default'
+VERSIONS_CACHE_ALIAS = 'default'
+CATALOG_CACHE_TIMEOUT = 300
+VERSIONS_CACHE_TIMEOUT = 300
+# ETag and Last-Modified of reads are built from the version counters in
+# VERSIONS_CACHE_ALIAS. With several workers they need a cache shared by
+# all of them, or a worker answers 304 for data changed through another;
+# the api.E001 check refuses a per-process cache.
+CONDITIONAL_GET = os.getenv('CONDITIONAL_GET', default='') == 'True'
+# Seconds a worker serves a user from its cache. Changes to a user drop
+# it in every worker sharing VERSIONS_CACHE_ALIAS; with the per-process
+# default cache this bounds how long a role change or a ban made through
+# another worker goes unnoticed.
+AUTH_USER_CACHE_TTL = int(os.getenv('AUTH_USER_CACHE_TTL', default=30))
+# Token buckets of the throttled actions live in this process by default;
+# api.throttling.CacheBucketStore shares them through THROTTLE_CACHE_ALIAS
+# between all workers.
+THROTTLE_STORE = os.getenv(
+    'THROTTLE_STORE',
+    default='api.throttling.LocalBucketStore',
+)
+THROTTLE_CACHE_ALIAS = 'default'
 
 # Password validation
 
@@ -115,25 +193,91 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.CachedJWTAuthentication',
+    ],
+    'DEFAULT_THROTTLE_CLASSES': [
+        'api.throttling.ScopedTokenBucketThrottle',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
+    'DEFAULT_THROTTLE_RATES': {
+        'signup': '10/hour',
+        'token': '20/min',
+        'review_create': '20/min',
+        'comment_create': '60/min',
+        'bulk': '30/min',
+    },
+    # Clients are told apart by the address nginx adds to X-Forwarded-For.
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', default=1)),
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.KeysetLimitOffsetPagination',
     'PAGE_SIZE': 5,
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
     ],
 }
 
+# Items accepted by one request to the bulk endpoints.
+BULK_MAX_ITEMS = 5000
+
+# Rows fetched per server-side cursor round trip by ?stream=true lists.
+STREAM_CHUNK_SIZE = int(os.getenv('STREAM_CHUNK_SIZE', default=1000))
+
+# Titles kept per leaderboard, refreshed by refresh_leaderboards.
+LEADERBOARD_SIZE = int(os.getenv('LEADERBOARD_SIZE', default=100))
+# Reviews a title needs to enter the leaderboards.
+LEADERBOARD_MIN_REVIEWS = int(os.getenv('LEADERBOARD_MIN_REVIEWS', default=1))
+# Reviews of the mean score added to every title when ranking.
+LEADERBOARD_PRIOR_WEIGHT = int(
+    os.getenv('LEADERBOARD_PRIOR_WEIGHT', default=10),
+)
+# Seconds between two refreshes of refresh_leaderboards --loop.
+LEADERBOARD_REFRESH_INTERVAL = float(
+    os.getenv('LEADERBOARD_REFRESH_INTERVAL', default=3600),
+)
+
 AUTH_USER_MODEL = 'reviews.User'
 
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
+DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', default='kob87@list.ru')
+
+# Outbox drained by send_queued_mail. Failed sends are retried after
+# OUTBOX_RETRY_DELAY seconds, doubled per attempt up to the maximum.
+OUTBOX_BATCH_SIZE = int(os.getenv('OUTBOX_BATCH_SIZE', default=100))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', default=8))
+OUTBOX_RETRY_DELAY = int(os.getenv('OUTBOX_RETRY_DELAY', default=30))
+OUTBOX_MAX_RETRY_DELAY = int(os.getenv('OUTBOX_MAX_RETRY_DELAY', default=3600))
+# Seconds a worker owns claimed emails before others may send them.
+OUTBOX_LEASE = int(os.getenv('OUTBOX_LEASE', default=300))
 
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=1),
     'AUTH_HEADER_TYPES': ('Bearer',),
 }
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'api.diagnostics': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+        },
+    },
+}
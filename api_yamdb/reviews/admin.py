@@ -5,6 +5,7 @@ from reviews.models import (
     Comment,
     Genre,
     GenreTitle,
+    OutgoingEmail,
     Review,
     Title,
     User,
@@ -29,6 +30,7 @@ class TitleAdmin(admin.ModelAdmin):
         'name',
         'year',
         'description',
+        'rating',
     )
 
 
@@ -84,4 +86,18 @@ class GenreAdmin(admin.ModelAdmin):
     )
 
 
+@admin.register(OutgoingEmail)
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = (
+        'id',
+        'to',
+        'subject',
+        'created_at',
+        'attempts',
+        'sent_at',
+    )
+    list_filter = ('sent_at',)
+    search_fields = ('to',)
+
+
 admin.site.register(GenreTitle)
@@ -0,0 +1,251 @@
+import random
+
+from datetime import timedelta
+from itertools import accumulate
+
+from django.db import connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from reviews.loaders import (
+    foreign_keys_deferred,
+    insert_chunk,
+    reset_sequences,
+)
+from reviews.models import (
+    Category,
+    Comment,
+    Genre,
+    GenreTitle,
+    Review,
+    Title,
+    TitleStats,
+    User,
+)
+from reviews.stats import add_review, empty_stats
+
+# Shape of the comment count distribution, lower values give a longer
+# tail. The mean of paretovariate(alpha) is alpha / (alpha - 1).
+COMMENTS_ALPHA = 1.5
+PUB_DATE_SPREAD = timedelta(days=10 * 365)
+
+
+def next_id(model, using):
+    last = model.objects.using(using).aggregate(last=Max('id'))['last']
+    return (last or 0) + 1
+
+
+def random_round(value, rng):
+    """Round up with the probability of the fractional part."""
+    whole = int(value)
+    return whole + (rng.random() < value - whole)
+
+
+def zipf_weights(size, skew):
+    """Return weights of ranks 1..size following Zipf's law."""
+    weights = [rank ** -skew for rank in range(1, size + 1)]
+    total = sum(weights)
+    return [weight / total for weight in weights]
+
+
+class DatasetGenerator:
+    """Synthetic catalog with skewed popularity.
+
+    Review counts of titles follow Zipf's law over a random ranking of
+    the titles and are capped by the number of users, comment counts
+    of reviews have a Pareto tail, genres and comment authors are
+    picked with the same skew. Rows are written as soon as a batch is
+    full, so memory does not grow with the dataset. Rows get explicit
+    ids so the same code works on databases that do not return ids
+    from bulk inserts.
+    """
+
+    def __init__(
+        self,
+        titles,
+        reviews,
+        comments,
+        users=1000,
+        categories=10,
+        genres=30,
+        skew=1.0,
+        batch_size=5000,
+        seed=0,
+        using='default',
+    ):
+        self.titles = titles
+        self.reviews = reviews
+        self.comments = comments
+        self.users = max(users, 1)
+        self.categories = max(categories, 1)
+        self.genres = max(genres, 1)
+        self.skew = skew
+        self.batch_size = batch_size
+        self.rng = random.Random(seed)
+        self.using = using
+        self.connection = connections[using]
+        self.now = timezone.now()
+        self.pending = {}
+        self.counts = dict.fromkeys(
+            (
+                Category,
+                Genre,
+                User,
+                Title,
+                TitleStats,
+                GenreTitle,
+                Review,
+                Comment,
+            ),
+            0,
+        )
+
+    def generate(self):
+        """Insert the dataset, return the number of rows per model."""
+        with transaction.atomic(using=self.using):
+            self.category_ids = self.add_catalog(Category, self.categories)
+            self.genre_ids = self.add_catalog(Genre, self.genres)
+            self.user_ids = self.add_users()
+            self.flush()
+            with foreign_keys_deferred(
+                self.connection,
+                [Title, TitleStats, GenreTitle, Review, Comment],
+            ):
+                self.add_titles()
+                self.flush()
+            for model in self.counts:
+                reset_sequences(self.connection, model)
+        return self.counts
+
+    def add(self, instance):
+        rows = self.pending.setdefault(type(instance), [])
+        rows.append(instance)
+        if len(rows) >= self.batch_size:
+            self.flush(type(instance))
+
+    def flush(self, *models):
+        for model in models or list(self.pending):
+            rows = self.pending.pop(model, [])
+            if rows:
+                insert_chunk(
+                    self.connection,
+                    model,
+                    rows,
+                    self.connection.vendor == 'postgresql',
+                )
+                self.counts[model] += len(rows)
+
+    def add_catalog(self, model, size):
+        first = next_id(model, self.using)
+        name = model._meta.verbose_name.capitalize()
+        for pk in range(first, first + size):
+            self.add(model(
+                id=pk,
+                name=f'{name} {pk}',
+                slug=f'{model._meta.model_name}-{pk}',
+            ))
+        return list(range(first, first + size))
+
+    def add_users(self):
+        first = next_id(User, self.using)
+        for pk in range(first, first + self.users):
+            self.add(User(
+                id=pk,
+                username=f'user-{pk}',
+                email=f'user-{pk}@yamdb.fake',
+            ))
+        return list(range(first, first + self.users))
+
+    def pub_date(self):
+        return self.now - self.rng.random() * PUB_DATE_SPREAD
+
+    def add_titles(self):
+        rng = self.rng
+        ranks = list(range(self.titles))
+        rng.shuffle(ranks)
+        weights = zipf_weights(self.titles, self.skew)
+        genre_weights = list(
+            accumulate(zipf_weights(len(self.genre_ids), self.skew)),
+        )
+        author_weights = list(
+            accumulate(zipf_weights(len(self.user_ids), self.skew)),
+        )
+        # Scale Pareto draws to the requested mean of comments per review.
+        comment_scale = (
+            self.comments / max(self.reviews, 1)
+            * (COMMENTS_ALPHA - 1) / COMMENTS_ALPHA
+        )
+
+        title_id = next_id(Title, self.using)
+        genre_title_id = next_id(GenreTitle, self.using)
+        review_id = next_id(Review, self.using)
+        comment_id = next_id(Comment, self.using)
+        for rank in ranks:
+            count = min(
+                random_round(self.reviews * weights[rank], rng),
+                len(self.user_ids),
+            )
+            scores = [rng.randint(1, 10) for _ in range(count)]
+            # Ratings and statistics are written with the titles, updating
+            # them afterwards would leave dead row versions behind.
+            self.add(Title(
+                id=title_id,
+                name=f'Произведение {title_id}',
+                year=rng.randint(1900, self.now.year),
+                description=f'Описание произведения {title_id}',
+                category_id=rng.choice(self.category_ids),
+                rating_sum=sum(scores),
+                rating_count=count,
+                rating=sum(scores) / count if count else None,
+            ))
+            for genre_id in set(rng.choices(
+                self.genre_ids,
+                cum_weights=genre_weights,
+                k=rng.randint(1, 3),
+            )):
+                self.add(GenreTitle(
+                    id=genre_title_id,
+                    title_id_id=title_id,
+                    genre_id_id=genre_id,
+                ))
+                genre_title_id += 1
+            stats = empty_stats()
+            for author_id, score in zip(
+                rng.sample(self.user_ids, count),
+                scores,
+            ):
+                pub_date = self.pub_date()
+                add_review(stats, score, pub_date)
+                self.add(Review(
+                    id=review_id,
+                    title_id=title_id,
+                    author_id=author_id,
+                    text=f'Отзыв {review_id}',
+                    score=score,
+                    pub_date=pub_date,
+                ))
+                replies = random_round(
+                    comment_scale * rng.paretovariate(COMMENTS_ALPHA),
+                    rng,
+                )
+                for commenter_id in rng.choices(
+                    self.user_ids,
+                    cum_weights=author_weights,
+                    k=replies,
+                ):
+                    self.add(Comment(
+                        id=comment_id,
+                        review_id=review_id,
+                        author_id=commenter_id,
+                        text=f'Комментарий {comment_id}',
+                        pub_date=self.pub_date(),
+                    ))
+                    comment_id += 1
+                review_id += 1
+            self.add(TitleStats(title_id=title_id, **stats))
+            title_id += 1
+
+
+def generate_dataset(titles, reviews, comments, **options):
+    """Insert a skewed synthetic dataset next to the existing rows."""
+    return DatasetGenerator(titles, reviews, comments, **options).generate()
@@ -0,0 +1,124 @@
+import heapq
+
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import GenreTitle, LeaderboardEntry, TitleStats
+
+
+def bayesian_score(score_sum, review_count, mean, prior_weight):
+    """Average score pulled towards ``mean`` by ``prior_weight`` reviews.
+
+    A title with few reviews stays close to the mean score of all
+    reviews, so a single 10/10 review does not top the chart.
+    """
+    return (score_sum + mean * prior_weight) / (review_count + prior_weight)
+
+
+def rank_titles(titles, genres, size, mean, prior_weight):
+    """Return the top ``size`` titles of every leaderboard.
+
+    ``titles`` yields ``(title_id, year, category, score_sum,
+    review_count)``, ``genres`` yields ``(title_id, genre)``. Returns
+    ``{(board, key): [(title_id, score, score_sum, review_count)]}``
+    with the best title first. Each board keeps a heap of at most
+    ``size`` rows while the titles stream by.
+    """
+    boards = defaultdict(list)
+    rows = {}
+
+    def push(board, row):
+        # Keep the best ``size`` rows of the board in a min-heap.
+        heap = boards[board]
+        item = ((row[1], row[3], -row[0]), row)
+        if len(heap) < size:
+            heapq.heappush(heap, item)
+        elif item > heap[0]:
+            heapq.heapreplace(heap, item)
+
+    for title_id, year, category, score_sum, review_count in titles:
+        row = (
+            title_id,
+            bayesian_score(score_sum, review_count, mean, prior_weight),
+            score_sum,
+            review_count,
+        )
+        rows[title_id] = row
+        push((LeaderboardEntry.ALL, ''), row)
+        push((LeaderboardEntry.YEAR, str(year)), row)
+        if category is not None:
+            push((LeaderboardEntry.CATEGORY, category), row)
+    for title_id, genre in genres:
+        if title_id in rows:
+            push((LeaderboardEntry.GENRE, genre), rows[title_id])
+    return {
+        board: [row for _, row in sorted(heap, reverse=True)]
+        for board, heap in boards.items()
+    }
+
+
+def refresh_leaderboards(size=None, min_reviews=None, prior_weight=None):
+    """Replace all leaderboards with the current top titles.
+
+    Scores come from the maintained title statistics, one pass over
+    them ranks every board. The swap runs in one transaction, readers
+    keep the previous boards until it commits; the refresh time stored
+    with the entries versions them for the API. Returns the number of
+    entries written.
+    """
+    if size is None:
+        size = settings.LEADERBOARD_SIZE
+    if min_reviews is None:
+        min_reviews = settings.LEADERBOARD_MIN_REVIEWS
+    if prior_weight is None:
+        prior_weight = settings.LEADERBOARD_PRIOR_WEIGHT
+    totals = TitleStats.objects.aggregate(
+        score_sum=Sum('score_sum'),
+        review_count=Sum('review_count'),
+    )
+    mean = (totals['score_sum'] or 0) / (totals['review_count'] or 1)
+    stats = TitleStats.objects.filter(review_count__gte=max(min_reviews, 1))
+    titles = stats.values_list(
+        'title_id',
+        'title__year',
+        'title__category__slug',
+        'score_sum',
+        'review_count',
+    )
+    genres = GenreTitle.objects.filter(
+        title_id__in=stats.values('title_id'),
+        genre_id__isnull=False,
+    ).values_list('title_id_id', 'genre_id__slug')
+    boards = rank_titles(
+        titles.iterator(),
+        genres.iterator(),
+        size,
+        mean,
+        prior_weight,
+    )
+    refreshed_at = timezone.now()
+    with transaction.atomic():
+        LeaderboardEntry.objects.all().delete()
+        LeaderboardEntry.objects.bulk_create(
+            (
+                LeaderboardEntry(
+                    board=board,
+                    key=key,
+                    position=position,
+                    title_id=title_id,
+                    score=score,
+                    rating=score_sum / review_count,
+                    review_count=review_count,
+                    refreshed_at=refreshed_at,
+                )
+                for (board, key), rows in boards.items()
+                for position, (title_id, score, score_sum, review_count)
+                in enumerate(rows, 1)
+            ),
+            1000,
+        )
+    return sum(map(len, boards.values()))
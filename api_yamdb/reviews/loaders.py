@@ -0,0 +1,664 @@
+import hashlib
+import io
+import time
+
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager, nullcontext
+from csv import DictReader
+from itertools import islice
+
+from django.core.management.color import no_style
+from django.db import IntegrityError, connections, transaction
+from django.db.models import SET_NULL
+from django.utils import timezone
+
+from reviews.models import (
+    Category,
+    Comment,
+    Genre,
+    GenreTitle,
+    ImportedRow,
+    Review,
+    Title,
+    User,
+)
+
+CsvSource = namedtuple('CsvSource', ('model', 'filename', 'columns'))
+
+CSV_SOURCES = [
+    CsvSource(Category, 'category.csv', {}),
+    CsvSource(Genre, 'genre.csv', {}),
+    CsvSource(User, 'users.csv', {}),
+    CsvSource(Title, 'titles.csv', {'category': 'category_id'}),
+    CsvSource(
+        GenreTitle,
+        'genre_title.csv',
+        {'title_id': 'title_id_id', 'genre_id': 'genre_id_id'},
+    ),
+    CsvSource(
+        Review,
+        'review.csv',
+        {'title_id': 'title_id', 'author': 'author_id'},
+    ),
+    CsvSource(
+        Comment,
+        'comments.csv',
+        {'review_id': 'review_id', 'author': 'author_id'},
+    ),
+]
+
+LoadResult = namedtuple(
+    'LoadResult',
+    ('source', 'rows', 'seconds', 'changes', 'conflicts'),
+    defaults=(None, ()),
+)
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    chunk = list(islice(iterator, size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(iterator, size))
+
+
+def read_rows(path, source):
+    """Stream CSV rows as keyword arguments for the source model."""
+    fields = {
+        field.attname: field for field in source.model._meta.concrete_fields
+    }
+    with open(path, encoding='utf-8', newline='') as file:
+        for row in DictReader(file):
+            values = {}
+            for column, value in row.items():
+                attname = source.columns.get(column, column)
+                field = fields[attname]
+                if value == '' and field.null:
+                    value = None
+                values[attname] = value
+            yield values
+
+
+def build_instance(model, values):
+    instance = model(**values)
+    for field in model._meta.concrete_fields:
+        if getattr(field, 'auto_now_add', False) and not values.get(
+            field.attname
+        ):
+            setattr(instance, field.attname, timezone.now())
+    return instance
+
+
+def copy_value(value):
+    if value is None:
+        return '\\N'
+    return (
+        str(value)
+        .replace('\\', '\\\\')
+        .replace('\t', '\\t')
+        .replace('\n', '\\n')
+        .replace('\r', '\\r')
+    )
+
+
+def copy_chunk(connection, model, instances):
+    """Insert instances with PostgreSQL COPY FROM STDIN in text format."""
+    fields = model._meta.concrete_fields
+    buffer = io.StringIO()
+    for instance in instances:
+        buffer.write('\t'.join(
+            copy_value(
+                field.get_db_prep_save(
+                    getattr(instance, field.attname),
+                    connection,
+                ),
+            )
+            for field in fields
+        ))
+        buffer.write('\n')
+    buffer.seek(0)
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.copy_expert(
+            'COPY {} ({}) FROM STDIN'.format(
+                quote(model._meta.db_table),
+                ', '.join(quote(field.column) for field in fields),
+            ),
+            buffer,
+        )
+
+
+def insert_chunk(connection, model, instances, use_copy):
+    if use_copy:
+        copy_chunk(connection, model, instances)
+        return
+    fields = [
+        field for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now_add', False)
+    ]
+    # bulk_create() calls pre_save(), keep the dates coming from CSV.
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        model.objects.using(connection.alias).bulk_create(instances)
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def reset_sequences(connection, model):
+    statements = connection.ops.sequence_reset_sql(no_style(), [model])
+    if statements:
+        with connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
+
+
+def load_source(source, data_dir, batch_size, use_copy=True, using='default'):
+    """Load one CSV file in a single transaction, chunk by chunk."""
+    connection = connections[using]
+    use_copy = use_copy and connection.vendor == 'postgresql'
+    started = time.monotonic()
+    rows = 0
+    with transaction.atomic(using=using):
+        for chunk in chunked(
+            read_rows(data_dir / source.filename, source),
+            batch_size,
+        ):
+            insert_chunk(
+                connection,
+                source.model,
+                [build_instance(source.model, values) for values in chunk],
+                use_copy,
+            )
+            rows += len(chunk)
+        reset_sequences(connection, source.model)
+    return LoadResult(source, rows, time.monotonic() - started)
+
+
+def row_digest(values):
+    return hashlib.sha1(
+        '\x1f'.join(
+            '\x00' if value is None else value for value in values.values()
+        ).encode(),
+    ).hexdigest()
+
+
+def upsert_chunk(connection, model, created, updated, fields):
+    """Insert ``created`` rows and overwrite ``fields`` of ``updated`` ones."""
+    if connection.vendor == 'postgresql':
+        postgresql_upsert_chunk(connection, model, created + updated, fields)
+        return
+    insert_chunk(connection, model, created, use_copy=False)
+    if updated and fields:
+        model.objects.using(connection.alias).bulk_update(
+            updated,
+            [field.name for field in fields],
+        )
+
+
+def postgresql_upsert_chunk(connection, model, instances, fields):
+    quote = connection.ops.quote_name
+    columns = model._meta.concrete_fields
+    row = '({})'.format(', '.join(['%s'] * len(columns)))
+    conflict = (
+        'DO UPDATE SET {}'.format(', '.join(
+            '{0} = EXCLUDED.{0}'.format(quote(field.column))
+            for field in fields
+        ))
+        if fields
+        else 'DO NOTHING'
+    )
+    params = [
+        field.get_db_prep_save(getattr(instance, field.attname), connection)
+        for instance in instances
+        for field in columns
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'INSERT INTO {} ({}) VALUES {} ON CONFLICT ({}) {}'.format(
+                quote(model._meta.db_table),
+                ', '.join(quote(field.column) for field in columns),
+                ', '.join([row] * len(instances)),
+                quote(model._meta.pk.column),
+                conflict,
+            ),
+            params,
+        )
+
+
+def sync_chunk(connection, source, chunk, known, counts, conflicts):
+    """Upsert rows of the chunk whose fingerprint changed.
+
+    Only rows imported before are updated. Rows with a known fingerprint
+    that are missing from the table, e.g. removed by a cascade, are
+    inserted again. New rows whose id is taken by a row created through
+    the API are skipped and their ids added to ``conflicts``.
+    """
+    model = source.model
+    rows = {int(values['id']): values for values in chunk}
+    present = set(
+        model.objects.using(connection.alias)
+        .filter(pk__in=rows)
+        .values_list('pk', flat=True)
+    )
+    changed = {}
+    for row_id, values in rows.items():
+        digest = row_digest(values)
+        if row_id in present and row_id not in known:
+            conflicts.append(row_id)
+        elif row_id in present and known[row_id] == digest:
+            counts['unchanged'] += 1
+        else:
+            changed[row_id] = (values, digest)
+    if not changed:
+        return
+    fields = [
+        field for field in model._meta.concrete_fields
+        if field.attname in chunk[0] and not field.primary_key
+    ]
+    created = [row_id for row_id in changed if row_id not in present]
+    updated = [row_id for row_id in changed if row_id in present]
+    upsert_chunk(
+        connection,
+        model,
+        [build_instance(model, changed[row_id][0]) for row_id in created],
+        [build_instance(model, changed[row_id][0]) for row_id in updated],
+        fields,
+    )
+    fingerprints = ImportedRow.objects.using(connection.alias)
+    fingerprints.filter(
+        source=source.filename,
+        row_id__in=changed,
+    ).delete()
+    fingerprints.bulk_create([
+        ImportedRow(source=source.filename, row_id=row_id, digest=digest)
+        for row_id, (_, digest) in changed.items()
+    ])
+    counts['inserted'] += len(created)
+    counts['updated'] += len(updated)
+
+
+def sync_source(source, data_dir, batch_size, use_copy=True, using='default'):
+    """Apply only the rows that changed since the previous sync of the file.
+
+    Rows are fingerprinted and compared with the fingerprints stored by
+    the previous run. Changed and new rows are upserted chunk by chunk,
+    rows imported before that disappeared from the file are deleted.
+    Rows created through the API are never touched: a file row reusing
+    the id of one is skipped and reported in ``conflicts``.
+    """
+    connection = connections[using]
+    started = time.monotonic()
+    counts = dict.fromkeys(
+        ('inserted', 'updated', 'deleted', 'unchanged', 'conflicts'),
+        0,
+    )
+    conflicts = []
+    with transaction.atomic(using=using):
+        fingerprints = ImportedRow.objects.using(using).filter(
+            source=source.filename,
+        )
+        known = dict(fingerprints.values_list('row_id', 'digest'))
+        seen = set()
+        for chunk in chunked(
+            read_rows(data_dir / source.filename, source),
+            batch_size,
+        ):
+            seen.update(int(values['id']) for values in chunk)
+            sync_chunk(connection, source, chunk, known, counts, conflicts)
+        for stale in chunked(sorted(known.keys() - seen), batch_size):
+            source.model.objects.using(using).filter(pk__in=stale).delete()
+            fingerprints.filter(row_id__in=stale).delete()
+            counts['deleted'] += len(stale)
+        counts['conflicts'] = len(conflicts)
+        reset_sequences(connection, source.model)
+    return LoadResult(
+        source,
+        len(seen),
+        time.monotonic() - started,
+        counts,
+        conflicts,
+    )
+
+
+def source_dependencies(sources):
+    """Map each file to the files its foreign keys point to."""
+    filenames = {source.model: source.filename for source in sources}
+    return {
+        source.filename: {
+            filenames[field.related_model]
+            for field in source.model._meta.concrete_fields
+            if field.is_relation
+            and field.related_model in filenames
+            and field.related_model is not source.model
+        }
+        for source in sources
+    }
+
+
+def foreign_keys(models):
+    return [
+        (model, field)
+        for model in models
+        for field in model._meta.concrete_fields
+        if field.is_relation and field.db_constraint
+    ]
+
+
+def parents_first(models):
+    """Order ``models`` so that every model follows those it points to."""
+    dependencies = {
+        model: {
+            field.related_model
+            for _, field in foreign_keys([model])
+            if field.related_model in models
+            and field.related_model is not model
+        }
+        for model in models
+    }
+    return sorted(
+        models,
+        key=lambda model: len(all_dependencies(model, dependencies)),
+    )
+
+
+def orphan_condition(connection, model, field):
+    """SQL condition matching rows whose ``field`` points to a missing row."""
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    column = quote(field.column)
+    parent = quote(field.related_model._meta.db_table)
+    return (
+        f'{column} IS NOT NULL AND NOT EXISTS (SELECT 1 FROM {parent} '
+        f'WHERE {parent}.{quote(field.target_field.column)} '
+        f'= {table}.{column})'
+    )
+
+
+def find_orphans(connection, models):
+    """Yield ``(model, field, ids)`` per foreign key with orphan rows.
+
+    One anti-join per foreign key, ``ids`` are the primary keys of the
+    rows pointing to missing rows.
+    """
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        for model, field in foreign_keys(models):
+            pk = quote(model._meta.pk.column)
+            cursor.execute(
+                f'SELECT {pk} FROM {quote(model._meta.db_table)} '
+                f'WHERE {orphan_condition(connection, model, field)} '
+                f'ORDER BY {pk}',
+            )
+            ids = [row_id for row_id, in cursor.fetchall()]
+            if ids:
+                yield model, field, ids
+
+
+def describe_orphans(orphans, shown=20):
+    for model, field, ids in orphans:
+        listed = ', '.join(map(str, ids[:shown]))
+        if len(ids) > shown:
+            listed += ', ...'
+        yield (
+            f'{model.__name__}.{field.name}: {len(ids)} rows point to '
+            f'missing {field.related_model.__name__} rows, ids {listed}'
+        )
+
+
+def prune_orphans(connection, models):
+    """Clear or delete the rows whose foreign keys point to missing rows.
+
+    Nullable ``SET_NULL`` keys are cleared, other orphans are deleted,
+    as deleting the missing rows would have done. Parents come first, so
+    rows a deletion leaves dangling are resolved with their own key.
+    Yields one line per foreign key that had orphans.
+    """
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        for model, field in foreign_keys(parents_first(models)):
+            table = quote(model._meta.db_table)
+            orphan = orphan_condition(connection, model, field)
+            if field.remote_field.on_delete is SET_NULL:
+                action = 'cleared'
+                cursor.execute(
+                    f'UPDATE {table} SET {quote(field.column)} = NULL '
+                    f'WHERE {orphan}',
+                )
+            else:
+                action = 'deleted'
+                cursor.execute(f'DELETE FROM {table} WHERE {orphan}')
+            if cursor.rowcount:
+                yield (
+                    f'{model.__name__}.{field.name}: {action} '
+                    f'{cursor.rowcount} rows pointing to missing '
+                    f'{field.related_model.__name__} rows'
+                )
+
+
+def orphans_error(orphans, hint):
+    return IntegrityError('\n'.join([*describe_orphans(orphans), hint]))
+
+
+def foreign_key_names(connection, model, field):
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(
+            cursor,
+            model._meta.db_table,
+        )
+    return [
+        name for name, constraint in constraints.items()
+        if constraint['foreign_key'] and constraint['columns'] == [
+            field.column,
+        ]
+    ]
+
+
+def add_foreign_key_sql(connection, model, field, name, valid):
+    """ALTER TABLE adding the constraint Django 2.2 migrations create."""
+    quote = connection.ops.quote_name
+    return (
+        f'ALTER TABLE {quote(model._meta.db_table)} '
+        f'ADD CONSTRAINT {quote(name)} FOREIGN KEY ({quote(field.column)}) '
+        f'REFERENCES {quote(field.related_model._meta.db_table)} '
+        f'({quote(field.target_field.column)}) '
+        f'DEFERRABLE INITIALLY DEFERRED{"" if valid else " NOT VALID"}'
+    )
+
+
+@contextmanager
+def postgresql_foreign_keys_dropped(connection, models, prune):
+    """Drop FK constraints for the load and validate them on re-creation.
+
+    ADD CONSTRAINT checks the whole table with a single join instead of
+    firing a trigger per inserted row. Orphans found before are reported
+    with IntegrityError and their constraints re-created NOT VALID, to
+    be validated once the operator fixed the rows. With ``prune`` they
+    are pruned instead and the lines describing it added to the yielded
+    list.
+    """
+    quote = connection.ops.quote_name
+    dropped = []
+    pruned = []
+    with transaction.atomic(using=connection.alias):
+        with connection.cursor() as cursor:
+            # ALTER TABLE refuses to run while checks deferred by earlier
+            # writes of the transaction are pending, so run them now.
+            cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+            for model, field in foreign_keys(models):
+                for name in foreign_key_names(connection, model, field):
+                    cursor.execute(
+                        f'ALTER TABLE {quote(model._meta.db_table)} '
+                        f'DROP CONSTRAINT {quote(name)}',
+                    )
+                    dropped.append((model, field, name))
+    try:
+        yield pruned
+    finally:
+        # Fresh statistics let the validation query pick a hash join.
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE {}'.format(', '.join(
+                quote(model._meta.db_table) for model in models
+            )))
+        with transaction.atomic(using=connection.alias):
+            if prune:
+                pruned.extend(prune_orphans(connection, models))
+            orphans = list(find_orphans(connection, models))
+            invalid = {(model, field) for model, field, _ in orphans}
+            with connection.cursor() as cursor:
+                cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+                for model, field, name in dropped:
+                    cursor.execute(add_foreign_key_sql(
+                        connection,
+                        model,
+                        field,
+                        name,
+                        valid=(model, field) not in invalid,
+                    ))
+    if orphans:
+        raise orphans_error(
+            orphans,
+            'Their constraints are NOT VALID: fix the rows, then run '
+            'ALTER TABLE ... VALIDATE CONSTRAINT, or load again with '
+            '--prune-orphans.',
+        )
+
+
+@contextmanager
+def foreign_keys_deferred(connection, models, prune=False):
+    """Skip per-row FK checks while loading, verify them set-based after.
+
+    Rows pointing to missing rows are reported with IntegrityError and
+    left as they are. With ``prune`` they are cleared or deleted instead,
+    see ``prune_orphans``, and the yielded list filled with what was done.
+    """
+    if connection.vendor == 'postgresql':
+        with postgresql_foreign_keys_dropped(
+            connection,
+            models,
+            prune,
+        ) as pruned:
+            yield pruned
+        return
+    pruned = []
+    with connection.constraint_checks_disabled():
+        yield pruned
+    with transaction.atomic(using=connection.alias):
+        if prune:
+            pruned.extend(prune_orphans(connection, models))
+        orphans = list(find_orphans(connection, models))
+    if orphans:
+        raise orphans_error(
+            orphans,
+            'Fix the rows or load again with --prune-orphans.',
+        )
+
+
+def in_thread(loader):
+    def load(*args, **kwargs):
+        try:
+            return loader(*args, **kwargs)
+        finally:
+            connections.close_all()
+    return load
+
+
+def all_dependencies(filename, dependencies):
+    found = set()
+    stack = list(dependencies[filename])
+    while stack:
+        current = stack.pop()
+        if current not in found:
+            found.add(current)
+            stack.extend(dependencies[current])
+    return found
+
+
+def topological_order(sources):
+    dependencies = source_dependencies(sources)
+    return sorted(
+        sources,
+        key=lambda source: len(
+            all_dependencies(source.filename, dependencies),
+        ),
+    )
+
+
+def load_concurrently(sources, workers, load, on_loaded):
+    """Run ``load`` for every file once all files it depends on are in."""
+    dependencies = source_dependencies(sources)
+    pending = {source.filename: source for source in sources}
+    loaded = set()
+    results = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        running = {}
+        while pending or running:
+            for filename, source in list(pending.items()):
+                if dependencies[filename] <= loaded:
+                    running[executor.submit(load, source)] = source
+                    del pending[filename]
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                loaded.add(running.pop(future).filename)
+                results.append(future.result())
+                on_loaded(results[-1])
+    return results
+
+
+def load_sources(
+    sources,
+    data_dir,
+    batch_size,
+    use_copy=True,
+    workers=None,
+    using='default',
+    on_loaded=None,
+    incremental=False,
+    prune_orphans=False,
+    on_pruned=None,
+):
+    """Load the files along their dependency graph on a worker pool.
+
+    SQLite allows a single writer, so there files load one by one.
+    Incremental runs touch a live catalog and keep the FK constraints.
+    Rows left pointing to missing rows fail the load, unless
+    ``prune_orphans`` is set; ``on_pruned`` then gets a line per
+    foreign key that had some.
+    """
+    connection = connections[using]
+    loader = sync_source if incremental else load_source
+    on_loaded = on_loaded or (lambda result: None)
+    on_pruned = on_pruned or (lambda line: None)
+    with (
+        nullcontext([]) if incremental
+        else foreign_keys_deferred(
+            connection,
+            [source.model for source in sources],
+            prune=prune_orphans,
+        )
+    ) as pruned:
+        if workers == 1 or connection.vendor == 'sqlite':
+            results = []
+            for source in topological_order(sources):
+                results.append(
+                    loader(source, data_dir, batch_size, use_copy, using),
+                )
+                on_loaded(results[-1])
+        else:
+            results = load_concurrently(
+                sources,
+                workers,
+                lambda source: in_thread(loader)(
+                    source,
+                    data_dir,
+                    batch_size,
+                    use_copy,
+                    using,
+                ),
+                on_loaded,
+            )
+    for line in pruned:
+        on_pruned(line)
+    return results
@@ -0,0 +1,151 @@
+import statistics
+import time
+
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+
+from reviews.generators import generate_dataset
+from reviews.models import Category, Comment, Genre, Review, Title
+
+# State of the schema before the access path indexes.
+BEFORE_INDEXES = ('reviews', '0004_title_search')
+TITLE_ORDERING = ('-rating', 'name', 'id')
+PAGE_SIZE = 10
+
+
+def access_paths():
+    """Return querysets the API runs for its list endpoints."""
+    title = Title.objects.order_by('-rating_count', 'id').first()
+    review = Review.objects.filter(title=title).order_by('id').first()
+    category = Category.objects.order_by('id').first()
+    genre = Genre.objects.order_by('id').first()
+    page = Title.objects.order_by(*TITLE_ORDERING)[:PAGE_SIZE]
+    return [
+        (
+            'reviews of a title',
+            Review.objects.filter(title=title).order_by('pub_date', 'id')[
+                :PAGE_SIZE
+            ],
+        ),
+        (
+            'comments of a review',
+            Comment.objects.filter(review=review).order_by(
+                '-pub_date',
+                '-id',
+            )[:PAGE_SIZE],
+        ),
+        (
+            'titles by rating',
+            Title.objects.order_by(*TITLE_ORDERING)[:PAGE_SIZE],
+        ),
+        (
+            'titles of a category',
+            Title.objects.filter(category__slug=category.slug).order_by(
+                *TITLE_ORDERING,
+            )[:PAGE_SIZE],
+        ),
+        (
+            'titles of a genre',
+            Title.objects.filter(genre__slug=genre.slug).order_by(
+                *TITLE_ORDERING,
+            )[:PAGE_SIZE],
+        ),
+        (
+            'titles of a year',
+            Title.objects.filter(year=title.year).order_by(
+                *TITLE_ORDERING,
+            )[:PAGE_SIZE],
+        ),
+        (
+            'genres of a title page',
+            Genre.objects.filter(
+                titles__in=list(page.values_list('id', flat=True)),
+            ),
+        ),
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        'Shows plans and latency of the API access paths with and '
+        'without the composite indexes, all changes are rolled back'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--titles',
+            type=int,
+            default=20000,
+            help='Generated titles, 0 to use the existing data only',
+        )
+        parser.add_argument(
+            '--reviews',
+            type=int,
+            default=200000,
+            help='Generated reviews',
+        )
+        parser.add_argument(
+            '--comments',
+            type=int,
+            default=400000,
+            help='Generated comments',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=50,
+            help='Runs of every query, the median is reported',
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError(
+                'PostgreSQL is required to drop indexes in a transaction',
+            )
+        with transaction.atomic():
+            if options['titles']:
+                generate_dataset(
+                    options['titles'],
+                    options['reviews'],
+                    options['comments'],
+                )
+            if not Title.objects.exists():
+                raise CommandError('No titles to query, use --titles')
+            # Pending deferred checks would block the schema changes.
+            connection.check_constraints()
+            paths = access_paths()
+            after = self.measure(paths, options['repeat'])
+            MigrationExecutor(connection).migrate([BEFORE_INDEXES])
+            before = self.measure(paths, options['repeat'])
+            transaction.set_rollback(True)
+
+        for name, _ in paths:
+            self.stdout.write(
+                f'== {name}: {before[name][1]:.3f} ms -> '
+                f'{after[name][1]:.3f} ms'
+            )
+            self.stdout.write('-- before')
+            self.stdout.write(before[name][0])
+            self.stdout.write('-- after')
+            self.stdout.write(after[name][0])
+
+    def measure(self, paths, repeat):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        results = {}
+        for name, queryset in paths:
+            sql, params = queryset.query.sql_with_params()
+            timings = []
+            with connection.cursor() as cursor:
+                # The first run warms up the buffer cache and is not timed.
+                for _ in range(repeat + 1):
+                    started = time.perf_counter()
+                    cursor.execute(sql, params)
+                    cursor.fetchall()
+                    timings.append(time.perf_counter() - started)
+            results[name] = (
+                queryset.all().explain(),
+                statistics.median(timings[1:]) * 1000,
+            )
+        return results
@@ -0,0 +1,95 @@
+import time
+
+from django.core.management import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from reviews.generators import generate_dataset
+
+
+class Command(BaseCommand):
+    help = 'Generates a synthetic dataset with skewed popularity'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--titles',
+            type=int,
+            default=10000,
+            help='Titles to generate',
+        )
+        parser.add_argument(
+            '--reviews',
+            type=int,
+            default=100000,
+            help='Reviews to generate, spread over titles by Zipf\'s law',
+        )
+        parser.add_argument(
+            '--comments',
+            type=int,
+            default=200000,
+            help='Comments to generate in total, approximately: per review '
+                 'counts are drawn from a Pareto distribution',
+        )
+        parser.add_argument(
+            '--users',
+            type=int,
+            help='Users to generate, a title gets one review per user at '
+                 'most (default: one user per 50 reviews, at least 1000)',
+        )
+        parser.add_argument(
+            '--categories',
+            type=int,
+            default=10,
+            help='Categories to generate',
+        )
+        parser.add_argument(
+            '--genres',
+            type=int,
+            default=30,
+            help='Genres to generate',
+        )
+        parser.add_argument(
+            '--skew',
+            type=float,
+            default=1.0,
+            help='Zipf exponent of title, genre and user popularity',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Rows inserted per bulk statement',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Random seed, the same seed gives the same dataset',
+        )
+
+    def handle(self, *args, **options):
+        users = options['users']
+        if users is None:
+            users = max(1000, options['reviews'] // 50)
+        started = time.monotonic()
+        try:
+            counts = generate_dataset(
+                options['titles'],
+                options['reviews'],
+                options['comments'],
+                users=users,
+                categories=options['categories'],
+                genres=options['genres'],
+                skew=options['skew'],
+                batch_size=options['batch_size'],
+                seed=options['seed'],
+            )
+        except IntegrityError as error:
+            raise CommandError(f'Integrity check failed:\n{error}')
+        seconds = time.monotonic() - started
+        rows = sum(counts.values())
+        for model, count in counts.items():
+            self.stdout.write(f'{model._meta.db_table}: {count} rows')
+        self.stdout.write(
+            f'total: {rows} rows in {seconds:.2f}s '
+            f'({rows / max(seconds, 1e-6):.0f} rows/s)'
+        )
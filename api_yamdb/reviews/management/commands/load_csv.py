@@ -1,114 +1,119 @@
-from csv import DictReader
+import os
+import time
 
-from django.core.management import BaseCommand
+from pathlib import Path
 
-from reviews.models import (
-    Category,
-    Comment,
-    Genre,
-    GenreTitle,
-    Review,
-    Title,
-    User,
-)
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from reviews.loaders import CSV_SOURCES, load_sources
+from reviews.models import Review, Title
 
 ALREADY_LOADED_ERROR_MESSAGE = """
     If you need to reload the category, comments, genre,
     genre_title, review, titles, users data from the CSV file,
     first delete the db.sqlite3 file to destroy the database.
     Then, run `python manage.py migrate` for a new empty
-    database with tables
+    database with tables. To apply only the changed rows
+    to a loaded database, run `load_csv --incremental`
 """
 
-MODELS_FILES = [
-    [
-        Category,
-        './static/data/category.csv',
-    ],
-    [
-        Title,
-        './static/data/titles.csv',
-    ],
-    [
-        Genre,
-        './static/data/genre.csv',
-    ],
-    [
-        GenreTitle,
-        './static/data/genre_title.csv',
-    ],
-    [
-        Review,
-        './static/data/review.csv',
-    ],
-    [
-        Comment,
-        './static/data/comments.csv',
-    ],
-    [
-        User,
-        './static/data/users.csv',
-    ],
-]
-
 
 class Command(BaseCommand):
     help = "Loads data from csv"
 
-    def handle(self, *args, **options):
-        for model, file in MODELS_FILES:
-            if model.objects.exists():
-                print(f'data already loaded from {file} or already exists')
-                print(ALREADY_LOADED_ERROR_MESSAGE)
-        print("Loading data")
-
-        for row in DictReader(open('./static/data/category.csv')):
-            Category(id=row['id'], name=row['name'], slug=row['slug']).save()
-
-        for row in DictReader(open('./static/data/genre.csv')):
-            Genre(id=row['id'], name=row['name'], slug=row['slug']).save()
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--data-dir',
+            type=Path,
+            default=Path(settings.BASE_DIR) / 'static' / 'data',
+            help='Directory with the CSV files',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Rows inserted per bulk statement',
+        )
+        parser.add_argument(
+            '--no-copy',
+            action='store_true',
+            help='Use bulk INSERT even on PostgreSQL instead of COPY',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count(),
+            help='Files loaded at the same time',
+        )
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help='Apply only rows changed since the previous incremental run',
+        )
+        parser.add_argument(
+            '--prune-orphans',
+            action='store_true',
+            help='Delete rows pointing to missing rows, or clear the '
+                 'nullable keys, instead of failing the load',
+        )
 
-        for row in DictReader(open('./static/data/titles.csv')):
-            Title(
-                id=row['id'],
-                year=row['year'],
-                name=row['name'],
-                category_id=row['category'],
-            ).save()
-
-        for row in DictReader(open('./static/data/genre_title.csv')):
-            GenreTitle(
-                id=row['id'],
-                title_id_id=row['title_id'],
-                genre_id_id=row['genre_id'],
-            ).save()
-
-        for row in DictReader(open('./static/data/users.csv')):
-            User(
-                id=row['id'],
-                username=row['username'],
-                email=row['email'],
-                role=row['role'],
-                bio=row['bio'],
-            ).save()
-
-        for row in DictReader(open('./static/data/review.csv')):
-            Review(
-                id=row['id'],
-                title_id=row['title_id'],
-                text=row['text'],
-                author_id=row['author'],
-                score=row['score'],
-                pub_date=row['pub_date'],
-            ).save()
+    def handle(self, *args, **options):
+        pending = []
+        for source in CSV_SOURCES:
+            if not options['incremental'] and source.model.objects.exists():
+                self.stdout.write(
+                    f'data already loaded from {source.filename} '
+                    'or already exists, skipping'
+                )
+                self.stdout.write(ALREADY_LOADED_ERROR_MESSAGE)
+                continue
+            pending.append(source)
+        self.stdout.write('Loading data')
 
-        for row in DictReader(open('./static/data/comments.csv')):
-            Comment(
-                id=row['id'],
-                review_id=row['review_id'],
-                text=row['text'],
-                author_id=row['author'],
-                pub_date=row['pub_date'],
-            ).save()
+        started = time.monotonic()
+        try:
+            results = load_sources(
+                pending,
+                options['data_dir'],
+                options['batch_size'],
+                use_copy=not options['no_copy'],
+                workers=options['workers'],
+                on_loaded=self.report,
+                incremental=options['incremental'],
+                prune_orphans=options['prune_orphans'],
+                on_pruned=self.stdout.write,
+            )
+        except IntegrityError as error:
+            raise CommandError(f'Integrity check failed:\n{error}')
+        rows = sum(result.rows for result in results)
+        seconds = time.monotonic() - started
+        self.stdout.write(
+            f'total: {rows} rows in {seconds:.2f}s '
+            f'({rows / max(seconds, 1e-6):.0f} rows/s)'
+        )
+        if any(source.model in (Title, Review) for source in pending):
+            Title.objects.rebuild_ratings()
+            Title.objects.rebuild_stats()
 
         return 'The data successfully loaded'
+
+    def report(self, result):
+        changes = ''
+        if result.changes is not None:
+            changes = ', ' + ', '.join(
+                f'{count} {change}' for change, count in result.changes.items()
+            )
+        self.stdout.write(
+            f'{result.source.filename}: {result.rows} rows in '
+            f'{result.seconds:.2f}s '
+            f'({result.rows / max(result.seconds, 1e-6):.0f} rows/s)'
+            f'{changes}'
+        )
+        if result.conflicts:
+            self.stderr.write(
+                f'{result.source.filename}: skipped rows whose id belongs '
+                'to a row not imported from the file: '
+                + ', '.join(map(str, result.conflicts))
+            )
@@ -0,0 +1,13 @@
+from django.core.management import BaseCommand
+
+from reviews.models import Title
+
+
+class Command(BaseCommand):
+    help = "Rebuilds stored title ratings and statistics from reviews"
+
+    def handle(self, *args, **options):
+        updated = Title.objects.rebuild_ratings()
+        self.stdout.write(f'Ratings rebuilt for {updated} titles')
+        updated = Title.objects.rebuild_stats()
+        self.stdout.write(f'Statistics rebuilt for {updated} titles')
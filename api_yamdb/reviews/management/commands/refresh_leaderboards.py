@@ -0,0 +1,56 @@
+import time
+
+from django.conf import settings
+from django.core.management import BaseCommand
+
+from reviews.leaderboards import refresh_leaderboards
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuilds the top titles per genre, category and year, '
+        'meant to run on a schedule'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--size',
+            type=int,
+            default=settings.LEADERBOARD_SIZE,
+            help='Titles kept per leaderboard',
+        )
+        parser.add_argument(
+            '--min-reviews',
+            type=int,
+            default=settings.LEADERBOARD_MIN_REVIEWS,
+            help='Reviews a title needs to be ranked',
+        )
+        parser.add_argument(
+            '--prior-weight',
+            type=int,
+            default=settings.LEADERBOARD_PRIOR_WEIGHT,
+            help='Reviews of the mean score added to every title',
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep refreshing the leaderboards until stopped',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=settings.LEADERBOARD_REFRESH_INTERVAL,
+            help='Seconds between two refreshes',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            written = refresh_leaderboards(
+                options['size'],
+                options['min_reviews'],
+                options['prior_weight'],
+            )
+            self.stdout.write(f'Leaderboards refreshed, {written} entries')
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,50 @@
+import time
+
+from django.conf import settings
+from django.core.management import BaseCommand
+
+from reviews.outbox import send_queued_mail
+
+
+class Command(BaseCommand):
+    help = 'Sends emails queued in the outbox, once or in a loop'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.OUTBOX_BATCH_SIZE,
+            help='Emails sent over one connection',
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep draining the outbox until stopped',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=1.0,
+            help='Seconds to sleep while the outbox is empty',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.perf_counter()
+            total_sent = total_failed = 0
+            while True:
+                sent, failed = send_queued_mail(options['batch_size'])
+                if not sent and not failed:
+                    break
+                total_sent += sent
+                total_failed += failed
+            if total_sent or total_failed:
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f'Sent {total_sent}, failed {total_failed} '
+                    f'in {elapsed:.2f} s, '
+                    f'{total_sent / elapsed:.1f} emails/s'
+                )
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,30 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0002_title_rating'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportedRow',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=64, verbose_name='Файл')),
+                ('row_id', models.BigIntegerField(verbose_name='Идентификатор строки')),
+                ('digest', models.CharField(max_length=40, verbose_name='Отпечаток строки')),
+            ],
+            options={
+                'verbose_name': 'загруженная строка',
+                'verbose_name_plural': 'загруженные строки',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='importedrow',
+            constraint=models.UniqueConstraint(fields=('source', 'row_id'), name='unique_imported_row'),
+        ),
+    ]
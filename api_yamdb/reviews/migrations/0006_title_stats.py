@@ -0,0 +1,64 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:57
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+from reviews.stats import aggregate_reviews
+
+
+def fill_stats(apps, schema_editor):
+    Review = apps.get_model('reviews', 'Review')
+    Title = apps.get_model('reviews', 'Title')
+    TitleStats = apps.get_model('reviews', 'TitleStats')
+    reviews = (
+        Review.objects.order_by()
+        .values_list('title_id', 'score', 'pub_date')
+        .iterator()
+    )
+    stats = aggregate_reviews(
+        Title.objects.values_list('pk', flat=True),
+        reviews,
+    )
+    TitleStats.objects.bulk_create(
+        (
+            TitleStats(title_id=title_id, **values)
+            for title_id, values in stats.items()
+        ),
+        1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0005_access_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TitleStats',
+            fields=[
+                ('title', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='reviews.Title', verbose_name='Произведение')),
+                ('score_1', models.PositiveIntegerField(default=0, verbose_name='Оценок 1')),
+                ('score_2', models.PositiveIntegerField(default=0, verbose_name='Оценок 2')),
+                ('score_3', models.PositiveIntegerField(default=0, verbose_name='Оценок 3')),
+                ('score_4', models.PositiveIntegerField(default=0, verbose_name='Оценок 4')),
+                ('score_5', models.PositiveIntegerField(default=0, verbose_name='Оценок 5')),
+                ('score_6', models.PositiveIntegerField(default=0, verbose_name='Оценок 6')),
+                ('score_7', models.PositiveIntegerField(default=0, verbose_name='Оценок 7')),
+                ('score_8', models.PositiveIntegerField(default=0, verbose_name='Оценок 8')),
+                ('score_9', models.PositiveIntegerField(default=0, verbose_name='Оценок 9')),
+                ('score_10', models.PositiveIntegerField(default=0, verbose_name='Оценок 10')),
+                ('review_count', models.PositiveIntegerField(default=0, verbose_name='Количество отзывов')),
+                ('score_sum', models.PositiveIntegerField(default=0, verbose_name='Сумма оценок')),
+                ('last_review_at', models.DateTimeField(blank=True, null=True, verbose_name='Дата последнего отзыва')),
+                ('recent_weight', models.FloatField(default=0, verbose_name='Сумма весов отзывов')),
+                ('recent_score_sum', models.FloatField(default=0, verbose_name='Взвешенная сумма оценок')),
+            ],
+            options={
+                'verbose_name': 'статистика произведения',
+                'verbose_name_plural': 'статистика произведений',
+            },
+        ),
+        migrations.RunPython(fill_stats, migrations.RunPython.noop),
+    ]
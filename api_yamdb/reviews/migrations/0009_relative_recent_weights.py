@@ -0,0 +1,39 @@
+from django.db import migrations
+
+from reviews.stats import aggregate_reviews
+
+
+def recount_recent(apps, schema_editor):
+    """Store recent sums relative to the newest review of each title."""
+    Review = apps.get_model('reviews', 'Review')
+    TitleStats = apps.get_model('reviews', 'TitleStats')
+    title_ids = list(TitleStats.objects.values_list('title_id', flat=True))
+    reviews = (
+        Review.objects.order_by()
+        .values_list('title_id', 'score', 'pub_date')
+        .iterator()
+    )
+    stats = aggregate_reviews(title_ids, reviews)
+    TitleStats.objects.bulk_update(
+        [
+            TitleStats(
+                title_id=title_id,
+                recent_weight=values['recent_weight'],
+                recent_score_sum=values['recent_score_sum'],
+            )
+            for title_id, values in stats.items()
+        ],
+        ['recent_weight', 'recent_score_sum'],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0008_outgoing_email'),
+    ]
+
+    operations = [
+        migrations.RunPython(recount_recent, migrations.RunPython.noop),
+    ]
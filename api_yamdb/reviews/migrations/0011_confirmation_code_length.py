@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 15:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0010_leaderboard_refreshed_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='confirmation_code',
+            field=models.CharField(blank=True, max_length=36, null=True, verbose_name='Код авторизации'),
+        ),
+    ]
@@ -4,8 +4,27 @@ from django.core.validators import (
     MinValueValidator,
     RegexValidator,
 )
-from django.db import models
+from django.db import models, transaction
+from django.db.models import (
+    Avg,
+    Case,
+    Count,
+    ExpressionWrapper,
+    F,
+    FloatField,
+    Max,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+    Value,
+    When,
+)
+from django.db.models.functions import Cast, Coalesce
+from django.utils import timezone
 
+from . import stats
+from .stats import SCORES, aggregate_reviews, empty_stats
 from .validators import validate_year
 
 
@@ -58,7 +77,7 @@ class User(AbstractUser):
         blank=True,
     )
     confirmation_code = models.CharField(
-        'Код авторизации', max_length=6, blank=True, null=True
+        'Код авторизации', max_length=36, blank=True, null=True
     )
 
     class Meta:
@@ -78,6 +97,16 @@ class User(AbstractUser):
     def __str__(self):
         return self.username
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_username = instance.__dict__.get('username')
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._loaded_username = self.username
+
     @property
     def is_admin(self):
         return self.is_superuser or self.is_staff or self.role == 'admin'
@@ -147,6 +176,70 @@ class Genre(models.Model):
         return self.slug
 
 
+class TitleQuerySet(models.QuerySet):
+    """QuerySet for titles with stored rating maintenance"""
+
+    def change_rating(self, score_delta, count_delta):
+        """Shift stored rating aggregates in a single UPDATE statement."""
+        rating_sum = F('rating_sum') + score_delta
+        rating_count = F('rating_count') + count_delta
+        return self.update(
+            rating_sum=rating_sum,
+            rating_count=rating_count,
+            rating=Case(
+                When(
+                    rating_count__lte=-count_delta,
+                    then=Value(None),
+                ),
+                default=ExpressionWrapper(
+                    Cast(rating_sum, FloatField()) / rating_count,
+                    output_field=FloatField(),
+                ),
+                output_field=FloatField(),
+            ),
+        )
+
+    def rebuild_ratings(self):
+        """Recompute stored rating aggregates from reviews."""
+        reviews = (
+            Review.objects.filter(title=OuterRef('pk'))
+            .order_by()
+            .values('title')
+        )
+        return self.update(
+            rating_sum=Coalesce(
+                Subquery(reviews.annotate(total=Sum('score')).values('total')),
+                0,
+            ),
+            rating_count=Coalesce(
+                Subquery(reviews.annotate(total=Count('pk')).values('total')),
+                0,
+            ),
+            rating=Subquery(
+                reviews.annotate(average=Avg('score')).values('average'),
+            ),
+        )
+
+    def rebuild_stats(self, batch_size=1000):
+        """Recompute score statistics of the titles from reviews."""
+        title_ids = list(self.values_list('pk', flat=True))
+        reviews = (
+            Review.objects.filter(title__in=self.values('pk'))
+            .order_by()
+            .values_list('title_id', 'score', 'pub_date')
+        )
+        aggregated = aggregate_reviews(title_ids, reviews.iterator())
+        TitleStats.objects.filter(title__in=self.values('pk')).delete()
+        TitleStats.objects.bulk_create(
+            (
+                TitleStats(title_id=title_id, **values)
+                for title_id, values in aggregated.items()
+            ),
+            batch_size,
+        )
+        return len(aggregated)
+
+
 class Title(models.Model):
     """Title model for title"""
 
@@ -167,6 +260,7 @@ class Title(models.Model):
         related_name='titles',
         blank=True,
         null=True,
+        db_index=False,
     )
     genre = models.ManyToManyField(
         Genre,
@@ -175,11 +269,43 @@ class Title(models.Model):
         verbose_name='Жанр',
         related_name='titles',
     )
+    rating_sum = models.PositiveIntegerField(
+        verbose_name='Сумма оценок',
+        default=0,
+        editable=False,
+    )
+    rating_count = models.PositiveIntegerField(
+        verbose_name='Количество оценок',
+        default=0,
+        editable=False,
+    )
+    rating = models.FloatField(
+        verbose_name='Рейтинг',
+        null=True,
+        blank=True,
+        editable=False,
+    )
+
+    objects = TitleQuerySet.as_manager()
 
     class Meta:
         ordering = ['name']
         verbose_name = 'произведение'
         verbose_name_plural = 'произведения'
+        indexes = [
+            models.Index(
+                fields=['-rating', 'name', 'id'],
+                name='title_rating_idx',
+            ),
+            models.Index(
+                fields=['category', '-rating', 'name', 'id'],
+                name='title_category_rating_idx',
+            ),
+            models.Index(
+                fields=['year'],
+                name='title_year_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -193,6 +319,7 @@ class GenreTitle(models.Model):
         on_delete=models.CASCADE,
         related_name='title',
         verbose_name='Произведение',
+        db_index=False,
     )
     genre_id = models.ForeignKey(
         Genre,
@@ -200,8 +327,23 @@ class GenreTitle(models.Model):
         null=True,
         related_name='genre',
         verbose_name='Жанр',
+        db_index=False,
     )
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['title_id', 'genre_id'],
+                name='unique_genre_title',
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['genre_id', 'title_id'],
+                name='genre_title_genre_idx',
+            ),
+        ]
+
     def __str__(self):
         return f'{self.title_id}, {self.genre_id}'
 
@@ -212,6 +354,7 @@ class Review(models.Model):
         related_name='reviews',
         verbose_name='произведение',
         on_delete=models.CASCADE,
+        db_index=False,
     )
     text = models.TextField(
         blank=False,
@@ -246,6 +389,25 @@ class Review(models.Model):
                 fields=['author', 'title'], name='unique_review'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['title', 'pub_date', 'id'],
+                name='review_title_pub_date_idx',
+            ),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_score = instance.__dict__.get('score')
+        return instance
+
+    def save(self, *args, **kwargs):
+        # Stored title rating is updated by the post_save receiver,
+        # keep both writes in one transaction.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+        self._loaded_score = self.score
 
 
 class Comment(models.Model):
@@ -262,6 +424,7 @@ class Comment(models.Model):
         on_delete=models.CASCADE,
         verbose_name='Отзыв',
         related_name='comments',
+        db_index=False,
     )
     text = models.TextField(
         verbose_name='Текст комментария',
@@ -275,6 +438,302 @@ class Comment(models.Model):
         ordering = ('-pub_date',)
         verbose_name = 'комментарий'
         verbose_name_plural = 'комментарии'
+        indexes = [
+            models.Index(
+                fields=['review', '-pub_date', '-id'],
+                name='comment_review_pub_date_idx',
+            ),
+        ]
 
     def __str__(self):
         return f'{self.author.username[:15]}, {self.text[:30]}'
+
+
+class TitleStatsQuerySet(models.QuerySet):
+    """QuerySet for score statistics maintained with reviews"""
+
+    def apply(self, change):
+        """Update the statistics row with ``change(values)`` under a lock.
+
+        Return the number of rows changed, 0 when the row is missing.
+        """
+        with transaction.atomic(using=self.db):
+            row = self.select_for_update().first()
+            if row is None:
+                return 0
+            values = {name: getattr(row, name) for name in empty_stats()}
+            change(values)
+            return self.filter(pk=row.pk).update(**values)
+
+    def add_review(self, review):
+        return self.apply(lambda values: stats.add_review(
+            values,
+            review.score,
+            review.pub_date,
+        ))
+
+    def remove_review(self, review):
+        # Called after the review row is deleted.
+        reviews = Review.objects.filter(title=review.title_id).order_by()
+        return self.apply(lambda values: stats.remove_review(
+            values,
+            review.score,
+            review.pub_date,
+            newest=lambda: reviews.aggregate(
+                newest=Max('pub_date'),
+            )['newest'],
+            reviews=lambda: reviews.values_list(
+                'score',
+                'pub_date',
+            ).iterator(),
+        ))
+
+    def change_score(self, review, previous_score):
+        if review.score == previous_score:
+            return 0
+        return self.apply(lambda values: stats.change_score(
+            values,
+            previous_score,
+            review.score,
+            review.pub_date,
+        ))
+
+
+def score_field(score):
+    return models.PositiveIntegerField(
+        verbose_name=f'Оценок {score}',
+        default=0,
+    )
+
+
+class TitleStats(models.Model):
+    """Score statistics of a title, maintained with its reviews"""
+
+    title = models.OneToOneField(
+        Title,
+        primary_key=True,
+        on_delete=models.CASCADE,
+        related_name='stats',
+        verbose_name='Произведение',
+    )
+    score_1 = score_field(1)
+    score_2 = score_field(2)
+    score_3 = score_field(3)
+    score_4 = score_field(4)
+    score_5 = score_field(5)
+    score_6 = score_field(6)
+    score_7 = score_field(7)
+    score_8 = score_field(8)
+    score_9 = score_field(9)
+    score_10 = score_field(10)
+    review_count = models.PositiveIntegerField(
+        verbose_name='Количество отзывов',
+        default=0,
+    )
+    score_sum = models.PositiveIntegerField(
+        verbose_name='Сумма оценок',
+        default=0,
+    )
+    last_review_at = models.DateTimeField(
+        verbose_name='Дата последнего отзыва',
+        null=True,
+        blank=True,
+    )
+    recent_weight = models.FloatField(
+        verbose_name='Сумма весов отзывов',
+        default=0,
+    )
+    recent_score_sum = models.FloatField(
+        verbose_name='Взвешенная сумма оценок',
+        default=0,
+    )
+
+    objects = TitleStatsQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'статистика произведения'
+        verbose_name_plural = 'статистика произведений'
+
+    def __str__(self):
+        return f'{self.title_id}: {self.review_count}'
+
+    @property
+    def histogram(self):
+        return {score: getattr(self, f'score_{score}') for score in SCORES}
+
+    @property
+    def rating(self):
+        if not self.review_count:
+            return None
+        return self.score_sum / self.review_count
+
+    @property
+    def recent_rating(self):
+        """Average score with recent reviews weighing more."""
+        if not self.review_count or not self.recent_weight:
+            return None
+        return self.recent_score_sum / self.recent_weight
+
+    @property
+    def trend(self):
+        if self.rating is None or self.recent_rating is None:
+            return None
+        return self.recent_rating - self.rating
+
+
+class LeaderboardEntry(models.Model):
+    """Position of a title in a materialized top list"""
+
+    ALL = 'all'
+    GENRE = 'genre'
+    CATEGORY = 'category'
+    YEAR = 'year'
+
+    BOARDS = (
+        (ALL, 'все произведения'),
+        (GENRE, 'жанр'),
+        (CATEGORY, 'категория'),
+        (YEAR, 'год выпуска'),
+    )
+    board = models.CharField(
+        verbose_name='Рейтинг',
+        max_length=16,
+        choices=BOARDS,
+    )
+    key = models.CharField(
+        verbose_name='Slug жанра, категории или год',
+        max_length=50,
+        blank=True,
+    )
+    position = models.PositiveIntegerField(
+        verbose_name='Место',
+    )
+    title = models.ForeignKey(
+        Title,
+        on_delete=models.CASCADE,
+        related_name='leaderboard_entries',
+        verbose_name='Произведение',
+    )
+    score = models.FloatField(
+        verbose_name='Взвешенная оценка',
+    )
+    rating = models.FloatField(
+        verbose_name='Средняя оценка',
+    )
+    review_count = models.PositiveIntegerField(
+        verbose_name='Количество отзывов',
+    )
+    refreshed_at = models.DateTimeField(
+        verbose_name='Дата обновления',
+        db_index=True,
+    )
+
+    class Meta:
+        verbose_name = 'место в рейтинге'
+        verbose_name_plural = 'места в рейтингах'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['board', 'key', 'position'],
+                name='unique_leaderboard_position',
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.board}:{self.key}:{self.position}'
+
+
+class ImportedRow(models.Model):
+    """Fingerprint of a CSV row applied by load_csv --incremental"""
+
+    source = models.CharField(
+        verbose_name='Файл',
+        max_length=64,
+    )
+    row_id = models.BigIntegerField(
+        verbose_name='Идентификатор строки',
+    )
+    digest = models.CharField(
+        verbose_name='Отпечаток строки',
+        max_length=40,
+    )
+
+    class Meta:
+        verbose_name = 'загруженная строка'
+        verbose_name_plural = 'загруженные строки'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['source', 'row_id'],
+                name='unique_imported_row',
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.source}:{self.row_id}'
+
+
+class OutgoingEmailQuerySet(models.QuerySet):
+    """QuerySet for the outbox of emails"""
+
+    def due(self, max_attempts):
+        return self.filter(
+            sent_at__isnull=True,
+            attempts__lt=max_attempts,
+            send_after__lte=timezone.now(),
+        )
+
+
+class OutgoingEmail(models.Model):
+    """Email queued in the request transaction, sent by a worker"""
+
+    subject = models.CharField(
+        verbose_name='Тема',
+        max_length=255,
+    )
+    body = models.TextField(
+        verbose_name='Текст письма',
+    )
+    from_email = models.CharField(
+        verbose_name='Отправитель',
+        max_length=254,
+    )
+    to = models.EmailField(
+        verbose_name='Получатель',
+        max_length=254,
+    )
+    created_at = models.DateTimeField(
+        verbose_name='Дата постановки в очередь',
+        auto_now_add=True,
+    )
+    send_after = models.DateTimeField(
+        verbose_name='Отправить не раньше',
+        default=timezone.now,
+    )
+    attempts = models.PositiveSmallIntegerField(
+        verbose_name='Попыток отправки',
+        default=0,
+    )
+    last_error = models.TextField(
+        verbose_name='Последняя ошибка',
+        blank=True,
+    )
+    sent_at = models.DateTimeField(
+        verbose_name='Дата отправки',
+        null=True,
+        blank=True,
+    )
+
+    objects = OutgoingEmailQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'письмо'
+        verbose_name_plural = 'исходящие письма'
+        indexes = [
+            models.Index(
+                fields=['send_after'],
+                name='outgoing_email_due_idx',
+                condition=Q(sent_at__isnull=True),
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.to}: {self.subject}'
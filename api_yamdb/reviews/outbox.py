@@ -0,0 +1,105 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutgoingEmail
+
+
+def queue_mail(subject, message, recipient_list, from_email=None):
+    """Queue an email per recipient for the send_queued_mail worker.
+
+    Called in the transaction of the change the email reports, the
+    email exists only if that change is committed.
+    """
+    return OutgoingEmail.objects.bulk_create([
+        OutgoingEmail(
+            subject=subject,
+            body=message,
+            from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+            to=recipient,
+        )
+        for recipient in recipient_list
+    ])
+
+
+def retry_delay(attempts):
+    """Return the exponential backoff after ``attempts`` failed sends."""
+    return timedelta(seconds=min(
+        settings.OUTBOX_RETRY_DELAY * 2 ** (attempts - 1),
+        settings.OUTBOX_MAX_RETRY_DELAY,
+    ))
+
+
+def claim(batch_size):
+    """Lease due emails to this worker for ``OUTBOX_LEASE`` seconds.
+
+    Concurrent workers skip the rows locked by each other. Emails of a
+    worker that died are sent again once their lease runs out.
+    """
+    with transaction.atomic():
+        ids = list(
+            OutgoingEmail.objects.due(settings.OUTBOX_MAX_ATTEMPTS)
+            .select_for_update(skip_locked=True)
+            .order_by('send_after', 'id')
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        OutgoingEmail.objects.filter(pk__in=ids).update(
+            send_after=timezone.now() + timedelta(
+                seconds=settings.OUTBOX_LEASE,
+            ),
+        )
+    return list(OutgoingEmail.objects.filter(pk__in=ids).order_by('id'))
+
+
+def deliver(emails):
+    """Send emails over one connection, return the failed ones.
+
+    Any error, a refused address or a header the backend cannot encode
+    as well as a dropped connection, fails only the email it was raised
+    for and is recorded on its row.
+    """
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as error:
+        return [(email, error) for email in emails]
+    failed = []
+    try:
+        for email in emails:
+            try:
+                EmailMessage(
+                    email.subject,
+                    email.body,
+                    email.from_email,
+                    [email.to],
+                    connection=connection,
+                ).send()
+            except Exception as error:
+                failed.append((email, error))
+    finally:
+        connection.close()
+    return failed
+
+
+def send_queued_mail(batch_size=None):
+    """Send one batch of due emails, return the sent and failed counts."""
+    emails = claim(batch_size or settings.OUTBOX_BATCH_SIZE)
+    if not emails:
+        return 0, 0
+    failed = dict(deliver(emails))
+    now = timezone.now()
+    for email in emails:
+        email.attempts += 1
+        if email in failed:
+            email.last_error = str(failed[email])
+            email.send_after = now + retry_delay(email.attempts)
+        else:
+            email.sent_at = now
+    OutgoingEmail.objects.bulk_update(
+        emails,
+        ['attempts', 'last_error', 'send_after', 'sent_at'],
+    )
+    return len(emails) - len(failed), len(failed)
@@ -0,0 +1,80 @@
+import threading
+
+from contextlib import contextmanager
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from reviews.models import Review, Title, TitleStats
+
+_deferred = threading.local()
+
+
+@contextmanager
+def ratings_deferred():
+    """Rebuild ratings and statistics of the touched titles once.
+
+    Yields the set of title ids to rebuild on leaving the block,
+    receivers add the titles of saved and deleted reviews to it and bulk
+    writes that send no signals add theirs by hand.
+    """
+    titles = set()
+    _deferred.titles = titles
+    try:
+        yield titles
+    finally:
+        _deferred.titles = None
+    if titles:
+        touched = Title.objects.filter(pk__in=titles)
+        touched.rebuild_ratings()
+        touched.rebuild_stats()
+
+
+def deferred_titles():
+    return getattr(_deferred, 'titles', None)
+
+
+@receiver(post_save, sender=Title)
+def create_stats(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        TitleStats.objects.create(title=instance)
+
+
+@receiver(post_save, sender=Review)
+def update_rating_on_save(sender, instance, created, raw, **kwargs):
+    if raw:
+        return
+    if deferred_titles() is not None:
+        deferred_titles().add(instance.title_id)
+        return
+    titles = Title.objects.filter(pk=instance.title_id)
+    stats = TitleStats.objects.filter(title=instance.title_id)
+    if created:
+        titles.change_rating(instance.score, 1)
+        if not stats.add_review(instance):
+            titles.rebuild_stats()
+        return
+    loaded_score = getattr(instance, '_loaded_score', None)
+    if loaded_score is None:
+        titles.rebuild_ratings()
+        titles.rebuild_stats()
+    elif loaded_score != instance.score:
+        titles.change_rating(instance.score - loaded_score, 0)
+        if not stats.change_score(instance, loaded_score):
+            titles.rebuild_stats()
+
+
+@receiver(post_delete, sender=Review)
+def update_rating_on_delete(sender, instance, **kwargs):
+    if deferred_titles() is not None:
+        deferred_titles().add(instance.title_id)
+        return
+    Title.objects.filter(pk=instance.title_id).change_rating(
+        -instance.score,
+        -1,
+    )
+    # Statistics may be gone already when the title is being deleted,
+    # a missing row is rebuilt by the next review.
+    TitleStats.objects.filter(title=instance.title_id).remove_review(
+        instance,
+    )
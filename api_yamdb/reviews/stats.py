@@ -0,0 +1,117 @@
+import math
+
+from datetime import timedelta
+
+SCORES = range(1, 11)
+# A review RECENT_SCALE older than another weighs e times less.
+RECENT_SCALE = timedelta(days=90)
+# Smaller recent weights left after a removal have lost too many digits
+# to be rescaled, see remove_review().
+MIN_RECENT_WEIGHT = 1e-6
+
+
+def recent_weight(pub_date, newest):
+    """Weight of a review in the recent rating of its title.
+
+    The recent rating is the average of scores weighted by publication
+    time, an exponentially decayed average. Weights are relative to the
+    newest review of the title, which weighs 1, so the sums never grow
+    past the review count.
+    """
+    return math.exp((pub_date - newest) / RECENT_SCALE)
+
+
+def empty_stats():
+    values = {f'score_{score}': 0 for score in SCORES}
+    values.update(
+        review_count=0,
+        score_sum=0,
+        last_review_at=None,
+        recent_weight=0.0,
+        recent_score_sum=0.0,
+    )
+    return values
+
+
+def add_recent(values, score, pub_date):
+    """Count a review into the recent sums and ``last_review_at``."""
+    newest = values['last_review_at']
+    if newest is not None and pub_date <= newest:
+        weight = recent_weight(pub_date, newest)
+    else:
+        if newest is not None:
+            # The review is the newest now, rescale the others to it.
+            scale = recent_weight(newest, pub_date)
+            values['recent_weight'] *= scale
+            values['recent_score_sum'] *= scale
+        values['last_review_at'] = pub_date
+        weight = 1.0
+    values['recent_weight'] += weight
+    values['recent_score_sum'] += weight * score
+
+
+def add_review(values, score, pub_date):
+    """Count a review into the field values of ``empty_stats()``."""
+    values[f'score_{score}'] += 1
+    values['review_count'] += 1
+    values['score_sum'] += score
+    add_recent(values, score, pub_date)
+
+
+def change_score(values, previous_score, score, pub_date):
+    values[f'score_{previous_score}'] -= 1
+    values[f'score_{score}'] += 1
+    values['score_sum'] += score - previous_score
+    values['recent_score_sum'] += (
+        recent_weight(pub_date, values['last_review_at'])
+        * (score - previous_score)
+    )
+
+
+def remove_review(values, score, pub_date, newest, reviews):
+    """Take a review out of the field values.
+
+    Its weight is subtracted from the recent sums. When it was the newest
+    review, ``newest()`` returns the publication date of the newest one
+    left and the sums are rescaled to it. If the subtraction cancelled
+    the sums, they are counted again from the ``(score, pub_date)`` pairs
+    of ``reviews()``, which only happens after deleting a review years
+    newer than the rest.
+    """
+    values[f'score_{score}'] -= 1
+    values['review_count'] -= 1
+    values['score_sum'] -= score
+    if not values['review_count']:
+        values.update(
+            recent_weight=0.0,
+            recent_score_sum=0.0,
+            last_review_at=None,
+        )
+        return
+    previous = values['last_review_at']
+    weight = recent_weight(pub_date, previous)
+    values['recent_weight'] -= weight
+    values['recent_score_sum'] -= weight * score
+    if pub_date < previous:
+        return
+    if values['recent_weight'] < MIN_RECENT_WEIGHT:
+        values.update(
+            recent_weight=0.0,
+            recent_score_sum=0.0,
+            last_review_at=None,
+        )
+        for kept_score, kept_pub_date in reviews():
+            add_recent(values, kept_score, kept_pub_date)
+        return
+    values['last_review_at'] = newest()
+    scale = recent_weight(previous, values['last_review_at'])
+    values['recent_weight'] *= scale
+    values['recent_score_sum'] *= scale
+
+
+def aggregate_reviews(title_ids, reviews):
+    """Return field values per title from ``(title_id, score, pub_date)``."""
+    stats = {title_id: empty_stats() for title_id in title_ids}
+    for title_id, score, pub_date in reviews:
+        add_review(stats[title_id], score, pub_date)
+    return stats
@@ -1,10 +1,69 @@
 import sys
 
+from functools import lru_cache
 from os.path import abspath, dirname, join
 
+import pytest
+
 root_dir = dirname(dirname(abspath(__file__)))
 sys.path.append(root_dir)
 infra_dir_path = join(root_dir, 'infra')
 
 pytest_plugins = [
+    'tests.fixtures.fixture_data',
+    'tests.fixtures.fixture_queries',
 ]
+
+
+@lru_cache(maxsize=None)
+def database_available():
+    from django.db import connection
+
+    try:
+        connection.get_new_connection(
+            connection.get_connection_params(),
+        ).close()
+    except Exception:
+        return False
+    return True
+
+
+def pytest_collection_modifyitems(config, items):
+    needs_database = any(
+        item.get_closest_marker('django_db') for item in items
+    )
+    if needs_database and not database_available():
+        from django.conf import settings
+
+        database = settings.DATABASES['default']
+        raise pytest.UsageError(
+            'База данных {HOST}:{PORT} недоступна. Запустите PostgreSQL '
+            '(DB_HOST, DB_PORT, POSTGRES_USER, POSTGRES_PASSWORD) или '
+            'укажите DB_ENGINE=django.db.backends.sqlite3'.format(**database)
+        )
+
+
+@pytest.fixture(autouse=True)
+def throttle_buckets():
+    """Start every test with full token buckets."""
+    from api.throttling import get_bucket_store
+
+    get_bucket_store.cache_clear()
+
+
+@pytest.fixture(autouse=True)
+def cached_users():
+    """Forget users cached by earlier tests, whose pks get reused.
+
+    Tests in a rolled back transaction never reach the on commit
+    invalidation.
+    """
+    from api.cache import user_cache
+
+    user_cache.clear()
+
+
+@pytest.fixture
+def conditional_get(settings):
+    """Answer reads with validators, off in the default settings."""
+    settings.CONDITIONAL_GET = True
@@ -0,0 +1,67 @@
+import pytest
+
+
+@pytest.fixture
+def user(django_user_model):
+    return django_user_model.objects.create(
+        username='TestUser',
+        email='testuser@yamdb.fake',
+    )
+
+
+@pytest.fixture
+def titles(user):
+    from reviews.models import Category, Comment, Genre, Review, Title
+
+    category = Category.objects.create(name='Фильм', slug='movie')
+    genres = [
+        Genre.objects.create(name=f'Жанр {number}', slug=f'genre_{number}')
+        for number in range(3)
+    ]
+    titles = []
+    for number in range(6):
+        title = Title.objects.create(
+            name=f'Произведение {number}',
+            year=2000 + number,
+            category=category,
+        )
+        title.genre.set(genres)
+        review = Review.objects.create(
+            title=title,
+            author=user,
+            text='Отзыв',
+            score=number + 1,
+        )
+        for _ in range(3):
+            Comment.objects.create(review=review, author=user, text='Ок')
+        titles.append(title)
+    return titles
+
+
+def token_client(user):
+    from rest_framework.test import APIClient
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    token = RefreshToken.for_user(user).access_token
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+    return client
+
+
+@pytest.fixture
+def user_client(user):
+    return token_client(user)
+
+
+@pytest.fixture
+def admin(django_user_model):
+    return django_user_model.objects.create(
+        username='TestAdmin',
+        email='testadmin@yamdb.fake',
+        role='admin',
+    )
+
+
+@pytest.fixture
+def admin_client(admin):
+    return token_client(admin)
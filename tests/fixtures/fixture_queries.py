@@ -0,0 +1,25 @@
+import pytest
+
+from collections import Counter
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.diagnostics import normalize_sql
+
+
+@pytest.fixture
+def assert_query_budget(client):
+    def check(url, budget, method='get', **kwargs):
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(client, method)(url, **kwargs)
+        queries = [query['sql'] for query in context.captured_queries]
+        shapes = Counter(normalize_sql(sql) for sql in queries)
+        assert len(queries) <= budget, (
+            f'Запрос {method.upper()} {url} выполнил {len(queries)} '
+            f'SQL-запросов при бюджете {budget}:\n' + '\n'.join(
+                f'{count} x {shape}' for shape, count in shapes.most_common()
+            )
+        )
+        return response
+    return check
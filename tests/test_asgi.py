@@ -0,0 +1,120 @@
+import asyncio
+import json
+import threading
+
+import pytest
+
+from django.core.wsgi import get_wsgi_application
+from django.db import connections
+
+from api.asgi import PooledASGIHandler, is_read
+
+
+@pytest.fixture
+def application():
+    return PooledASGIHandler(get_wsgi_application(), 2, 1)
+
+
+def call(application, method, path, body=b''):
+    scope = {
+        'type': 'http',
+        'method': method,
+        'path': path,
+        'query_string': b'',
+        'http_version': '1.1',
+        'headers': [(b'content-type', b'application/json')],
+        'client': ('10.0.0.1', 5000),
+    }
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': body}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(application(scope, receive, send))
+    start, *chunks = messages
+    assert not chunks[-1].get('more_body')
+    return start['status'], b''.join(chunk.get('body', b'') for chunk in chunks)
+
+
+def test_read_paths():
+    def scope(method, path):
+        return {'method': method, 'path': path}
+
+    assert is_read(scope('GET', '/api/v1/titles/'))
+    assert is_read(scope('GET', '/api/v1/titles/1/reviews/2/comments/'))
+    assert is_read(scope('HEAD', '/api/v1/genres/'))
+    assert not is_read(scope('POST', '/api/v1/titles/'))
+    assert not is_read(scope('GET', '/api/v1/users/me/'))
+
+
+def test_request_body_reaches_view(application):
+    status, body = call(application, 'POST', '/api/v1/auth/signup/', b'{}')
+    assert status == 400, 'Тело запроса должно передаваться в Django'
+    assert 'username' in json.loads(body)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_read_runs_in_pool(application):
+    from reviews.models import Category
+
+    Category.objects.create(name='Фильм', slug='movie')
+    status, body = call(application, 'GET', '/api/v1/categories/')
+    assert status == 200
+    assert json.loads(body)['results'] == [{'name': 'Фильм', 'slug': 'movie'}]
+
+
+def shut_down(application):
+    messages = iter([
+        {'type': 'lifespan.startup'},
+        {'type': 'lifespan.shutdown'},
+    ])
+    sent = []
+
+    async def receive():
+        return next(messages)
+
+    async def send(message):
+        sent.append(message['type'])
+
+    asyncio.run(application({'type': 'lifespan'}, receive, send))
+    return sent
+
+
+def test_lifespan_shuts_pools_down(application):
+    assert shut_down(application) == [
+        'lifespan.startup.complete',
+        'lifespan.shutdown.complete',
+    ]
+    with pytest.raises(RuntimeError):
+        application.read_executor.submit(print)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_lifespan_closes_thread_connections(application, monkeypatch):
+    barrier = threading.Barrier(application.read_threads)
+    closed = set()
+    close_all = connections.close_all
+
+    def connect():
+        connections['default'].ensure_connection()
+        barrier.wait()
+        return threading.get_ident()
+
+    def close_thread_connections():
+        closed.add(threading.get_ident())
+        close_all()
+
+    opened = {
+        future.result() for future in [
+            application.read_executor.submit(connect)
+            for _ in range(application.read_threads)
+        ]
+    }
+    monkeypatch.setattr(connections, 'close_all', close_thread_connections)
+    shut_down(application)
+    assert opened <= closed, (
+        'Соединения потоков пула должны закрываться при остановке'
+    )
@@ -0,0 +1,73 @@
+import pytest
+
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from api.cache import UserCache, user_cache
+
+
+def user_queries(client, url):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == 200
+    return [
+        query['sql'] for query in context.captured_queries
+        if 'FROM "reviews_user"' in query['sql']
+    ]
+
+
+@pytest.mark.django_db
+class TestCachedAuthentication:
+
+    def test_reads_need_no_user_query(self, user_client, titles):
+        user_cache.clear()
+        url = '/api/v1/categories/'
+        assert len(user_queries(user_client, url)) == 1
+        assert user_queries(user_client, url) == [], (
+            'Пользователь из токена должен браться из кеша'
+        )
+
+    # Users are dropped from the cache on commit.
+    @pytest.mark.django_db(transaction=True)
+    def test_role_change_invalidates(self, admin_client, user_client, user):
+        user_client.get('/api/v1/categories/')
+        data = {'name': 'Фильм', 'slug': 'movie'}
+        response = user_client.post('/api/v1/categories/', data)
+        assert response.status_code == 403
+        response = admin_client.patch(
+            f'/api/v1/users/{user.username}/',
+            {'role': 'admin'},
+        )
+        assert response.status_code == 200
+        response = user_client.post('/api/v1/categories/', data)
+        assert response.status_code == 201, (
+            'Смена роли должна сразу сбрасывать кеш пользователя'
+        )
+
+    def test_entries_expire(self, user):
+        cache = UserCache(ttl=-1)
+        cache.set(user, 1)
+        assert cache.get(type(user), user.pk, 1) is None
+        cache = UserCache(ttl=60, max_entries=1)
+        cache.set(user, 1)
+        cached = cache.get(type(user), user.pk, 1)
+        assert cached == user and cached is not user
+        assert cached.role == user.role
+
+    @pytest.mark.django_db(transaction=True)
+    def test_changes_reach_other_workers(self, user):
+        # Two caches stand for two workers sharing the versions cache.
+        workers = [UserCache(ttl=60), UserCache(ttl=60)]
+        for cache in workers:
+            cache.set(user, cache.version(user.pk))
+        with transaction.atomic():
+            user.role = user.ADMIN
+            user.save()
+            assert all(
+                cache.get(type(user), user.pk, cache.version(user.pk))
+                for cache in workers
+            ), 'Кеш должен сбрасываться только после фиксации транзакции'
+        for cache in workers:
+            assert cache.get(
+                type(user), user.pk, cache.version(user.pk),
+            ) is None, 'Смена роли должна сбрасывать кеш всех процессов'
@@ -0,0 +1,31 @@
+import pytest
+
+from django.core.management import CommandError
+
+from api.management.commands.benchmark_api import Command, percentile
+
+
+def test_percentile():
+    values = list(range(1, 101))
+    assert percentile(values, 0.5) == 50
+    assert percentile(values, 0.95) == 95
+    assert percentile(values, 0.99) == 99
+    assert percentile([7], 0.99) == 7
+
+
+def test_compare_reports_regressions():
+    baseline = {'titles': {
+        'p50': 5, 'p95': 10, 'p99': 12, 'queries': 3, 'throughput': 100,
+    }}
+    command = Command()
+    command.compare(
+        {'titles': dict(baseline['titles'], p95=11)}, baseline, 0.2,
+    )
+    with pytest.raises(CommandError, match='queries per request'):
+        command.compare(
+            {'titles': dict(baseline['titles'], queries=4)}, baseline, 0.2,
+        )
+    with pytest.raises(CommandError, match='p95'):
+        command.compare(
+            {'titles': dict(baseline['titles'], p95=13)}, baseline, 0.2,
+        )
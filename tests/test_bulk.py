@@ -0,0 +1,139 @@
+import pytest
+
+from api import bulk
+from reviews.models import Comment, Review, Title
+
+
+@pytest.mark.django_db
+class TestBulkReviews:
+    url = '/api/v1/reviews/bulk/'
+
+    def test_create_reports_every_item(self, admin_client, admin, titles):
+        response = admin_client.post(self.url, {'create': [
+            {'title': titles[0].id, 'text': 'Отлично', 'score': 10},
+            {'title': titles[0].id, 'text': 'Повтор', 'score': 1},
+            {'title': titles[1].id, 'text': 'Плохо', 'score': 11},
+            {'title': 999999, 'text': 'Нет', 'score': 5},
+            {
+                'title': titles[1].id,
+                'text': 'Импорт',
+                'score': 2,
+                'author': 'TestUser',
+            },
+        ]}, format='json')
+        assert response.status_code == 200
+        results = response.json()['create']
+        assert [result['status'] for result in results] == [
+            201, 400, 400, 404, 400,
+        ], (
+            'Повторный отзыв, неверная оценка, несуществующее произведение '
+            'и второй отзыв пользователя должны быть отклонены поштучно'
+        )
+        review = Review.objects.get(pk=results[0]['id'])
+        assert review.author == admin and review.title == titles[0]
+        titles[0].refresh_from_db()
+        assert titles[0].rating == pytest.approx((1 + 10) / 2), (
+            'Рейтинг произведения должен учитывать новые отзывы'
+        )
+
+    def test_only_admin_sets_author(self, user_client, titles, admin):
+        response = user_client.post(self.url, {'create': [
+            {
+                'title': titles[0].id,
+                'text': '!',
+                'score': 3,
+                'author': admin.username,
+            },
+        ]}, format='json')
+        assert response.json()['create'][0]['status'] == 403
+
+    def test_update_and_delete(self, user_client, admin, titles):
+        own = titles[0].reviews.get()
+        foreign = Review.objects.create(
+            title=titles[0], author=admin, text='!', score=10,
+        )
+        response = user_client.post(self.url, {
+            'update': [
+                {'id': own.id, 'score': 5},
+                {'id': foreign.id, 'score': 1},
+            ],
+            'delete': [titles[1].reviews.get().id, 'x'],
+        }, format='json')
+        results = response.json()
+        assert [r['status'] for r in results['update']] == [200, 403]
+        assert [r['status'] for r in results['delete']] == [204, 400]
+
+        ratings = dict(Title.objects.values_list('pk', 'rating'))
+        assert ratings[titles[0].id] == pytest.approx((5 + 10) / 2)
+        assert ratings[titles[1].id] is None
+        assert not Comment.objects.filter(review__title=titles[1]).exists()
+
+    def test_invalid_payload(self, user_client):
+        assert user_client.post(
+            self.url, {'upsert': []}, format='json',
+        ).status_code == 400
+        assert user_client.post(
+            self.url, {'create': {}}, format='json',
+        ).status_code == 400
+
+
+@pytest.mark.django_db(transaction=True)
+def test_bulk_comments(user_client, titles, conditional_get):
+    review = titles[0].reviews.get()
+    etag = user_client.get(
+        f'/api/v1/titles/{titles[0].id}/reviews/{review.id}/comments/',
+    )['ETag']
+    response = user_client.post('/api/v1/comments/bulk/', {'create': [
+        {'review': review.id, 'text': 'Первый'},
+        {'review': review.id, 'text': 'Второй'},
+        {'review': 999999, 'text': 'Мимо'},
+    ]}, format='json')
+    assert [r['status'] for r in response.json()['create']] == [
+        201, 201, 404,
+    ]
+    assert review.comments.count() == 5
+    assert user_client.get(
+        f'/api/v1/titles/{titles[0].id}/reviews/{review.id}/comments/',
+    )['ETag'] != etag, 'Пакетная запись должна менять ETag комментариев'
+
+
+@pytest.mark.django_db
+def test_bulk_titles(admin_client, user_client, titles):
+    genres = [genre.slug for genre in titles[0].genre.all()]
+    feed = {'create': [
+        {
+            'name': f'Новинка {number}',
+            'year': 2020,
+            'category': 'movie',
+            'genre': genres[:2] + genres[:1],
+            'description': 'Описание',
+        }
+        for number in range(20)
+    ] + [
+        {
+            'name': 'Ошибка',
+            'year': 2020,
+            'category': 'book',
+            'genre': ['unknown'],
+            'description': 'Описание',
+        },
+    ]}
+    assert user_client.post(
+        '/api/v1/titles/bulk/', feed, format='json',
+    ).status_code == 403
+    response = admin_client.post('/api/v1/titles/bulk/', feed, format='json')
+    results = response.json()['create']
+    assert [result['status'] for result in results] == [201] * 20 + [400]
+    assert set(results[-1]['errors']) == {'category', 'genre'}
+    title = Title.objects.get(pk=results[0]['id'])
+    assert sorted(title.genre.values_list('slug', flat=True)) == genres[:2]
+    assert title.category.slug == 'movie'
+    response = admin_client.post(
+        '/api/v1/titles/bulk/',
+        {'delete': [title.pk]},
+        format='json',
+    )
+    assert response.status_code == 400, (
+        'Пакетная загрузка произведений поддерживает только создание'
+    )
+    assert not hasattr(bulk.TitleBulkWriter, 'delete')
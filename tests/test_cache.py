@@ -0,0 +1,80 @@
+import pytest
+
+from django.db import transaction
+
+from api.cache import CatalogCache, catalog_cache, resource_versions
+from api.checks import check_user_cache, check_versions_cache
+from reviews.models import Genre
+
+
+@pytest.mark.django_db(transaction=True)
+class TestCatalogCache:
+
+    def test_page_is_computed_once_until_invalidated(self):
+        cache = CatalogCache(timeout=60)
+        cache.cache.clear()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return {'results': len(calls)}
+
+        url = 'http://testserver/api/v1/genres/'
+        assert cache.get_page('genre', url, compute) == {'results': 1}
+        assert cache.get_page('genre', url, compute) == {'results': 1}
+        cache.invalidate('category')
+        assert cache.get_page('genre', url, compute) == {'results': 1}, (
+            'Изменение категорий не должно сбрасывать кеш жанров'
+        )
+        cache.invalidate('genre')
+        assert cache.get_page('genre', url, compute) == {'results': 2}
+        assert cache.stats() == {'page_hits': 2, 'page_misses': 2}
+
+    def test_versions_change_on_commit(self):
+        version = resource_versions.get('titles')
+        with transaction.atomic():
+            resource_versions.bump('titles')
+            with resource_versions.batch():
+                resource_versions.bump('titles')
+            assert resource_versions.get('titles') == version, (
+                'Версия не должна меняться до фиксации транзакции'
+            )
+        committed = resource_versions.get('titles')
+        assert committed > version
+        with pytest.raises(ValueError), transaction.atomic():
+            resource_versions.bump('titles')
+            raise ValueError
+        assert resource_versions.get('titles') == committed, (
+            'Откат транзакции не должен менять версию'
+        )
+
+    def test_slugs_are_dropped_on_commit(self):
+        pk = Genre.objects.create(name='Драма', slug='drama').pk
+        assert catalog_cache.slug_to_pk(Genre, 'drama') == pk
+        key = f'{catalog_cache.prefix}:genre:slug:drama'
+        with transaction.atomic():
+            Genre.objects.get(pk=pk).delete()
+            assert catalog_cache.cache.get(key) == pk, (
+                'Запись кеша должна удаляться после фиксации транзакции'
+            )
+        assert catalog_cache.cache.get(key) is None
+        assert catalog_cache.slug_to_pk(Genre, 'drama') is None
+
+
+def test_per_process_versions_cache_checks(settings):
+    settings.CACHES = {'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }}
+    assert check_versions_cache(None) == []
+    settings.CONDITIONAL_GET = True
+    assert [error.id for error in check_versions_cache(None)] == [
+        'api.E001',
+    ], 'Валидаторы из счетчиков одного процесса должны быть запрещены'
+    assert [warning.id for warning in check_user_cache(None)] == [
+        'api.W002',
+    ]
+    settings.CACHES['default']['BACKEND'] = (
+        'django.core.cache.backends.filebased.FileBasedCache'
+    )
+    assert check_versions_cache(None) == []
+    assert check_user_cache(None) == []
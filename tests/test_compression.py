@@ -0,0 +1,62 @@
+import gzip
+import zlib
+
+import pytest
+
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory
+
+from api import compression
+from api.compression import compress_stream, negotiate_encoding
+from api.middleware import CompressionMiddleware
+
+BODY = b'{"results":[' + b','.join([b'{"name":"title"}'] * 100) + b']}'
+
+
+@pytest.fixture
+def without_brotli(monkeypatch):
+    monkeypatch.setattr(compression, 'brotli', None)
+
+
+def test_negotiate_encoding(without_brotli):
+    assert negotiate_encoding('gzip, deflate, br') == 'gzip'
+    assert negotiate_encoding('deflate;q=0.9, gzip;q=0.5') == 'deflate'
+    assert negotiate_encoding('gzip;q=0, *;q=0.1') == 'deflate'
+    assert negotiate_encoding('identity') is None
+    assert negotiate_encoding('') is None
+
+
+def respond(response, accept='gzip'):
+    middleware = CompressionMiddleware(lambda request: response)
+    request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING=accept)
+    return middleware(request)
+
+
+def test_compress_response(without_brotli):
+    response = respond(HttpResponse(BODY, content_type='application/json'))
+    assert response['Content-Encoding'] == 'gzip'
+    assert response['Vary'] == 'Accept-Encoding'
+    assert gzip.decompress(response.content) == BODY
+    assert int(response['Content-Length']) == len(response.content)
+    response = respond(HttpResponse(BODY), 'deflate')
+    assert zlib.decompress(response.content) == BODY
+    response = respond(HttpResponse(b'{}'))
+    assert not response.has_header('Content-Encoding'), (
+        'Короткие ответы сжимать не нужно'
+    )
+
+
+def test_compress_streaming_response(without_brotli):
+    chunks = [BODY[:100], BODY[100:], b'']
+    response = respond(StreamingHttpResponse(iter(chunks)))
+    parts = list(response.streaming_content)
+    assert len(parts) > 2, 'Каждый фрагмент должен отправляться сразу'
+    assert gzip.decompress(b''.join(parts)) == BODY
+
+
+def test_brotli():
+    if compression.brotli is None:
+        pytest.skip('brotli is not installed')
+    assert negotiate_encoding('gzip, br') == 'br'
+    stream = b''.join(compress_stream('br', [BODY[:10], BODY[10:]]))
+    assert compression.brotli.decompress(stream) == BODY
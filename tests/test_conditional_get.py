@@ -0,0 +1,88 @@
+import pytest
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from reviews.models import Comment, Review
+
+
+# Versions are bumped on commit.
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.usefixtures('conditional_get')
+class TestConditionalGet:
+
+    def test_not_modified_without_queries(self, client, titles):
+        url = f'/api/v1/titles/{titles[0].id}/'
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response['ETag'] and response['Last-Modified']
+
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        assert response.status_code == 304, (
+            'Ответ на запрос с актуальным `If-None-Match` должен иметь '
+            'статус 304'
+        )
+        assert not context.captured_queries, (
+            'Ответ 304 должен отдаваться без обращений к базе данных'
+        )
+
+    def test_review_changes_validators(self, client, user, titles):
+        title = titles[0]
+        urls = [
+            '/api/v1/titles/',
+            f'/api/v1/titles/{title.id}/',
+            f'/api/v1/titles/{title.id}/reviews/',
+        ]
+        etags = {url: client.get(url)['ETag'] for url in urls}
+        untouched = f'/api/v1/titles/{titles[1].id}/'
+        untouched_etag = client.get(untouched)['ETag']
+
+        title.reviews.get().delete()
+        Review.objects.create(title=title, author=user, text='!', score=1)
+
+        for url, etag in etags.items():
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+            assert response.status_code == 200, (
+                f'После изменения отзывов `{url}` должен вернуть '
+                'новое содержимое'
+            )
+            assert response['ETag'] != etag
+        response = client.get(untouched, HTTP_IF_NONE_MATCH=untouched_etag)
+        assert response.status_code == 304
+
+    def test_comment_changes_validators(self, client, user, titles):
+        review = titles[0].reviews.get()
+        url = f'/api/v1/titles/{titles[0].id}/reviews/{review.id}/comments/'
+        etag = client.get(url)['ETag']
+        Comment.objects.create(review=review, author=user, text='!')
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert len(response.json()['results']) == 4
+
+    def test_only_renames_change_author_validators(self, client, titles):
+        review = titles[0].reviews.get()
+        url = f'/api/v1/titles/{titles[0].id}/reviews/'
+        etag = client.get(url)['ETag']
+        author = type(review.author).objects.get(pk=review.author_id)
+        author.bio = 'Новая биография'
+        author.save()
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304, (
+            'Изменение профиля без смены имени не должно сбрасывать '
+            'валидаторы отзывов'
+        )
+        author.username = 'renamed'
+        author.save()
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert response.json()['results'][0]['author'] == 'renamed'
+
+
+@pytest.mark.django_db
+def test_off_by_default(client, titles):
+    response = client.get(f'/api/v1/titles/{titles[0].id}/')
+    assert response.status_code == 200
+    assert not response.has_header('ETag'), (
+        'Без CONDITIONAL_GET ответы не должны содержать валидаторы'
+    )
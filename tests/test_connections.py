@@ -0,0 +1,187 @@
+import time
+
+from types import SimpleNamespace
+
+import pytest
+
+from django.db import OperationalError
+from django.db import connection as db_connection
+from psycopg2 import extensions
+
+from api import connections
+from api.backends.postgresql.base import DatabaseWrapper
+from api.checks import check_pool_size
+from api.connections import (
+    ConnectionPool,
+    PoolTimeoutError,
+    render_metrics,
+    stats,
+)
+
+
+class FakeConnection:
+
+    def __init__(self):
+        self.closed = 0
+        self.status = extensions.TRANSACTION_STATUS_IDLE
+        self.rollbacks = 0
+
+    def get_transaction_status(self):
+        return self.status
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.status = extensions.TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+@pytest.fixture(autouse=True)
+def clean_stats():
+    stats.reset()
+
+
+def test_pool_reuses_and_resets_connections():
+    pool = ConnectionPool(max_size=2, timeout=1, check_interval=60)
+    opened = []
+
+    def connect():
+        opened.append(FakeConnection())
+        return opened[-1]
+
+    connection = pool.acquire(connect)
+    connection.status = extensions.TRANSACTION_STATUS_INTRANS
+    pool.release(connection)
+    assert connection.rollbacks == 1, (
+        'Незавершённая транзакция должна откатываться при возврате в пул'
+    )
+    assert pool.acquire(connect) is connection
+    assert len(opened) == 1, 'Пул должен переиспользовать соединения'
+    assert pool.in_use == 1
+    assert stats.counts['opened'] == 1
+
+
+def test_pool_is_bounded():
+    pool = ConnectionPool(max_size=1, timeout=0.01, check_interval=60)
+    connection = pool.acquire(FakeConnection)
+    with pytest.raises(PoolTimeoutError):
+        pool.acquire(FakeConnection)
+    assert stats.counts['pool_timeouts'] == 1
+    pool.release(connection)
+    assert pool.acquire(FakeConnection) is connection
+
+
+def test_pool_drops_broken_connections(monkeypatch):
+    pool = ConnectionPool(max_size=2, timeout=1, check_interval=0)
+    broken = pool.acquire(FakeConnection)
+    pool.release(broken)
+    monkeypatch.setattr(connections, 'is_usable', lambda connection: False)
+    fresh = pool.acquire(FakeConnection)
+    assert fresh is not broken, (
+        'Соединение, не прошедшее проверку, не должно выдаваться'
+    )
+    assert broken.closed
+    assert stats.counts['health_check_failures'] == 1
+
+
+def test_close_pool():
+    pool = ConnectionPool(max_size=2, timeout=1, check_interval=60)
+    idle, busy = pool.acquire(FakeConnection), pool.acquire(FakeConnection)
+    pool.release(idle)
+    pool.close()
+    assert idle.closed and not busy.closed
+    pool.release(busy)
+    assert busy.closed, 'Закрытый пул должен закрывать возвращённые соединения'
+    assert pool.in_use == 0 and pool.idle == []
+
+
+def test_health_check_closes_idle_broken_connections(monkeypatch, settings):
+    settings.DB_HEALTH_CHECK_INTERVAL = 10
+    wrappers = [
+        SimpleNamespace(
+            connection=object(),
+            idle_since=time.monotonic() - idle,
+            in_atomic_block=False,
+            is_usable=lambda: False,
+            closed=False,
+        )
+        for idle in (60, 1)
+    ]
+    for wrapper in wrappers:
+        wrapper.close = lambda wrapper=wrapper: setattr(
+            wrapper, 'closed', True,
+        )
+    monkeypatch.setattr(
+        connections,
+        'connections',
+        SimpleNamespace(all=lambda: wrappers),
+    )
+    connections.check_connections()
+    assert [wrapper.closed for wrapper in wrappers] == [True, False], (
+        'Проверяться должны только долго простаивавшие соединения'
+    )
+
+
+def test_metrics(monkeypatch):
+    pool = ConnectionPool(max_size=2, timeout=1, check_interval=60)
+    monkeypatch.setattr(connections, 'pools', {'test': pool})
+    pool.acquire(FakeConnection)
+    text = '\n'.join(render_metrics('yamdb'))
+    assert 'yamdb_db_connections_opened_total 1' in text
+    assert 'yamdb_db_pool_wait_seconds_count 1' in text
+    assert (
+        'yamdb_db_pool_connections{alias="test",state="in_use"} 1'
+    ) in text
+
+
+@pytest.mark.skipif(
+    db_connection.vendor != 'postgresql',
+    reason='Пул соединений работает только с PostgreSQL',
+)
+@pytest.mark.django_db(transaction=True)
+def test_pooled_database_wrapper(monkeypatch):
+    settings_dict = {
+        **db_connection.settings_dict,
+        'ENGINE': 'api.backends.postgresql',
+        'POOL': {'MAX_SIZE': 1, 'TIMEOUT': 0.1},
+    }
+    # The alias names the pool; django.contrib.postgres also looks the
+    # connection up by it, so it has to be a configured one.
+    first = DatabaseWrapper(settings_dict)
+    second = DatabaseWrapper(settings_dict)
+    monkeypatch.setattr(connections, 'pools', {})
+    try:
+        with first.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        raw = first.connection
+        with pytest.raises(OperationalError):
+            second.ensure_connection()
+        first.close_if_unusable_or_obsolete()
+        assert first.connection is None and not raw.closed, (
+            'В конце запроса соединение должно возвращаться в пул'
+        )
+        with second.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        assert second.connection is raw, (
+            'Соединение из пула должно использоваться повторно'
+        )
+        second.close()
+    finally:
+        connections.pools['default'].close()
+    assert raw.closed
+
+
+def test_pool_size_check(settings):
+    settings.ASGI_READ_THREADS = 3
+    settings.ASGI_WRITE_THREADS = 2
+    settings.DATABASES = {
+        'default': {
+            **settings.DATABASES['default'],
+            'ENGINE': 'api.backends.postgresql',
+            'POOL': {'MAX_SIZE': 4},
+        },
+    }
+    assert [warning.id for warning in check_pool_size(None)] == ['api.W001']
+    settings.DATABASES['default']['POOL'] = {}
+    assert check_pool_size(None) == []
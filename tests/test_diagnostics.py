@@ -0,0 +1,54 @@
+import logging
+
+import pytest
+
+from django.db import connection
+
+from api.diagnostics import QueryInspector, normalize_sql
+from reviews.models import Title
+
+
+def test_normalize_sql():
+    assert normalize_sql(
+        'SELECT "reviews_genre"."id", "reviews_genre"."name" '
+        'FROM "reviews_genre" WHERE "reviews_genre"."id" = %s LIMIT 21'
+    ) == 'SELECT ... FROM reviews_genre WHERE reviews_genre.id = ? LIMIT ?'
+    assert normalize_sql(
+        "SELECT DISTINCT a FROM t WHERE b IN (%s, %s, %s) AND c = 'x'"
+    ) == 'SELECT DISTINCT ... FROM t WHERE b IN (...) AND c = ?'
+    assert normalize_sql(
+        'SELECT a FROM t WHERE b IN (1, 2)'
+    ) == normalize_sql('SELECT a FROM t WHERE b IN (3)')
+
+
+@pytest.mark.django_db
+class TestQueryInspector:
+
+    def test_flags_repeated_shapes(self, titles):
+        inspector = QueryInspector(repeat_threshold=1, slow_threshold=60)
+        with connection.execute_wrapper(inspector):
+            for title in Title.objects.all():
+                title.category.name
+        [(shape, count)] = inspector.repeated()
+        assert count == len(titles)
+        assert 'FROM reviews_category WHERE' in shape
+
+    def test_middleware_logs_slow_queries_with_stack(
+        self, client, settings, caplog, titles,
+    ):
+        settings.SLOW_QUERY_MS = 0
+        settings.MIDDLEWARE = [
+            'api.middleware.QueryDiagnosticsMiddleware',
+            *settings.MIDDLEWARE,
+        ]
+        with caplog.at_level(logging.WARNING, logger='api.diagnostics'):
+            client.get('/api/v1/titles/')
+        messages = [record.getMessage() for record in caplog.records]
+        assert not [
+            message for message in messages if 'Repeated' in message
+        ], 'Список произведений не должен выполнять запросы в цикле'
+        assert any(
+            'Slow query in GET /api/v1/titles/ (TitleViewSet.list)' in message
+            and 'api/pagination.py' in message.replace('\\', '/')
+            for message in messages
+        ), 'Медленный запрос должен логироваться со стеком вызова'
@@ -0,0 +1,56 @@
+import pytest
+
+from django.db.models import Avg, Count
+
+from reviews.generators import generate_dataset, zipf_weights
+from reviews.models import Comment, GenreTitle, Review, Title, User
+
+
+def test_zipf_weights():
+    weights = zipf_weights(4, 1.0)
+    assert sum(weights) == pytest.approx(1)
+    assert weights[0] == pytest.approx(2 * weights[1])
+    assert weights[0] == pytest.approx(4 * weights[3])
+
+
+@pytest.mark.django_db
+def test_generate_dataset():
+    counts = generate_dataset(
+        20, 200, 400, users=30, categories=2, genres=4,
+    )
+    assert counts[Title] == Title.objects.count() == 20
+    assert counts[User] == User.objects.count() == 30
+    assert counts[Review] == Review.objects.count()
+    assert counts[Comment] == Comment.objects.count()
+    assert counts[GenreTitle] == GenreTitle.objects.count()
+
+    reviews = sorted(
+        Title.objects.values_list('rating_count', flat=True),
+        reverse=True,
+    )
+    assert reviews[0] <= 30, (
+        'Произведение не может получить больше одного отзыва '
+        'от каждого пользователя'
+    )
+    assert reviews[0] > 3 * reviews[len(reviews) // 2], (
+        'Число отзывов на произведения должно быть неравномерным'
+    )
+
+    stored = dict(
+        Title.objects.filter(rating_count__gt=0).values_list('pk', 'rating')
+    )
+    live = dict(
+        Title.objects.filter(rating_count__gt=0)
+        .annotate(live=Avg('reviews__score'))
+        .values_list('pk', 'live')
+    )
+    assert stored == pytest.approx(live), (
+        'Рейтинг сгенерированных произведений должен совпадать '
+        'со средней оценкой отзывов'
+    )
+    assert not (
+        GenreTitle.objects.values('title_id', 'genre_id')
+        .annotate(total=Count('id'))
+        .filter(total__gt=1)
+        .exists()
+    )
@@ -0,0 +1,166 @@
+import heapq
+import io
+import random
+import time
+
+from collections import defaultdict
+from datetime import timedelta
+
+import pytest
+
+from django.core.management import call_command
+from django.utils import timezone
+
+from reviews.leaderboards import (
+    bayesian_score,
+    rank_titles,
+    refresh_leaderboards,
+)
+from reviews.models import LeaderboardEntry, Review, User
+
+
+def test_single_review_does_not_top_the_chart():
+    titles = [
+        (1, 2000, 'movie', 10, 1),
+        (2, 2000, 'movie', 9 * 50, 50),
+        (3, 2001, None, 5 * 4, 4),
+    ]
+    boards = rank_titles(titles, [(1, 'drama'), (3, 'drama')], 2, 6, 10)
+    assert [row[0] for row in boards['all', '']] == [2, 1], (
+        'Произведение с одной оценкой 10 не должно обгонять '
+        'произведение с множеством высоких оценок'
+    )
+    assert [row[0] for row in boards['genre', 'drama']] == [1, 3]
+    assert [row[0] for row in boards['year', '2001']] == [3]
+    assert ('category', None) not in boards
+    assert bayesian_score(0, 0, 6, 10) == 6
+
+
+def test_bounded_heaps_match_full_sort():
+    generator = random.Random(17)
+    titles = [
+        (
+            title_id,
+            generator.randrange(1990, 1995),
+            generator.choice(['movie', 'book', None]),
+            generator.randrange(1, 11) * count,
+            count,
+        )
+        for title_id, count in (
+            (title_id, generator.randrange(1, 6))
+            for title_id in range(1, 500)
+        )
+    ]
+    genres = [
+        (title_id, generator.choice(['drama', 'rock', 'tale']))
+        for title_id in range(1, 520)
+    ]
+    boards = defaultdict(list)
+    rows = {}
+    for title_id, year, category, score_sum, review_count in titles:
+        row = (
+            title_id,
+            bayesian_score(score_sum, review_count, 6, 10),
+            score_sum,
+            review_count,
+        )
+        rows[title_id] = row
+        boards['all', ''].append(row)
+        boards['year', str(year)].append(row)
+        if category is not None:
+            boards['category', category].append(row)
+    for title_id, genre in genres:
+        if title_id in rows:
+            boards['genre', genre].append(rows[title_id])
+    expected = {
+        board: heapq.nlargest(
+            7, candidates, key=lambda row: (row[1], row[3], -row[0]),
+        )
+        for board, candidates in boards.items()
+    }
+    assert rank_titles(titles, genres, 7, 6, 10) == expected
+
+
+@pytest.mark.django_db
+class TestLeaderboards:
+
+    def test_refresh_and_paginate(self, client, titles):
+        for index, title in enumerate(titles):
+            for number in range(index):
+                author = User.objects.create(
+                    username=f'fan{index}_{number}',
+                    email=f'fan{index}_{number}@yamdb.fake',
+                )
+                Review.objects.create(
+                    title=title, author=author, text='!', score=10,
+                )
+        written = refresh_leaderboards(size=4, min_reviews=1)
+        assert written == LeaderboardEntry.objects.count()
+        response = client.get('/api/v1/leaderboards/?cursor=&limit=3')
+        assert response.status_code == 200
+        data = response.json()
+        assert [entry['position'] for entry in data['results']] == [1, 2, 3]
+        assert data['results'][0]['title']['id'] == titles[-1].id, (
+            'Во главе рейтинга должно быть произведение с наибольшим '
+            'числом высоких оценок'
+        )
+        data = client.get(data['next']).json()
+        assert [entry['position'] for entry in data['results']] == [4]
+        assert data['next'] is None
+
+        genre = titles[0].genre.first()
+        response = client.get(f'/api/v1/leaderboards/genre/{genre.slug}/')
+        assert response.json()['count'] > 0
+        response = client.get('/api/v1/leaderboards/year/1/')
+        assert response.json()['count'] == 0
+
+    def test_query_budget(self, assert_query_budget, titles, conditional_get):
+        refresh_leaderboards()
+        # The boards version is read from the entries.
+        assert_query_budget('/api/v1/leaderboards/', 4)
+
+    def test_refresh_changes_validators(
+        self,
+        client,
+        titles,
+        conditional_get,
+    ):
+        refresh_leaderboards()
+        response = client.get('/api/v1/leaderboards/')
+        etag = response['ETag']
+        assert client.get(
+            '/api/v1/leaderboards/', HTTP_IF_NONE_MATCH=etag,
+        ).status_code == 304
+        # Refreshed by cron in a process with a cache of its own.
+        LeaderboardEntry.objects.update(
+            refreshed_at=timezone.now() + timedelta(minutes=1),
+        )
+        response = client.get('/api/v1/leaderboards/', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, (
+            'Обновление рейтингов должно менять ETag без сброса кеша версий'
+        )
+
+    # Versions of other resources are bumped on commit.
+    @pytest.mark.django_db(transaction=True)
+    def test_writes_keep_validators(self, client, titles, conditional_get):
+        refresh_leaderboards()
+        etag = client.get('/api/v1/leaderboards/')['ETag']
+        titles[1].reviews.get().delete()
+        titles[0].name = 'Новое название'
+        titles[0].save()
+        response = client.get('/api/v1/leaderboards/', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304, (
+            'Рейтинги меняются только при пересчете, записи отзывов и '
+            'произведений не должны менять их ETag'
+        )
+
+    def test_refresh_in_a_loop(self, titles, monkeypatch):
+        def stop(seconds):
+            raise KeyboardInterrupt
+
+        monkeypatch.setattr(time, 'sleep', stop)
+        output = io.StringIO()
+        with pytest.raises(KeyboardInterrupt):
+            call_command('refresh_leaderboards', '--loop', stdout=output)
+        assert 'Leaderboards refreshed' in output.getvalue()
+        assert LeaderboardEntry.objects.exists()
@@ -0,0 +1,123 @@
+import pytest
+
+from django.db import IntegrityError, connection
+
+from reviews.loaders import CSV_SOURCES, foreign_keys_deferred, sync_source
+from reviews.models import Category, Comment, Review, Title, User
+
+MISSING = 10 ** 6
+
+
+def invalid_constraints():
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT conname FROM pg_constraint WHERE NOT convalidated',
+        )
+        return {name for name, in cursor.fetchall()}
+
+
+def foreign_key_names():
+    with connection.cursor() as cursor:
+        return {
+            name
+            for model in (Title, Review, Comment)
+            for name, constraint in connection.introspection.get_constraints(
+                cursor,
+                model._meta.db_table,
+            ).items()
+            if constraint['foreign_key']
+        }
+
+
+def break_foreign_keys(titles):
+    Title.objects.filter(pk=titles[1].pk).update(category=MISSING)
+    orphan = titles[2].reviews.get()
+    Review.objects.filter(pk=orphan.pk).update(author=MISSING)
+    return orphan
+
+
+@pytest.mark.django_db
+def test_orphans_fail_the_load(titles):
+    names = foreign_key_names()
+    with pytest.raises(IntegrityError) as error, foreign_keys_deferred(
+        connection,
+        [Category, User, Title, Review, Comment],
+    ):
+        orphan = break_foreign_keys(titles)
+    assert (
+        f'Review.author: 1 rows point to missing User rows, ids {orphan.pk}'
+        in str(error.value)
+    ), 'Ошибка загрузки должна перечислять строки-сироты'
+    assert Review.objects.filter(pk=orphan.pk).exists(), (
+        'Без --prune-orphans загрузка не должна удалять строки'
+    )
+    assert Title.objects.filter(category=MISSING).exists()
+    assert foreign_key_names() == names, (
+        'Ограничения должны пересоздаваться с прежними именами'
+    )
+    if connection.vendor == 'postgresql':
+        assert len(invalid_constraints()) == 2, (
+            'Ограничения со строками-сиротами должны остаться NOT VALID'
+        )
+    # The test database checks the constraints on teardown.
+    Title.objects.filter(category=MISSING).update(category=None)
+    orphan.delete()
+
+
+@pytest.mark.django_db
+def test_orphans_are_pruned(titles):
+    with foreign_keys_deferred(
+        connection,
+        [Category, User, Title, Review, Comment],
+        prune=True,
+    ) as pruned:
+        orphan = break_foreign_keys(titles)
+    assert 'Review.author: deleted 1 rows pointing to missing User rows' in (
+        pruned
+    ), 'Загрузка должна перечислять удаленные строки'
+    assert Title.objects.get(pk=titles[1].pk).category is None, (
+        'Ссылка на несуществующую категорию должна очищаться'
+    )
+    assert not Review.objects.filter(pk=orphan.pk).exists()
+    assert not Comment.objects.filter(review=orphan.pk).exists(), (
+        'Комментарии удаленного отзыва тоже должны удаляться'
+    )
+    assert Review.objects.count() == len(titles) - 1
+    if connection.vendor == 'postgresql':
+        assert not invalid_constraints(), (
+            'После загрузки не должно оставаться ограничений NOT VALID'
+        )
+
+
+@pytest.mark.django_db
+def test_sync_skips_rows_created_through_api(tmp_path):
+    source = next(
+        source for source in CSV_SOURCES if source.model is Category
+    )
+    created = Category.objects.create(name='Фильм', slug='movie')
+
+    def sync(*rows):
+        (tmp_path / source.filename).write_text(
+            'id,name,slug\n' + ''.join(f'{row}\n' for row in rows),
+            encoding='utf-8',
+        )
+        return sync_source(source, tmp_path, batch_size=10)
+
+    imported = created.pk + 1
+    result = sync(f'{created.pk},Книга,book', f'{imported},Музыка,music')
+    assert result.conflicts == [created.pk], (
+        'Строка файла с id записи из API должна пропускаться'
+    )
+    assert result.changes['inserted'] == 1
+    created.refresh_from_db()
+    assert (created.name, created.slug) == ('Фильм', 'movie'), (
+        'Записи, созданные через API, не должны перезаписываться'
+    )
+    result = sync(f'{created.pk},Книга,book', f'{imported},Песни,songs')
+    assert result.changes['updated'] == 1
+    assert Category.objects.get(pk=imported).slug == 'songs'
+    result = sync()
+    assert result.changes['deleted'] == 1
+    assert list(Category.objects.all()) == [created], (
+        'Удаляться должны только импортированные строки'
+    )
@@ -0,0 +1,101 @@
+import time
+
+import pytest
+
+from api.metrics import MetricsRegistry, RequestMetrics, registry
+
+
+def test_nested_timers_are_counted_once():
+    metrics = RequestMetrics()
+    with metrics.timer('serializer'):
+        with metrics.timer('serializer'):
+            time.sleep(0.01)
+        time.sleep(0.01)
+    assert 0.02 <= metrics.timings['serializer'] < 0.04
+
+
+def test_registry_renders_prometheus_text():
+    metrics = RequestMetrics()
+    metrics.view = 'TitleViewSet.list'
+    metrics.queries = 3
+    metrics.timings['sql'] = 0.002
+    registry = MetricsRegistry(buckets=(0.5, 1))
+    registry.observe(metrics, 'GET', '200', 512)
+    text = registry.render()
+    assert (
+        'yamdb_requests_total{view="TitleViewSet.list",method="GET",'
+        'status="200"} 1'
+    ) in text
+    assert (
+        'yamdb_request_duration_seconds_bucket'
+        '{view="TitleViewSet.list",le="+Inf"} 1'
+    ) in text
+    assert 'yamdb_sql_queries_total{view="TitleViewSet.list"} 3' in text
+    assert 'yamdb_response_bytes_total{view="TitleViewSet.list"} 512' in text
+
+
+@pytest.mark.django_db
+def test_performance_middleware(client, settings, titles):
+    settings.PERFORMANCE_METRICS = True
+    settings.MIDDLEWARE = [
+        'api.middleware.PerformanceMiddleware',
+        *settings.MIDDLEWARE,
+    ]
+    registry.reset()
+
+    response = client.get('/api/v1/titles/')
+    assert response.status_code == 200
+    timing = response['Server-Timing']
+    for name in ('total;dur=', 'sql;dur=', 'serializer;dur=', 'render;dur='):
+        assert name in timing, (
+            f'Заголовок `Server-Timing` должен содержать `{name}`'
+        )
+    assert 'desc="3 queries"' in timing
+
+    response = client.get('/metrics/')
+    assert response.status_code == 200
+    text = response.content.decode()
+    assert (
+        'yamdb_requests_total{view="TitleViewSet.list",method="GET",'
+        'status="200"} 1'
+    ) in text
+    assert 'yamdb_sql_queries_total{view="TitleViewSet.list"} 3' in text
+
+
+def test_metrics_disabled(client, settings):
+    settings.PERFORMANCE_METRICS = False
+    assert client.get('/metrics/').status_code == 404
+
+
+@pytest.mark.django_db
+def test_streamed_responses_are_measured_to_the_end(client, settings, titles):
+    settings.PERFORMANCE_METRICS = True
+    settings.MIDDLEWARE = [
+        'api.middleware.PerformanceMiddleware',
+        *settings.MIDDLEWARE,
+    ]
+    registry.reset()
+
+    response = client.get('/api/v1/titles/?stream=true')
+    assert response.streaming
+    assert not registry.totals, (
+        'Потоковый ответ должен учитываться после отправки тела'
+    )
+    body = b''.join(response.streaming_content)
+    totals = registry.totals['TitleViewSet.list']
+    assert totals['response_bytes'] == len(body) > 0
+    assert totals['sql_queries'] > 0, (
+        'Запросы, выполненные при отправке тела, должны учитываться'
+    )
+    assert totals['serializer_duration_seconds'] > 0
+
+
+def test_handler_time_excludes_queries():
+    metrics = RequestMetrics()
+    metrics.start_exclusive('serializer')
+    time.sleep(0.03)
+    metrics.timings['sql'] += 0.02
+    metrics.stop_exclusive('serializer')
+    assert 0.01 <= metrics.timings['serializer'] < 0.02, (
+        'Время запросов не должно входить во время сериализации'
+    )
@@ -0,0 +1,94 @@
+import smtplib
+
+from datetime import timedelta
+
+import pytest
+
+from django.utils import timezone
+
+from reviews.models import OutgoingEmail
+from reviews.outbox import queue_mail, retry_delay, send_queued_mail
+
+
+def test_retry_delay(settings):
+    settings.OUTBOX_RETRY_DELAY = 30
+    settings.OUTBOX_MAX_RETRY_DELAY = 100
+    assert [retry_delay(attempt).seconds for attempt in (1, 2, 3)] == [
+        30, 60, 100,
+    ]
+
+
+class FailingBackend:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def open(self):
+        raise smtplib.SMTPConnectError(421, 'busy')
+
+    def close(self):
+        pass
+
+
+class PickyBackend(FailingBackend):
+    def open(self):
+        pass
+
+    def send_messages(self, messages):
+        if messages[0].to == ['bad@yamdb.fake']:
+            raise ValueError('unencodable header')
+        return len(messages)
+
+
+@pytest.mark.django_db
+class TestOutbox:
+
+    def test_signup_queues_mail(self, client, mailoutbox):
+        response = client.post('/api/v1/auth/signup/', {
+            'username': 'newcomer',
+            'email': 'newcomer@yamdb.fake',
+        })
+        assert response.status_code == 200
+        assert not mailoutbox, 'Регистрация не должна ждать отправки письма'
+        email = OutgoingEmail.objects.get()
+        assert email.to == 'newcomer@yamdb.fake'
+        assert send_queued_mail() == (1, 0)
+        assert len(mailoutbox) == 1
+        assert 'confirmation code' in mailoutbox[0].body
+        email.refresh_from_db()
+        assert email.sent_at is not None and email.attempts == 1
+        assert send_queued_mail() == (0, 0), 'Письмо отправляется один раз'
+
+    def test_batches_over_one_connection(self, mailoutbox):
+        queue_mail('s', 'b', [f'u{number}@yamdb.fake' for number in range(5)])
+        assert send_queued_mail(batch_size=3) == (3, 0)
+        assert send_queued_mail(batch_size=3) == (2, 0)
+        assert len(mailoutbox) == 5
+
+    def test_failed_sends_back_off(self, settings, mailoutbox):
+        settings.EMAIL_BACKEND = f'{__name__}.FailingBackend'
+        queue_mail('s', 'b', ['user@yamdb.fake'])
+        assert send_queued_mail() == (0, 1)
+        email = OutgoingEmail.objects.get()
+        assert email.attempts == 1 and 'busy' in email.last_error
+        assert email.send_after > timezone.now(), (
+            'Повторная попытка должна откладываться'
+        )
+        assert send_queued_mail() == (0, 0)
+        settings.EMAIL_BACKEND = 'django.core.mail.backends.locmem.'
+        settings.EMAIL_BACKEND += 'EmailBackend'
+        OutgoingEmail.objects.update(
+            send_after=timezone.now() - timedelta(seconds=1),
+        )
+        assert send_queued_mail() == (1, 0)
+        assert len(mailoutbox) == 1
+
+    def test_errors_fail_only_their_email(self, settings):
+        settings.EMAIL_BACKEND = f'{__name__}.PickyBackend'
+        queue_mail('s', 'b', ['bad@yamdb.fake', 'good@yamdb.fake'])
+        assert send_queued_mail() == (1, 1), (
+            'Ошибка отправки одного письма не должна прерывать остальные'
+        )
+        bad = OutgoingEmail.objects.get(to='bad@yamdb.fake')
+        assert bad.sent_at is None and 'unencodable' in bad.last_error
+        good = OutgoingEmail.objects.get(to='good@yamdb.fake')
+        assert good.sent_at is not None
@@ -0,0 +1,58 @@
+import pytest
+
+from api.pagination import decode_cursor, encode_cursor
+
+
+class TestCursor:
+
+    def test_cursor_round_trip(self):
+        position = [None, 7.5, 'Имя', 3]
+        assert decode_cursor(encode_cursor(position), 4) == position
+
+    def test_invalid_cursor(self):
+        from rest_framework.exceptions import NotFound
+
+        for cursor in ('broken', encode_cursor([1, 2])):
+            with pytest.raises(NotFound):
+                decode_cursor(cursor, 3)
+
+
+@pytest.mark.django_db
+class TestKeysetPagination:
+
+    def walk(self, client, url):
+        ids = []
+        while url:
+            data = client.get(url).json()
+            ids += [item['id'] for item in data['results']]
+            url = data['next']
+        return ids
+
+    def test_titles_cursor_visits_every_title_once(self, client, titles):
+        unrated = titles[0]
+        unrated.reviews.all().delete()
+        ids = self.walk(client, '/api/v1/titles/?cursor=&limit=2')
+        assert ids[0] == unrated.id, (
+            'Произведения без оценок должны идти первыми, как в PostgreSQL'
+        )
+        assert sorted(ids) == sorted(title.id for title in titles)
+        assert len(ids) == len(set(ids))
+
+    def test_comments_cursor_order(self, client, titles):
+        review = titles[0].reviews.get()
+        url = (
+            f'/api/v1/titles/{titles[0].id}/reviews/{review.id}/comments/'
+        )
+        ids = self.walk(client, f'{url}?cursor=&limit=2')
+        assert ids == list(
+            review.comments.order_by('-pub_date', '-id').values_list(
+                'id',
+                flat=True,
+            )
+        )
+
+    def test_count_can_be_skipped(self, client, titles):
+        data = client.get('/api/v1/titles/?count=false&limit=4').json()
+        assert 'count' not in data
+        assert len(data['results']) == 4
+        assert data['next'].endswith('offset=4')
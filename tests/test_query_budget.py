@@ -0,0 +1,22 @@
+import pytest
+
+
+@pytest.mark.django_db
+class TestQueryBudget:
+
+    def test_titles(self, assert_query_budget, titles):
+        assert_query_budget('/api/v1/titles/', 3)
+        assert_query_budget(f'/api/v1/titles/{titles[0].id}/', 2)
+
+    def test_reviews_and_comments(self, assert_query_budget, titles):
+        title = titles[0]
+        review = title.reviews.get()
+        assert_query_budget(f'/api/v1/titles/{title.id}/reviews/', 3)
+        assert_query_budget(
+            f'/api/v1/titles/{title.id}/reviews/{review.id}/comments/',
+            3,
+        )
+
+    def test_categories_and_genres(self, assert_query_budget, titles):
+        assert_query_budget('/api/v1/categories/', 2)
+        assert_query_budget('/api/v1/genres/', 2)
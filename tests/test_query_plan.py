@@ -0,0 +1,29 @@
+from api import views
+from api.mixins import plan_queryset
+
+
+class TestQueryPlan:
+
+    def plan(self, viewset, action):
+        view = viewset(action=action, kwargs={}, format_kwarg=None)
+        view.request = None
+        serializer = view.get_serializer()
+        return plan_queryset(serializer.Meta.model.objects.all(), serializer)
+
+    def test_titles_join_category_and_prefetch_genre(self):
+        for action in ('list', 'retrieve'):
+            queryset = self.plan(views.TitleViewSet, action)
+            assert 'category' in queryset.query.select_related, (
+                'Проверьте, что категория произведения загружается через JOIN'
+            )
+            assert 'genre' in queryset._prefetch_related_lookups, (
+                'Проверьте, что жанры произведений загружаются одним запросом'
+            )
+
+    def test_reviews_and_comments_join_author(self):
+        for viewset in (views.ReviewViewSet, views.CommentViewSet):
+            queryset = self.plan(viewset, 'list')
+            assert 'author' in queryset.query.select_related, (
+                f'Проверьте, что {viewset.__name__} загружает автора '
+                'через JOIN'
+            )
@@ -0,0 +1,62 @@
+import pytest
+
+from django.db.models import Avg, Count, Sum
+
+from reviews.models import Review, Title
+
+
+def assert_rating_matches_reviews(title, message):
+    stored = Title.objects.get(pk=title.pk)
+    expected = Title.objects.filter(pk=title.pk).aggregate(
+        rating=Avg('reviews__score'),
+        rating_sum=Sum('reviews__score'),
+        rating_count=Count('reviews'),
+    )
+    assert stored.rating == pytest.approx(expected['rating']), message
+    assert stored.rating_sum == (expected['rating_sum'] or 0), message
+    assert stored.rating_count == expected['rating_count'], message
+
+
+@pytest.mark.django_db
+class TestStoredRating:
+
+    def test_review_writes_update_rating(self, titles, admin):
+        title = titles[0]
+        review = Review.objects.create(
+            title=title, author=admin, text='!', score=3,
+        )
+        assert_rating_matches_reviews(
+            title,
+            'Новый отзыв должен учитываться в рейтинге произведения',
+        )
+        review = Review.objects.get(pk=review.pk)
+        review.score = 9
+        review.save()
+        assert_rating_matches_reviews(
+            title,
+            'Изменение оценки должно менять рейтинг произведения',
+        )
+        review.delete()
+        assert_rating_matches_reviews(
+            title,
+            'Удаленный отзыв не должен учитываться в рейтинге',
+        )
+        title.reviews.get().delete()
+        assert_rating_matches_reviews(
+            title,
+            'Без отзывов рейтинг произведения должен быть пустым',
+        )
+        assert Title.objects.get(pk=title.pk).rating is None
+
+    def test_rebuild_ratings(self, titles, admin):
+        Review.objects.create(
+            title=titles[0], author=admin, text='!', score=1,
+        )
+        titles[1].reviews.get().delete()
+        Title.objects.update(rating_sum=100, rating_count=1, rating=100)
+        Title.objects.rebuild_ratings()
+        for title in titles:
+            assert_rating_matches_reviews(
+                title,
+                'Пересчет должен восстанавливать рейтинг по отзывам',
+            )
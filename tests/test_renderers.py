@@ -0,0 +1,62 @@
+import io
+
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+
+from api import parsers, renderers
+from api.parsers import FastJSONParser
+from api.renderers import FastJSONRenderer
+
+DATA = {
+    'text': 'строка ',
+    'date': datetime(2020, 1, 2, 3, 4, 5, 678901, tzinfo=timezone.utc),
+    'price': Decimal('1.50'),
+    'histogram': {1: 2, 10: 0},
+    'rating': None,
+}
+
+
+@pytest.fixture(params=['orjson', 'stdlib'])
+def backend(request, monkeypatch):
+    if request.param == 'stdlib':
+        monkeypatch.setattr(renderers, 'orjson', None)
+        monkeypatch.setattr(parsers, 'orjson', None)
+    elif renderers.orjson is None:
+        pytest.skip('orjson is not installed')
+    return request.param
+
+
+def test_renderer_matches_json_renderer(backend):
+    assert FastJSONRenderer().render(DATA) == JSONRenderer().render(DATA), (
+        'Быстрый рендерер должен возвращать тот же JSON, что и JSONRenderer'
+    )
+    assert FastJSONRenderer().render(None) == b''
+    assert FastJSONRenderer().render(
+        {'a': 1},
+        'application/json; indent=2',
+    ) == b'{\n  "a": 1\n}'
+
+
+def test_parser(backend):
+    parser = FastJSONParser()
+    assert parser.parse(io.BytesIO('{"a": ["б"]}'.encode())) == {'a': ['б']}
+    with pytest.raises(ParseError):
+        parser.parse(io.BytesIO(b'{"a": NaN}'))
+
+
+@pytest.mark.django_db
+def test_values_list_matches_serializer(client, titles):
+    fast = client.get('/api/v1/titles/?limit=10').json()
+    slow = client.get('/api/v1/titles/?limit=10&expand=').json()
+    for data in (fast, slow):
+        for title in data['results']:
+            title['genre'].sort(key=lambda genre: genre['slug'])
+    assert fast == slow, (
+        'Список произведений из values() должен совпадать с ответом '
+        'сериализатора'
+    )
@@ -0,0 +1,51 @@
+import pytest
+
+from api.search import InvertedIndex, similarity, trigrams
+
+
+class TestInvertedIndex:
+
+    index = InvertedIndex([
+        (1, 'Властелин колец', 'Фродо несёт кольцо в Мордор'),
+        (2, 'Хоббит', 'Бильбо и кольцо'),
+        (3, 'Матрица', 'Нео выбирает таблетку'),
+    ])
+
+    def test_every_word_must_match(self):
+        assert [pk for pk, _ in self.index.search('кольцо', 10)] == [1, 2]
+        assert [pk for pk, _ in self.index.search('кольцо бильбо', 10)] == [
+            2,
+        ]
+
+    def test_fuzzy_name_match(self):
+        assert [pk for pk, _ in self.index.search('Матрыца', 10)] == [3]
+        assert self.index.search('Терминатор', 10) == []
+
+    def test_trigrams_match_pg_trgm(self):
+        assert trigrams('cat') == {'  c', ' ca', 'cat', 'at '}
+        assert similarity(trigrams('word'), trigrams('two words')) == 4 / 11
+
+
+@pytest.mark.django_db
+class TestTitleSearch:
+
+    def test_search_is_ranked_and_filtered(self, client, titles):
+        titles[2].description = 'Произведение о море и о море'
+        titles[2].save()
+        titles[4].description = 'Немного о море'
+        titles[4].save()
+
+        response = client.get('/api/v1/titles/', {'search': 'море'})
+        assert response.status_code == 200
+        assert [title['id'] for title in response.json()['results']] == [
+            titles[2].id,
+            titles[4].id,
+        ], 'Результаты поиска должны быть упорядочены по релевантности'
+
+        response = client.get(
+            '/api/v1/titles/',
+            {'search': 'море', 'year': titles[4].year},
+        )
+        assert [title['id'] for title in response.json()['results']] == [
+            titles[4].id,
+        ], 'Поиск должен сочетаться с остальными фильтрами'
@@ -0,0 +1,59 @@
+import pytest
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+@pytest.mark.django_db
+class TestSparseFields:
+
+    def get(self, client, url):
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        assert response.status_code == 200
+        return response.json(), [
+            query['sql'] for query in context.captured_queries
+        ]
+
+    def test_titles_load_requested_columns(self, client, titles):
+        data, queries = self.get(client, '/api/v1/titles/?fields=id,name')
+        assert set(data['results'][0]) == {'id', 'name'}, (
+            'Параметр fields должен оставлять только перечисленные поля'
+        )
+        assert len(queries) == 2, (
+            'Без жанров и категории не нужны ни JOIN, ни prefetch'
+        )
+        assert 'description' not in queries[-1]
+        assert 'reviews_category' not in queries[-1]
+
+    def test_nested_and_expanded_fields(self, client, titles):
+        data, queries = self.get(
+            client,
+            '/api/v1/titles/?fields=id,category&expand=stats',
+        )
+        assert set(data['results'][0]) == {'id', 'category', 'stats'}
+        assert data['results'][0]['category']['slug'] == 'movie'
+        assert len(queries) == 2
+        assert 'description' not in queries[-1]
+
+    def test_comments_skip_review_join(self, client, titles):
+        review = titles[0].reviews.get()
+        url = (
+            f'/api/v1/titles/{titles[0].id}/reviews/{review.id}/comments/'
+        )
+        data, _ = self.get(client, url)
+        assert data['results'][0]['review'] == review.text
+        data, queries = self.get(client, f'{url}?fields=id,text')
+        assert set(data['results'][0]) == {'id', 'text'}
+        assert not any(
+            'reviews_review"."text' in query for query in queries
+        ), 'Комментарии не должны загружать текст отзыва'
+
+    def test_writes_are_not_shaped(self, admin_client, titles):
+        response = admin_client.patch(
+            f'/api/v1/titles/{titles[0].id}/?fields=id',
+            {'name': 'Новое название'},
+            format='json',
+        )
+        assert response.status_code == 200
+        assert response.json()['name'] == 'Новое название'
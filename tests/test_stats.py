@@ -0,0 +1,206 @@
+import random
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from reviews.models import Review, Title, TitleStats
+from reviews.stats import (
+    RECENT_SCALE,
+    add_review,
+    aggregate_reviews,
+    empty_stats,
+    remove_review,
+)
+
+EPOCH = datetime(2000, 1, 1, tzinfo=timezone.utc)
+
+
+def test_aggregate_reviews():
+    later = EPOCH + RECENT_SCALE
+    stats = aggregate_reviews([1, 2], [
+        (1, 10, EPOCH),
+        (1, 4, later),
+    ])
+    assert stats[1]['score_10'] == 1 and stats[1]['score_4'] == 1
+    assert stats[1]['review_count'] == 2 and stats[1]['score_sum'] == 14
+    assert stats[1]['last_review_at'] == later
+    assert stats[1]['recent_score_sum'] / stats[1]['recent_weight'] < 7, (
+        'Новые отзывы должны весить в недавнем рейтинге больше старых'
+    )
+    assert stats[2]['review_count'] == 0
+
+
+def test_adding_and_removing_across_years():
+    rng = random.Random(1)
+    for _ in range(200):
+        values = empty_stats()
+        kept = []
+        for _ in range(20):
+            if kept and rng.random() < 0.4:
+                score, pub_date = kept.pop(rng.randrange(len(kept)))
+                remove_review(
+                    values,
+                    score,
+                    pub_date,
+                    newest=lambda: max(date for _, date in kept),
+                    reviews=lambda: kept,
+                )
+            else:
+                review = (
+                    rng.randint(1, 10),
+                    EPOCH + timedelta(days=rng.randint(0, 365 * 30)),
+                )
+                kept.append(review)
+                add_review(values, *review)
+        expected = aggregate_reviews([1], (
+            (1, score, pub_date) for score, pub_date in kept
+        ))[1]
+        assert values['recent_weight'] == pytest.approx(
+            expected['recent_weight'],
+        ), 'Веса не должны накапливать ошибку при удалении отзывов'
+        assert values['recent_score_sum'] == pytest.approx(
+            expected['recent_score_sum'],
+        )
+        assert not kept or (
+            1 - 1e-9 <= values['recent_weight'] <= len(kept) + 1e-9
+        )
+
+
+def live_histogram(title):
+    histogram = {score: 0 for score in range(1, 11)}
+    for score in title.reviews.values_list('score', flat=True):
+        histogram[score] += 1
+    return histogram
+
+
+@pytest.mark.django_db
+class TestTitleStats:
+
+    def test_follow_review_writes(self, titles, admin):
+        title = titles[0]
+        review = Review.objects.create(
+            title=title, author=admin, text='!', score=2,
+        )
+        review = Review.objects.get(pk=review.pk)
+        review.score = 7
+        review.save()
+        stats = TitleStats.objects.get(title=title)
+        assert stats.histogram == live_histogram(title), (
+            'Распределение оценок должно обновляться вместе с отзывами'
+        )
+        assert stats.review_count == 2
+        assert stats.last_review_at == review.pub_date
+        review.delete()
+        stats.refresh_from_db()
+        assert stats.histogram == live_histogram(title)
+        assert stats.review_count == 1
+        assert stats.last_review_at == title.reviews.get().pub_date
+
+    def test_review_writes_across_years(self, titles, django_user_model):
+        title = titles[0]
+        for year in (1990, 2010, 2030):
+            author = django_user_model.objects.create(
+                username=f'critic{year}',
+                email=f'critic{year}@yamdb.fake',
+            )
+            review = Review.objects.create(
+                title=title, author=author, text='!', score=year % 7 + 1,
+            )
+            Review.objects.filter(pk=review.pk).update(
+                pub_date=datetime(year, 1, 1, tzinfo=timezone.utc),
+            )
+        same_title = Title.objects.filter(pk=title.pk)
+        same_title.rebuild_stats()
+
+        def assert_matches_rebuild():
+            updated = TitleStats.objects.get(title=title)
+            same_title.rebuild_stats()
+            rebuilt = TitleStats.objects.get(title=title)
+            assert updated.recent_weight == pytest.approx(
+                rebuilt.recent_weight,
+            ), 'Веса должны совпадать с пересчётом по отзывам'
+            assert updated.recent_rating == pytest.approx(
+                rebuilt.recent_rating,
+            )
+
+        newest = title.reviews.order_by('-pub_date').first()
+        newest.score = 10
+        newest.save()
+        assert_matches_rebuild()
+        newest.delete()
+        assert_matches_rebuild()
+        title.reviews.order_by('pub_date').first().delete()
+        assert_matches_rebuild()
+
+    def test_delete_subtracts_weights(
+        self,
+        titles,
+        django_user_model,
+        django_assert_num_queries,
+    ):
+        title = titles[0]
+        title.reviews.update(pub_date=EPOCH)
+        for day in (10, 40, 70):
+            author = django_user_model.objects.create(
+                username=f'critic{day}',
+                email=f'critic{day}@yamdb.fake',
+            )
+            review = Review.objects.create(
+                title=title, author=author, text='!', score=day % 9 + 1,
+            )
+            Review.objects.filter(pk=review.pk).update(
+                pub_date=EPOCH + timedelta(days=day),
+            )
+        Title.objects.filter(pk=title.pk).rebuild_stats()
+
+        def delete(review, queries):
+            with django_assert_num_queries(queries):
+                review.delete()
+            updated = TitleStats.objects.get(title=title)
+            expected = aggregate_reviews([title.pk], (
+                (title.pk, score, pub_date)
+                for score, pub_date in title.reviews.values_list(
+                    'score',
+                    'pub_date',
+                )
+            ))[title.pk]
+            assert updated.last_review_at == expected['last_review_at']
+            assert updated.recent_weight == pytest.approx(
+                expected['recent_weight'],
+            ), 'Удаление отзыва должно вычитать его вес'
+            assert updated.recent_score_sum == pytest.approx(
+                expected['recent_score_sum'],
+            )
+
+        reviews = title.reviews.select_related('author')
+        # Deleting the newest review takes one more query, which finds
+        # the newest review left; the others are never read.
+        delete(reviews.get(author__username='critic40'), 7)
+        delete(reviews.get(author__username='critic70'), 8)
+
+    def test_rebuild_matches_updates(self, titles, admin):
+        Review.objects.create(
+            title=titles[0], author=admin, text='!', score=9,
+        )
+        updated = TitleStats.objects.get(title=titles[0])
+        Title.objects.rebuild_stats()
+        rebuilt = TitleStats.objects.get(title=titles[0])
+        assert rebuilt.histogram == updated.histogram
+        assert rebuilt.recent_rating == pytest.approx(updated.recent_rating)
+
+    def test_stats_endpoint(self, client, titles):
+        response = client.get(f'/api/v1/titles/{titles[0].id}/stats/')
+        assert response.status_code == 200
+        data = response.json()
+        assert data['review_count'] == 1
+        assert sum(data['histogram'].values()) == 1
+        assert client.get('/api/v1/titles/999999/stats/').status_code == 404
+
+    def test_expand_stats(self, client, titles, assert_query_budget):
+        response = client.get('/api/v1/titles/')
+        assert 'stats' not in response.json()['results'][0]
+        response = assert_query_budget('/api/v1/titles/?expand=stats', 3)
+        assert response.json()['results'][0]['stats']['review_count'] == 1, (
+            'Статистика должна встраиваться в список без лишних запросов'
+        )
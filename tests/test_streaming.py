@@ -0,0 +1,39 @@
+import json
+
+import pytest
+
+
+def stream(client, url, **headers):
+    response = client.get(url, **headers)
+    assert response.status_code == 200
+    assert response.streaming, 'Список должен отдаваться потоком'
+    return json.loads(b''.join(response.streaming_content))
+
+
+@pytest.mark.django_db
+class TestStreaming:
+
+    @pytest.fixture(autouse=True)
+    def small_chunks(self, settings):
+        settings.STREAM_CHUNK_SIZE = 4
+
+    def test_titles(self, client, titles):
+        rows = stream(client, '/api/v1/titles/?stream=true')
+        assert sorted(row['id'] for row in rows) == sorted(
+            title.id for title in titles
+        ), 'В потоке должны быть все произведения, без пагинации'
+        assert all(len(row['genre']) == 3 for row in rows)
+        shaped = stream(client, '/api/v1/titles/?stream=true&fields=id,genre')
+        assert {len(row['genre']) for row in shaped} == {3}, (
+            'Жанры должны подгружаться для каждого фрагмента'
+        )
+
+    def test_filtered_and_empty(self, client, titles):
+        assert stream(client, '/api/v1/titles/?stream=true&year=1') == []
+
+    def test_reviews(self, client, titles):
+        rows = stream(
+            client,
+            f'/api/v1/titles/{titles[0].id}/reviews/?stream=true',
+        )
+        assert [row['id'] for row in rows] == [titles[0].reviews.get().id]
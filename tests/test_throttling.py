@@ -0,0 +1,69 @@
+import pytest
+
+from api.throttling import LocalBucketStore, parse_rate, take
+
+
+def test_bucket_bursts_then_refills():
+    state = None
+    for _ in range(3):
+        allowed, state, wait = take(state, 100.0, 3, 0.5)
+        assert allowed and wait is None
+    allowed, state, wait = take(state, 100.0, 3, 0.5)
+    assert not allowed, 'Пустое ведро не должно пропускать запросы'
+    assert wait == 2.0
+    allowed, state, _ = take(state, 102.0, 3, 0.5)
+    assert allowed, 'Ведро должно наполняться со временем'
+    allowed, state, _ = take(state, 1000.0, 3, 0.5)
+    assert state[0] == 2, 'Ведро не должно переполняться'
+    assert parse_rate('20/min') == (20, 60)
+
+
+def test_local_store_drops_oldest_buckets():
+    store = LocalBucketStore(max_entries=2)
+    for key in 'abc':
+        store.set(key, (1, 0), 60)
+    assert store.get('a') is None
+    assert store.get('c') == (1, 0)
+
+
+@pytest.fixture
+def rates(settings):
+    def set_rates(**rates):
+        settings.REST_FRAMEWORK = {
+            **settings.REST_FRAMEWORK,
+            'DEFAULT_THROTTLE_RATES': rates,
+        }
+    return set_rates
+
+
+def test_signup_is_throttled_per_address(client, rates):
+    rates(signup='2/min')
+    statuses = [
+        client.post('/api/v1/auth/signup/', {}).status_code
+        for _ in range(3)
+    ]
+    assert statuses == [400, 400, 429], (
+        'Регистрация должна ограничиваться по числу запросов'
+    )
+    response = client.post('/api/v1/auth/signup/', {})
+    assert int(response['Retry-After']) > 0
+    response = client.post(
+        '/api/v1/auth/signup/',
+        {},
+        REMOTE_ADDR='10.0.0.2',
+    )
+    assert response.status_code == 400, (
+        'У каждого клиента должно быть своё ведро'
+    )
+
+
+@pytest.mark.django_db
+def test_review_create_is_throttled_per_user(user_client, titles, rates):
+    rates(review_create='1/min')
+    url = f'/api/v1/titles/{titles[0].id}/reviews/'
+    assert user_client.get(url).status_code == 200
+    assert user_client.post(url, {'text': 'Ещё', 'score': 5}).status_code == 400
+    assert user_client.post(url, {'text': 'Ещё', 'score': 5}).status_code == 429
+    assert user_client.get(url).status_code == 200, (
+        'Чтение не должно ограничиваться'
+    )